@@ -0,0 +1,204 @@
+"""
+Benchmark CLI:
+
+    $ python -m benchmarks run [--group notes] [--filter tab_write] [--save results.json] [--compare baseline.json]
+    $ python -m benchmarks compare <baseline.json> <results.json> [--threshold 0.15]
+    $ python -m benchmarks backends [--backend onnx] [--intra-op-threads N] [--save backends.json]
+
+``compare`` (and ``run --compare``) exit with status 1 if any benchmark regressed, ``backends``
+if the backends transcribe the test recordings differently.
+"""
+
+import argparse
+import fnmatch
+import json
+import pathlib
+import sys
+import tempfile
+
+from benchmarks.backends import DEFAULT_MIN_AGREEMENT, compare_backends
+from benchmarks.runner import DEFAULT_THRESHOLD, compare_results, load_results, run_benchmarks, save_results
+from benchmarks.suites import DEFAULT_MAX_NOTES, GROUPS, TEST_AUDIO_DIR, build_benchmarks
+from src.converters.inference_backends import INFERENCE_BACKENDS
+from src.pipeline.inputs import AUDIO_SUFFIXES
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the pipeline stages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks.")
+    run.add_argument(
+        "--group",
+        action="append",
+        choices=GROUPS,
+        help="Only run this group; repeat for several (default: all). 'audio' needs basic_pitch, "
+        "'render' needs fluidsynth and ffmpeg.",
+    )
+    run.add_argument(
+        "--filter", default="*", metavar="PATTERN", help="Only run benchmarks whose name matches the glob PATTERN."
+    )
+    run.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest counts (default: 3).")
+    run.add_argument(
+        "--max-seconds",
+        type=float,
+        default=60,
+        help="Stop repeating a benchmark once it has taken this long in total (default: 60).",
+    )
+    run.add_argument(
+        "--max-notes",
+        type=int,
+        default=DEFAULT_MAX_NOTES,
+        help=f"Largest synthetic note stream (default: {DEFAULT_MAX_NOTES}; 1000000 for the full range).",
+    )
+    run.add_argument("--save", type=pathlib.Path, default=None, help="Write the results as JSON.")
+    run.add_argument(
+        "--compare", type=pathlib.Path, default=None, metavar="BASELINE", help="Compare the results with BASELINE."
+    )
+
+    compare = commands.add_parser("compare", help="Compare saved results with a baseline.")
+    compare.add_argument("baseline", type=pathlib.Path)
+    compare.add_argument("results", type=pathlib.Path)
+    for command in (run, compare):
+        command.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help=f"Slowdown, as a fraction of the baseline, reported as a regression (default: {DEFAULT_THRESHOLD}).",
+        )
+
+    backends = commands.add_parser(
+        "backends", help="Compare the inference backends' speed, memory and notes on the test recordings."
+    )
+    backends.add_argument(
+        "--backend",
+        action="append",
+        choices=INFERENCE_BACKENDS,
+        help="Only compare this backend; repeat for several (default: all). The first is the reference for the notes.",
+    )
+    backends.add_argument("--repeat", type=int, default=3, help="Runs per recording; the fastest counts (default: 3).")
+    backends.add_argument("--intra-op-threads", type=int, default=None, help="Threads per model operation.")
+    backends.add_argument("--inter-op-threads", type=int, default=None, help="Model operations run at once.")
+    backends.add_argument(
+        "--min-agreement",
+        type=float,
+        default=DEFAULT_MIN_AGREEMENT,
+        help=f"Share of notes every backend must agree on with the reference (default: {DEFAULT_MIN_AGREEMENT}).",
+    )
+    backends.add_argument("--save", type=pathlib.Path, default=None, help="Write the results as JSON.")
+
+    return parser
+
+
+def _print_result(name: str, result: dict) -> None:
+    if "skipped" in result:
+        print(f"{name:<40} skipped ({result['skipped']})")
+        return
+    throughput = f"{result['items_per_second']:>14,.0f} {result['unit']}/s" if result["items_per_second"] else ""
+    print(f"{name:<40} {result['min_seconds']:>10.4f}s {throughput}")
+
+
+def _report_comparison(baseline: dict, current: dict, threshold: float) -> int:
+    if baseline.get("machine") != current.get("machine"):
+        print("Warning: the baseline was measured on a different machine, so timings may not be comparable.")
+
+    comparison = compare_results(baseline, current, threshold)
+    print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for entry in comparison:
+        if "change" in entry:
+            print(
+                f"{entry['name']:<40} {entry['baseline_seconds']:>9.4f}s {entry['current_seconds']:>9.4f}s "
+                f"{entry['change']:>+8.1%}  {entry['status']}"
+            )
+        elif entry["status"] != "missing":
+            print(f"{entry['name']:<40} {'':>10} {'':>10} {'':>8}  {entry['status']}")
+
+    regressed = [entry["name"] for entry in comparison if entry["status"] == "regressed"]
+    print(f"\n{len(regressed)} regression(s) beyond {threshold:.0%}")
+    return 1 if regressed else 0
+
+
+def run_main(args: argparse.Namespace) -> int:
+    groups = tuple(args.group or GROUPS)
+    baseline = None
+    if args.compare is not None:
+        try:
+            baseline = load_results(args.compare)
+        except ValueError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+
+    with tempfile.TemporaryDirectory(prefix="audio-tab-generator-bench-") as work_dir:
+        benchmarks = [
+            benchmark
+            for benchmark in build_benchmarks(pathlib.Path(work_dir), groups, args.max_notes)
+            if fnmatch.fnmatch(benchmark.name, args.filter)
+        ]
+        results = run_benchmarks(benchmarks, args.repeat, args.max_seconds, progress=_print_result)
+
+    if args.save is not None:
+        print(f"\nResults written to {save_results(results, args.save)}")
+
+    if baseline is not None:
+        return _report_comparison(baseline, results, args.threshold)
+    return 0
+
+
+def compare_main(args: argparse.Namespace) -> int:
+    try:
+        baseline = load_results(args.baseline)
+        current = load_results(args.results)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    return _report_comparison(baseline, current, args.threshold)
+
+
+def backends_main(args: argparse.Namespace) -> int:
+    audio_paths = sorted(path for path in TEST_AUDIO_DIR.iterdir() if path.suffix.lower() in AUDIO_SUFFIXES)
+    results = compare_backends(
+        audio_paths, args.backend or INFERENCE_BACKENDS, args.repeat, args.intra_op_threads, args.inter_op_threads
+    )
+
+    print(f"{'backend':<8} {'load':>8} {'peak RSS':>10} {'latency':>9} {'samples/s':>12}")
+    for backend, result in results["backends"].items():
+        if "skipped" in result:
+            print(f"{backend:<8} skipped ({result['skipped']})")
+            continue
+        clips = result["clips"].values()
+        seconds = sum(clip["seconds"] for clip in clips)
+        throughput = sum(clip["samples"] for clip in clips) / seconds if seconds > 0 else 0
+        print(
+            f"{backend:<8} {result['load_seconds']:>7.2f}s {result['max_rss_bytes'] / 2**20:>7.0f} MB "
+            f"{seconds / max(len(clips), 1):>8.3f}s {throughput:>12,.0f}"
+        )
+
+    mismatched = []
+    for backend, clips in results["agreement"].items():
+        for clip, share in clips.items():
+            print(f"{backend:<8} notes of {clip}: {share:.1%} agree with the reference")
+            if share < args.min_agreement:
+                mismatched.append(f"{backend} on {clip}")
+
+    if args.save is not None:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nResults written to {args.save}")
+
+    if mismatched:
+        print(f"\nNotes differ beyond {args.min_agreement:.0%}: {', '.join(mismatched)}")
+        return 1
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run_main(args)
+    if args.command == "backends":
+        return backends_main(args)
+    return compare_main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Compare the inference backends on the bundled test recordings.
+
+Every backend runs in a process of its own, so its peak memory is its own and one runtime
+being loaded doesn't slow another down. The worker side is run as::
+
+    $ python -m benchmarks.backends <backend> <result.json> <audio> [<audio> ...] [--intra-op-threads N]
+"""
+
+import argparse
+import importlib.util
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional, Sequence
+
+from src.converters.inference_backends import BACKEND_MODULES, INFERENCE_BACKENDS, note_agreement
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# Share of notes two backends must agree on (see note_agreement) for their output to count as the same
+DEFAULT_MIN_AGREEMENT = 0.95
+
+QUANTISATION = 150
+
+
+def missing_runtime(backend: str) -> Optional[str]:
+    """The module *backend* needs that isn't installed, if any."""
+    if importlib.util.find_spec("basic_pitch") is None:
+        return "basic_pitch"
+    if importlib.util.find_spec(BACKEND_MODULES[backend]) is None:
+        # TensorFlow bundles a TFLite interpreter too
+        if backend != "tflite" or importlib.util.find_spec("tensorflow") is None:
+            return BACKEND_MODULES[backend]
+    return None
+
+
+def measure_backend(
+    backend: str,
+    audio_paths: Sequence[pathlib.Path],
+    repeat: int = 3,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+) -> dict:
+    """
+    Load the model with *backend* and transcribe every file of *audio_paths*, in this process.
+
+    Returns
+    -------
+    dict
+        ``{'backend', 'load_seconds', 'max_rss_bytes', 'clips': {name: {'samples', 'seconds',
+        'samples_per_second', 'notes'}}}``. The seconds are the fastest of *repeat* runs of the
+        model; the notes are ``(start, end, pitch)`` triples.
+    """
+    import resource
+
+    from src.converters.audio_decode import load_audio
+    from src.converters.audio_to_midi import NoteExtractor, load_model
+    from src.converters.model_windows import run_model
+
+    started = time.perf_counter()
+    model = load_model(backend=backend, intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+    load_seconds = time.perf_counter() - started
+
+    clips = {}
+    for audio_path in audio_paths:
+        audio = load_audio(audio_path)
+        runs = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            model_output = run_model(model, audio)
+            runs.append(time.perf_counter() - started)
+        _, note_events = NoteExtractor(model_output).extract(0.5, 0.4, QUANTISATION)
+        clips[audio_path.name] = {
+            "samples": len(audio),
+            "seconds": round(min(runs), 6),
+            "samples_per_second": round(len(audio) / min(runs), 1),
+            "notes": [(float(start), float(end), int(pitch)) for start, end, pitch, *_ in note_events],
+        }
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 6),
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,  # KiB on Linux
+        "clips": clips,
+    }
+
+
+def compare_backends(
+    audio_paths: Sequence[pathlib.Path],
+    backends: Sequence[str] = INFERENCE_BACKENDS,
+    repeat: int = 3,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+) -> dict:
+    """
+    Measure every backend of *backends* in a fresh process (see :func:`measure_backend`), and
+    how closely its notes agree with those of the first backend that ran.
+
+    Returns
+    -------
+    dict
+        ``{'backends': {backend: result}, 'agreement': {backend: {clip: share}}}``, where the result
+        of a backend whose runtime is missing or that failed is ``{'skipped': reason}``.
+    """
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="audio-tab-generator-backends-") as work_dir:
+        for backend in backends:
+            missing = missing_runtime(backend)
+            if missing is not None:
+                results[backend] = {"skipped": f"missing {missing}"}
+                continue
+
+            result_path = pathlib.Path(work_dir) / f"{backend}.json"
+            command = [sys.executable, "-m", "benchmarks.backends", backend, str(result_path)]
+            command += [str(path) for path in audio_paths] + ["--repeat", str(repeat)]
+            if intra_op_threads is not None:
+                command += ["--intra-op-threads", str(intra_op_threads)]
+            if inter_op_threads is not None:
+                command += ["--inter-op-threads", str(inter_op_threads)]
+            completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1:] or [f"exit status {completed.returncode}"]
+                results[backend] = {"skipped": f"failed: {error[0]}"}
+                continue
+            results[backend] = json.loads(result_path.read_text())
+
+    measured = [backend for backend in backends if "skipped" not in results[backend]]
+    agreement: dict[str, dict[str, float]] = {}
+    if measured:
+        reference = results[measured[0]]["clips"]
+        for backend in measured[1:]:
+            agreement[backend] = {
+                clip: round(note_agreement(reference[clip]["notes"], result["notes"]), 4)
+                for clip, result in results[backend]["clips"].items()
+            }
+    return {"backends": results, "agreement": agreement}
+
+
+def _worker_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.backends")
+    parser.add_argument("backend", choices=INFERENCE_BACKENDS)
+    parser.add_argument("result", type=pathlib.Path)
+    parser.add_argument("audio", type=pathlib.Path, nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--intra-op-threads", type=int, default=None)
+    parser.add_argument("--inter-op-threads", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    result = measure_backend(args.backend, args.audio, args.repeat, args.intra_op_threads, args.inter_op_threads)
+    args.result.write_text(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_worker_main(sys.argv[1:]))
@@ -0,0 +1,101 @@
+import pathlib
+
+import numpy as np
+
+from src.converters.midi_writer import StreamingMidiWriter
+from src.models.note_array import NOTE_DTYPE
+
+# Playable voicings (low to high) of common open chords
+CHORD_SHAPES = [
+    [40, 47, 52, 56, 59, 64],  # E
+    [45, 52, 57, 61, 64],  # A
+    [50, 57, 62, 66],  # D
+    [48, 52, 55, 60, 64],  # C
+    [43, 47, 50, 55, 59, 67],  # G
+    [40, 47, 52, 55, 59, 64],  # Em
+    [45, 52, 57, 60, 64],  # Am
+]
+
+# Seconds between the strings of a strummed chord
+STRUM_SECONDS = 0.01
+
+
+def _note_array(starts: np.ndarray, ends: np.ndarray, pitches: np.ndarray) -> np.ndarray:
+    notes = np.empty(len(starts), dtype=NOTE_DTYPE)
+    notes["start_time"] = starts
+    notes["end_time"] = ends
+    notes["pitch"] = pitches
+    return notes
+
+
+def melody(n_notes: int, seed: int = 0) -> np.ndarray:
+    """
+    A single line of *n_notes* non-overlapping notes, one cluster per note.
+
+    Returns
+    -------
+    np.ndarray
+        ``NOTE_DTYPE`` array, sorted by start time.
+    """
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([0.125, 0.25, 0.5], size=n_notes)
+    starts = np.concatenate(([0.0], np.cumsum(steps[:-1])))
+    return _note_array(starts, starts + 0.8 * steps, rng.integers(52, 77, size=n_notes))
+
+
+def dense_chords(n_notes: int, seed: int = 0) -> np.ndarray:
+    """
+    Strummed chords of four to six notes, until there are *n_notes* notes.
+
+    Every chord is one cluster, and its notes start within the quantisation window, so
+    each chord is fingered as a single group.
+    """
+    rng = np.random.default_rng(seed)
+    starts, ends, pitches = [], [], []
+    time = 0.0
+    while len(pitches) < n_notes:
+        shape = CHORD_SHAPES[rng.integers(len(CHORD_SHAPES))]
+        duration = rng.choice([0.25, 0.5, 1.0])
+        for string, pitch in enumerate(shape):
+            starts.append(time + string * STRUM_SECONDS)
+            ends.append(time + duration)
+            pitches.append(pitch)
+        time += duration
+    return _note_array(np.array(starts[:n_notes]), np.array(ends[:n_notes]), np.array(pitches[:n_notes]))
+
+
+def long_sustains(n_notes: int, seed: int = 0, notes_per_pedal: int = 64) -> np.ndarray:
+    """
+    A low pedal note held under a melody on the higher strings, changing every
+    *notes_per_pedal* notes.
+
+    The pedal overlaps the whole phrase, so every phrase is one large cluster.
+    """
+    rng = np.random.default_rng(seed)
+    starts, ends, pitches = [], [], []
+    time = 0.0
+    while len(pitches) < n_notes:
+        phrase_starts = time + 0.25 * np.arange(notes_per_pedal - 1)
+        phrase_end = time + 0.25 * (notes_per_pedal - 1)
+        starts.append(time)
+        ends.append(phrase_end)
+        pitches.append(rng.choice([40, 43, 45]))
+        starts.extend(phrase_starts)
+        ends.extend(phrase_starts + 0.2)
+        pitches.extend(rng.integers(55, 77, size=len(phrase_starts)))
+        time = phrase_end
+    notes = _note_array(np.array(starts[:n_notes]), np.array(ends[:n_notes]), np.array(pitches[:n_notes]))
+    return notes[np.argsort(notes["start_time"], kind="stable")]
+
+
+NOTE_STREAMS = {"melody": melody, "chords": dense_chords, "sustains": long_sustains}
+
+
+def write_midi(notes: np.ndarray, midi_path: pathlib.Path | str, velocity: int = 90) -> pathlib.Path:
+    """Write *notes* to a single-track MIDI file."""
+    with StreamingMidiWriter(midi_path) as writer:
+        writer.add_notes(
+            (start, end, int(pitch), velocity)
+            for start, end, pitch in zip(notes["start_time"].tolist(), notes["end_time"].tolist(), notes["pitch"])
+        )
+    return pathlib.Path(midi_path)
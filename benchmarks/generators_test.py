@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.converters.midi_parser import read_midi_notes
+from src.models.note_array import NoteArray
+
+from .generators import NOTE_STREAMS, dense_chords, long_sustains, melody, write_midi
+
+
+class TestGenerators:
+    def test_streams_are_sorted_playable_and_sized(self) -> None:
+        for generate in NOTE_STREAMS.values():
+            notes = generate(1_000)
+            assert len(notes) == 1_000
+            assert np.all(np.diff(notes["start_time"]) >= 0)
+            NoteArray(notes).check_playable()
+
+    def test_cluster_shapes(self) -> None:
+        assert len(NoteArray(melody(1_000)).cluster_bounds()) - 1 == 1_000
+        # Four to six notes per chord, and one pedal per 64 notes
+        assert 1_000 / 6 <= len(NoteArray(dense_chords(1_000)).cluster_bounds()) - 1 <= 1_000 / 4 + 1
+        assert len(NoteArray(long_sustains(1_024)).cluster_bounds()) - 1 == 16
+
+    def test_write_midi_round_trip(self, tmp_path) -> None:
+        notes = dense_chords(100)
+        read_back = read_midi_notes(write_midi(notes, tmp_path / "chords.mid"))
+
+        assert len(read_back) == len(notes)
+        assert np.allclose(np.sort(read_back["start_time"]), np.sort(notes["start_time"]), atol=0.01)
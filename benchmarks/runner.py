@@ -0,0 +1,233 @@
+import datetime
+import importlib.util
+import json
+import os
+import pathlib
+import platform
+import shutil
+import statistics
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from src.profiling.profiler import Profiler
+
+# Default slowdown, as a fraction of the baseline, reported as a regression by compare_results
+DEFAULT_THRESHOLD = 0.15
+
+# Runs shorter than this are noisy, so their relative change is not counted as a regression
+MIN_COMPARED_SECONDS = 0.005
+
+
+class Benchmark:
+    """
+    A named, repeatable measurement.
+
+    *setup* prepares the input outside the timed region and its result is passed to *run*,
+    which is timed. Benchmarks are skipped when their *modules* can't be imported or their
+    *executables* aren't on the PATH.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        group: str,
+        run: Callable[[Any], Any],
+        setup: Optional[Callable[[], Any]] = None,
+        items: int | Callable[[Any], int] = 0,
+        unit: str = "notes",
+        modules: Iterable[str] = (),
+        executables: Iterable[str] = (),
+    ) -> None:
+        """
+        :param name: Unique name, ``<group>.<stage>.<case>`` by convention
+        :type name: str
+        :param group: Group the benchmark is selected by
+        :type group: str
+        :param run: The code being measured, called with the result of *setup*
+        :type run: Callable
+        :param setup: Prepares the input of *run*, untimed
+        :type setup: Callable
+        :param items: Number of items processed per run, for the throughput, or a function
+            of the result of *setup* that counts them
+        :type items: int | Callable
+        :param unit: What *items* counts
+        :type unit: str
+        :param modules: Modules that must be importable
+        :type modules: Iterable[str]
+        :param executables: Programs that must be on the PATH
+        :type executables: Iterable[str]
+        """
+        self.name = name
+        self.group = group
+        self.run = run
+        self.setup = setup
+        self.items = items
+        self.unit = unit
+        self.modules = tuple(modules)
+        self.executables = tuple(executables)
+
+    def missing_requirements(self) -> list[str]:
+        """The required modules and executables that aren't available."""
+        missing = [module for module in self.modules if importlib.util.find_spec(module) is None]
+        missing += [executable for executable in self.executables if shutil.which(executable) is None]
+        return missing
+
+
+def machine_info() -> dict:
+    """Describes where results were measured, as results are only comparable on the same machine."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmark(benchmark: Benchmark, repeat: int = 3, max_seconds: float = 60) -> dict:
+    """
+    Time *benchmark* up to *repeat* times, stopping early once *max_seconds* have been spent.
+
+    Every run is profiled, so the result also breaks the time down by pipeline stage.
+
+    Returns
+    -------
+    dict
+        ``{'group', 'items', 'unit', 'runs', 'min_seconds', 'median_seconds',
+        'items_per_second', 'stages'}``, or ``{'group', 'skipped'}`` if requirements are missing.
+    """
+    missing = benchmark.missing_requirements()
+    if missing:
+        return {"group": benchmark.group, "skipped": f"missing {', '.join(missing)}"}
+
+    state = benchmark.setup() if benchmark.setup is not None else None
+    items = benchmark.items(state) if callable(benchmark.items) else benchmark.items
+    runs: list[float] = []
+    stages: dict[str, float] = {}
+    spent = 0.0
+    while len(runs) < max(repeat, 1) and (not runs or spent < max_seconds):
+        with Profiler(trace_memory=False) as profiler:
+            started = time.perf_counter()
+            benchmark.run(state)
+            elapsed = time.perf_counter() - started
+        runs.append(elapsed)
+        spent += elapsed
+        # The stage breakdown of the fastest run is kept
+        if elapsed == min(runs):
+            stages = {name: total["wall_seconds"] for name, total in profiler.summary().items()}
+
+    best = min(runs)
+    return {
+        "group": benchmark.group,
+        "items": items,
+        "unit": benchmark.unit,
+        "runs": [round(seconds, 6) for seconds in runs],
+        "min_seconds": round(best, 6),
+        "median_seconds": round(statistics.median(runs), 6),
+        "items_per_second": round(items / best, 1) if items and best > 0 else None,
+        "stages": stages,
+    }
+
+
+def run_benchmarks(
+    benchmarks: Iterable[Benchmark],
+    repeat: int = 3,
+    max_seconds: float = 60,
+    progress: Optional[Callable[[str, dict], None]] = None,
+) -> dict:
+    """
+    Run every benchmark, calling *progress* with the name and result of each.
+
+    Returns
+    -------
+    dict
+        ``{'created', 'machine', 'results': {name: result}}``, as saved by :func:`save_results`.
+    """
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = run_benchmark(benchmark, repeat, max_seconds)
+        if progress is not None:
+            progress(benchmark.name, results[benchmark.name])
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "results": results,
+    }
+
+
+def save_results(results: dict, path: pathlib.Path | str) -> pathlib.Path:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n")
+    return path
+
+
+def load_results(path: pathlib.Path | str) -> dict:
+    """
+    Read results written by :func:`save_results`.
+
+    Raises
+    ------
+    ValueError
+        If *path* does not hold benchmark results.
+    """
+    try:
+        results = json.loads(pathlib.Path(path).read_text())
+    except (OSError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Can't read benchmark results from {path}: {exc}") from exc
+    if not isinstance(results, dict) or "results" not in results:
+        raise ValueError(f"{path} does not hold benchmark results")
+    return results
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Compare the fastest run of every benchmark measured in both *baseline* and *current*.
+
+    A benchmark has regressed when it got slower by more than *threshold* (a fraction of the
+    baseline time) and takes at least ``MIN_COMPARED_SECONDS``.
+
+    Returns
+    -------
+    list[dict]
+        ``{'name', 'baseline_seconds', 'current_seconds', 'change', 'status'}`` per benchmark,
+        in the order of *current*. ``status`` is ``'regressed'``, ``'improved'``, ``'unchanged'``,
+        ``'new'``, ``'missing'`` (only in the baseline) or ``'skipped'``.
+    """
+    baseline_results = baseline["results"]
+    current_results = current["results"]
+
+    comparison = []
+    for name, result in current_results.items():
+        before = baseline_results.get(name)
+        if "skipped" in result or (before is not None and "skipped" in before):
+            comparison.append({"name": name, "status": "skipped"})
+            continue
+        if before is None:
+            comparison.append({"name": name, "current_seconds": result["min_seconds"], "status": "new"})
+            continue
+
+        change = result["min_seconds"] / before["min_seconds"] - 1 if before["min_seconds"] > 0 else 0.0
+        if max(result["min_seconds"], before["min_seconds"]) < MIN_COMPARED_SECONDS:
+            status = "unchanged"
+        elif change > threshold:
+            status = "regressed"
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "unchanged"
+        comparison.append(
+            {
+                "name": name,
+                "baseline_seconds": before["min_seconds"],
+                "current_seconds": result["min_seconds"],
+                "change": round(change, 4),
+                "status": status,
+            }
+        )
+
+    for name in baseline_results:
+        if name not in current_results:
+            comparison.append({"name": name, "status": "missing"})
+
+    return comparison
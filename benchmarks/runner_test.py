@@ -0,0 +1,46 @@
+from .runner import Benchmark, compare_results, load_results, run_benchmark, save_results
+
+
+def _results(**seconds: float) -> dict:
+    return {"machine": {}, "results": {name: {"min_seconds": value} for name, value in seconds.items()}}
+
+
+class TestRunBenchmark:
+    def test_times_every_run_with_its_stages(self) -> None:
+        calls = []
+        benchmark = Benchmark("notes.sum", "notes", calls.append, setup=lambda: [1, 2, 3], items=len)
+
+        result = run_benchmark(benchmark, repeat=2)
+
+        assert len(calls) == 2 and calls[0] == [1, 2, 3]
+        assert result["items"] == 3
+        assert len(result["runs"]) == 2
+        assert result["min_seconds"] <= result["median_seconds"]
+
+    def test_skips_missing_requirements(self) -> None:
+        benchmark = Benchmark(
+            "render.missing", "render", print, modules=["no_such_module"], executables=["no-such-program"]
+        )
+
+        assert run_benchmark(benchmark) == {"group": "render", "skipped": "missing no_such_module, no-such-program"}
+
+
+class TestCompareResults:
+    def test_statuses(self) -> None:
+        baseline = _results(slower=1.0, faster=1.0, same=1.0, tiny=0.001, gone=1.0)
+        current = _results(slower=1.3, faster=0.5, same=1.05, tiny=0.004, added=1.0)
+
+        statuses = {entry["name"]: entry["status"] for entry in compare_results(baseline, current, threshold=0.15)}
+
+        assert statuses == {
+            "slower": "regressed",
+            "faster": "improved",
+            "same": "unchanged",
+            "tiny": "unchanged",
+            "added": "new",
+            "gone": "missing",
+        }
+
+    def test_save_and_load(self, tmp_path) -> None:
+        results = _results(one=0.5)
+        assert load_results(save_results(results, tmp_path / "baseline.json")) == results
@@ -0,0 +1,299 @@
+import functools
+import math
+import pathlib
+
+import numpy as np
+
+from benchmarks.generators import NOTE_STREAMS, dense_chords, melody, write_midi
+from benchmarks.runner import Benchmark
+from src.converters.inference_backends import BACKEND_MODULES, DEFAULT_BACKEND, INFERENCE_BACKENDS
+from src.converters.midi_to_tabs import TabWriter, _assign_clusters, notes_to_guitar_tab
+from src.models.fingering_beam import assign_beam
+from src.models.note_array import STANDARD_TUNING, NoteArray
+from src.models.tuning import best_tuning
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+TEST_AUDIO_DIR = PROJECT_ROOT / "test_audio"
+SOUNDFONT = PROJECT_ROOT / "instruments" / "clean_acoustic.sf2"
+
+GROUPS = ("audio", "notes", "render")
+
+# Sizes of the synthetic note streams; the largest are only run when asked for
+NOTE_COUNTS = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_MAX_NOTES = 100_000
+
+# Notes of the synthetic MIDI files rendered to audio (a few minutes each)
+RENDER_NOTES = 500
+
+QUANTISATION = 150
+
+
+def _size_label(n_notes: int) -> str:
+    return f"1e{round(math.log10(n_notes))}"
+
+
+def note_benchmarks(work_dir: pathlib.Path, max_notes: int = DEFAULT_MAX_NOTES) -> list[Benchmark]:
+    """
+    Stress clustering, :class:`NoteCluster`, the beam search fingering and tab writing with
+    synthetic note streams of up to *max_notes* notes: a melody, dense strummed chords, and
+    melodies over long pedal notes.
+    """
+    benchmarks = []
+    for stream, generate in NOTE_STREAMS.items():
+        for n_notes in (count for count in NOTE_COUNTS if count <= max_notes):
+            case = f"{stream}.{_size_label(n_notes)}"
+            notes = functools.partial(generate, n_notes)
+
+            def clustered(notes=notes):
+                note_array = NoteArray(notes(), tuning=STANDARD_TUNING)
+                return note_array, note_array.cluster_bounds()
+
+            def fingered(notes=notes):
+                note_array, bounds = clustered(notes)
+                return _assign_clusters(note_array, bounds, QUANTISATION)
+
+            def cluster(notes: np.ndarray) -> None:
+                note_array = NoteArray(notes, tuning=STANDARD_TUNING)
+                note_array.check_playable()
+                note_array.cluster_bounds()
+
+            def write_tab(groups, path=work_dir / f"{stream}_{n_notes}.txt") -> None:
+                writer = TabWriter(path)
+                writer.write_groups(groups)
+                writer.close()
+
+            benchmarks += [
+                Benchmark(f"notes.clustering.{case}", "notes", cluster, setup=notes, items=n_notes),
+                Benchmark(
+                    f"notes.note_cluster.{case}",
+                    "notes",
+                    lambda state: _assign_clusters(*state, QUANTISATION),
+                    setup=clustered,
+                    items=n_notes,
+                ),
+                Benchmark(
+                    f"notes.tuning_search.{case}",
+                    "notes",
+                    lambda notes: best_tuning(notes["pitch"], capos=range(8)),
+                    setup=notes,
+                    items=n_notes,
+                ),
+                Benchmark(
+                    f"notes.beam.{case}",
+                    "notes",
+                    lambda state: assign_beam(*state, QUANTISATION),
+                    setup=clustered,
+                    items=n_notes,
+                ),
+                Benchmark(f"notes.tab_write.{case}", "notes", write_tab, setup=fingered, items=len, unit="columns"),
+                Benchmark(
+                    f"notes.tabs.{case}",
+                    "notes",
+                    lambda state, path=work_dir / f"{stream}_{n_notes}_tabs.txt": notes_to_guitar_tab(
+                        state, path, QUANTISATION
+                    ),
+                    setup=notes,
+                    items=n_notes,
+                ),
+            ]
+    return benchmarks
+
+
+@functools.lru_cache(maxsize=None)
+def _model(backend: str = DEFAULT_BACKEND):
+    from src.converters.audio_to_midi import load_model
+
+    return load_model(backend=backend)
+
+
+@functools.lru_cache(maxsize=None)
+def _audio(audio_path: pathlib.Path) -> np.ndarray:
+    from src.converters.audio_decode import load_audio
+
+    return load_audio(audio_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _model_output(audio_path: pathlib.Path) -> dict[str, np.ndarray]:
+    from src.converters.model_windows import run_model
+
+    return run_model(_model(), _audio(audio_path))
+
+
+def _note_events(audio_path: pathlib.Path) -> list:
+    from src.converters.audio_to_midi import NoteExtractor
+
+    return NoteExtractor(_model_output(audio_path)).extract(0.5, 0.4, QUANTISATION)[1]
+
+
+def audio_benchmarks(work_dir: pathlib.Path, audio_dir: pathlib.Path = TEST_AUDIO_DIR) -> list[Benchmark]:
+    """Every stage, and the whole transcription, of each bundled test recording."""
+    from src.pipeline.inputs import AUDIO_SUFFIXES
+
+    benchmarks = []
+    for audio_path in sorted(path for path in audio_dir.iterdir() if path.suffix.lower() in AUDIO_SUFFIXES):
+        case = audio_path.stem
+
+        def decode(_, audio_path=audio_path) -> None:
+            from src.converters.audio_decode import load_audio
+
+            load_audio(audio_path)
+
+        def primed_cache(audio_path=audio_path):
+            from src.cache.audio_cache import DecodedAudioCache
+            from src.converters.audio_decode import load_audio
+
+            cache = DecodedAudioCache(work_dir / "audio_cache")
+            load_audio(audio_path, cache=cache)
+            return cache
+
+        def cached_decode(cache, audio_path=audio_path) -> None:
+            from src.converters.audio_decode import load_audio
+
+            # Page in every sample, as the model will
+            np.asarray(load_audio(audio_path, cache=cache)).sum()
+
+        def infer(audio: np.ndarray, backend: str = DEFAULT_BACKEND) -> None:
+            from src.converters.model_windows import run_model
+
+            run_model(_model(backend), audio)
+
+        def extract(model_output: dict[str, np.ndarray]) -> None:
+            from src.converters.audio_to_midi import NoteExtractor
+
+            NoteExtractor(model_output).extract(0.5, 0.4, QUANTISATION)
+
+        def transcribe(_, audio_path=audio_path) -> None:
+            from src.converters.audio_to_midi import predict_midi
+
+            _, note_events = predict_midi(
+                audio_path, model=_model(), onset_threshold=0.5, frame_threshold=0.4, minimum_note_length=QUANTISATION
+            )
+            notes_to_guitar_tab(note_events, work_dir / f"{audio_path.stem}.txt", QUANTISATION)
+
+        benchmarks += [
+            Benchmark(
+                f"audio.decode.{case}",
+                "audio",
+                decode,
+                setup=functools.partial(_audio, audio_path),
+                items=len,
+                unit="samples",
+                modules=["librosa"],
+            ),
+            Benchmark(
+                f"audio.cached_decode.{case}",
+                "audio",
+                cached_decode,
+                setup=primed_cache,
+                modules=["librosa"],
+            ),
+            Benchmark(
+                f"audio.inference.{case}",
+                "audio",
+                infer,
+                setup=functools.partial(_audio, audio_path),
+                items=len,
+                unit="samples",
+                modules=["basic_pitch"],
+            ),
+            *(
+                Benchmark(
+                    f"audio.inference_{backend}.{case}",
+                    "audio",
+                    functools.partial(infer, backend=backend),
+                    setup=functools.partial(_audio, audio_path),
+                    items=len,
+                    unit="samples",
+                    modules=["basic_pitch", BACKEND_MODULES[backend]],
+                )
+                for backend in INFERENCE_BACKENDS
+                if backend != DEFAULT_BACKEND
+            ),
+            Benchmark(
+                f"audio.note_extraction.{case}",
+                "audio",
+                extract,
+                setup=functools.partial(_model_output, audio_path),
+                items=lambda model_output: len(model_output["note"]),
+                unit="frames",
+                modules=["basic_pitch"],
+            ),
+            Benchmark(
+                f"audio.tabs.{case}",
+                "audio",
+                lambda note_events, path=work_dir / f"{case}_notes.txt": notes_to_guitar_tab(
+                    note_events, path, QUANTISATION
+                ),
+                setup=functools.partial(_note_events, audio_path),
+                items=len,
+                modules=["basic_pitch"],
+            ),
+            Benchmark(
+                f"audio.pipeline.{case}",
+                "audio",
+                transcribe,
+                setup=functools.partial(_audio, audio_path),
+                items=len,
+                unit="samples",
+                modules=["basic_pitch"],
+            ),
+        ]
+    return benchmarks
+
+
+def render_benchmarks(work_dir: pathlib.Path, soundfont: pathlib.Path = SOUNDFONT) -> list[Benchmark]:
+    """Render synthetic MIDI files with every ``midi_to_audio`` path: WAV, streamed MP3 and in-process."""
+    from src.converters.midi_to_audio import render_midi_to_audio
+
+    benchmarks = []
+    for case, generate in (("melody", melody), ("chords", dense_chords)):
+        midi_path = work_dir / f"render_{case}.mid"
+
+        def midi(midi_path=midi_path, generate=generate) -> pathlib.Path:
+            return write_midi(generate(RENDER_NOTES), midi_path)
+
+        def render(midi_path: pathlib.Path, **kwargs) -> None:
+            render_midi_to_audio(midi_path, work_dir / "render", soundfont, **kwargs)
+
+        benchmarks += [
+            Benchmark(
+                f"render.wav.{case}",
+                "render",
+                functools.partial(render, generate_wav=True),
+                setup=midi,
+                items=RENDER_NOTES,
+                executables=["fluidsynth"],
+            ),
+            Benchmark(
+                f"render.mp3_stream.{case}",
+                "render",
+                functools.partial(render, generate_mp3=True),
+                setup=midi,
+                items=RENDER_NOTES,
+                executables=["fluidsynth", "ffmpeg"],
+            ),
+            Benchmark(
+                f"render.inprocess_wav.{case}",
+                "render",
+                functools.partial(render, generate_wav=True, backend="inprocess"),
+                setup=midi,
+                items=RENDER_NOTES,
+                modules=["fluidsynth"],
+            ),
+        ]
+    return benchmarks
+
+
+def build_benchmarks(
+    work_dir: pathlib.Path, groups: tuple[str, ...] = GROUPS, max_notes: int = DEFAULT_MAX_NOTES
+) -> list[Benchmark]:
+    """All benchmarks of *groups*, writing their output under *work_dir*."""
+    benchmarks = []
+    if "audio" in groups:
+        benchmarks += audio_benchmarks(work_dir)
+    if "notes" in groups:
+        benchmarks += note_benchmarks(work_dir, max_notes)
+    if "render" in groups:
+        benchmarks += render_benchmarks(work_dir)
+    return benchmarks
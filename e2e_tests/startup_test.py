@@ -0,0 +1,74 @@
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+# Seconds `run.py -h` may take. Importing basic_pitch (TensorFlow) alone takes several times this.
+COLD_START_BUDGET = 1.0
+
+# Libraries that must only be imported by the stage that needs them
+HEAVY_MODULES = ["basic_pitch", "tensorflow", "librosa", "pretty_midi", "mido", "pydub", "fluidsynth"]
+
+
+class TestStartup:
+    """Guards the start-up time of run.py against eager imports of the heavy libraries"""
+
+    def setup_method(self) -> None:
+        self.project_root = Path(__file__).resolve().parents[1]
+
+    def test_help_is_within_cold_start_budget(self) -> None:
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, "run.py", "-h"], cwd=self.project_root, capture_output=True, text=True
+            )
+            timings.append(time.perf_counter() - started)
+            assert result.returncode == 0, f"CLI failed:\n{result.stderr}"
+
+        assert min(timings) < COLD_START_BUDGET, f"run.py -h took {min(timings):.2f}s"
+
+    def test_parsers_do_not_import_heavy_libraries(self) -> None:
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, run; run.build_parser(); run.build_batch_parser(); run.build_live_parser(); "
+                "run.build_serve_parser(); run.build_render_parser(); "
+                "print(' '.join(sys.modules))",
+            ],
+            cwd=self.project_root,
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, f"Importing run.py failed:\n{result.stderr}"
+
+        loaded = {name.split(".")[0] for name in result.stdout.split()}
+        assert not loaded.intersection(HEAVY_MODULES)
+
+    def test_midi_command_does_not_import_heavy_libraries(self, tmp_path) -> None:
+        # A single E4 quarter note
+        track = bytes([0x00, 0x90, 0x40, 0x64, 0x83, 0x60, 0x80, 0x40, 0x00, 0x00, 0xFF, 0x2F, 0x00])
+        header = b"MThd" + (6).to_bytes(4, "big") + bytes([0, 0, 0, 1, 0x01, 0xE0])
+        midi_path = tmp_path / "riff.mid"
+        midi_path.write_bytes(header + b"MTrk" + len(track).to_bytes(4, "big") + track)
+
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, run; code = run.main(sys.argv[1:]); print(' '.join(sys.modules)); sys.exit(code)",
+                "midi",
+                str(midi_path),
+                "-o",
+                str(tmp_path / "out"),
+            ],
+            cwd=self.project_root,
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, f"CLI failed:\n{result.stderr}"
+        assert (tmp_path / "out" / "riff.txt").exists()
+
+        loaded = {name.split(".")[0] for name in result.stdout.split()}
+        assert not loaded.intersection(HEAVY_MODULES)
@@ -5,6 +5,11 @@
 CLI entry point:
 
     $ python run.py -i <audio>.mp3 -o <output_dir> [options]
+    $ python run.py batch <dir | glob | manifest> -o <output_dir> [--workers N | --pipelined] [options]
+    $ python run.py midi <file | dir | glob | manifest> -o <output_dir> [--workers N]
+    $ ffmpeg -i <audio> -f f32le -ac 1 -ar 22050 - | python run.py live [--tab-out <file>]
+    $ python run.py serve [--port 8765 | --socket <path>] [--workers N] -o <output_dir>
+    $ python run.py render <file | dir | glob | manifest> -o <output_dir> [--soundfont <sf2> ...] [--gen-format mp3]
 
 The script:
     Calls :func:`interpret_audio.predict_to_midi`
@@ -13,21 +18,122 @@ The script:
 """
 
 import argparse
+import json
+import os
 import pathlib
 import sys
+import time
 
-from src.converters.midi_to_tabs import midi_to_guitar_tab
-from src.converters.audio_to_midi import predict_to_midi
-from src.converters.midi_to_audio import render_midi_to_audio
+# Only light modules are imported up front. The stages pull in basic_pitch (and with it
+# TensorFlow), pretty_midi and pydub, so they are imported when they actually run.
+from src.converters.inference_backends import DEFAULT_BACKEND, INFERENCE_BACKENDS
+from src.converters.midi_to_audio import AUDIO_FORMATS, RENDER_BACKENDS
+from src.converters.render_pool import DEFAULT_RENDER_TIMEOUT
+from src.converters.midi_to_tabs import AUTO_TUNING, FINGERING_ENGINES
+from src.models.fingering_beam import BEAM_WIDTH
+from src.models.tuning import TUNINGS
+from src.cache.audio_cache import DEFAULT_AUDIO_CACHE_DIR
+from src.cache.posteriorgram_cache import DEFAULT_POSTERIORGRAM_DIR
+from src.pipeline.settings import DEFAULT_SOUNDFONT, PipelineSettings
+from src.profiling.profiler import PROFILE_FORMATS, Profiler, stage
 
 
-def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Run basic_pitch → MIDI → audio (wav/mp3) pipeline.")
+def _add_render_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options of the audio previews, shared by the transcribing commands and `render`."""
     parser.add_argument(
-        "input",
+        "--soundfont",
         type=pathlib.Path,
-        help="Path to the input audio (mp3, wav, …).",
+        action="append",
+        default=None,
+        help=f"Path to a .sf2 SoundFont; repeat to render with several at once (default: {DEFAULT_SOUNDFONT}, "
+        "an acoustic guitar).",
+    )
+    parser.add_argument(
+        "--gen-format",
+        choices=AUDIO_FORMATS,
+        action="append",
+        default=None,
+        help="Additionally render audio in this format; repeat for several.",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=None,
+        help="Renders (fluidsynth processes) run at the same time (default: one per CPU core).",
+    )
+    parser.add_argument(
+        "--render-timeout",
+        type=float,
+        default=DEFAULT_RENDER_TIMEOUT,
+        help=f"Seconds after which a render is killed (default: {DEFAULT_RENDER_TIMEOUT}).",
+    )
+
+
+def _add_tab_arguments(parser: argparse.ArgumentParser, auto_tuning: bool = True) -> None:
+    """
+    Options of the fingering, tuning and capo, shared by every command that writes tabs. Only
+    commands that have every note before tabbing offer ``--tuning auto``.
+    """
+    parser.add_argument(
+        "--fingering-cache-size",
+        type=int,
+        default=4096,
+        help="Number of distinct phrases whose fingering is remembered and reused (default: 4096, 0 disables).",
     )
+    parser.add_argument(
+        "--fingering",
+        choices=FINGERING_ENGINES,
+        default="greedy",
+        help="How strings and frets are chosen: 'greedy' takes the lowest free fret of every note, 'beam' "
+        "searches for the fingering with the least hand movement over the whole piece (default: greedy).",
+    )
+    parser.add_argument(
+        "--beam-width",
+        type=int,
+        default=BEAM_WIDTH,
+        help=f"Fingerings kept at every step of the search with --fingering beam (default: {BEAM_WIDTH}).",
+    )
+    parser.add_argument(
+        "--tuning",
+        choices=[*TUNINGS, AUTO_TUNING] if auto_tuning else list(TUNINGS),
+        default="standard",
+        help="Tuning the tab is written for"
+        + (", or 'auto' for the one that plays the notes best" if auto_tuning else "")
+        + " (default: standard).",
+    )
+    parser.add_argument(
+        "--capo",
+        type=int,
+        default=0,
+        help="Fret of the capo; frets in the tab count from it (default: 0).",
+    )
+
+
+def _add_inference_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options of the model runtime, shared by every command that transcribes audio."""
+    parser.add_argument(
+        "--backend",
+        choices=INFERENCE_BACKENDS,
+        default=DEFAULT_BACKEND,
+        help="Serialization of the model and the runtime it runs on: 'tf' (TensorFlow SavedModel), 'onnx' "
+        f"(ONNX Runtime) or 'tflite' (default: {DEFAULT_BACKEND}).",
+    )
+    parser.add_argument(
+        "--intra-op-threads",
+        type=int,
+        default=None,
+        help="Threads each model operation is split across (default: the runtime's choice, usually one per core).",
+    )
+    parser.add_argument(
+        "--inter-op-threads",
+        type=int,
+        default=None,
+        help="Model operations run at the same time; not used by tflite (default: the runtime's choice).",
+    )
+
+
+def _add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by the single-file and the batch commands."""
     parser.add_argument(
         "-o",
         "--output-dir",
@@ -35,12 +141,8 @@ def build_parser() -> argparse.ArgumentParser:
         default=pathlib.Path("./output"),
         help="Directory where MIDI, Tab, WAV and MP3 will be written (default: ./output).",
     )
-    parser.add_argument(
-        "--soundfont",
-        type=pathlib.Path,
-        default=pathlib.Path("./instruments/clean_acoustic.sf2"),
-        help="Path to a .sf2 SoundFont. Default is an acoustic guitar",
-    )
+    _add_render_arguments(parser)
+    _add_inference_arguments(parser)
     parser.add_argument(
         "--gen-wav",
         action="store_true",
@@ -51,6 +153,13 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Additionally generated MP3 audio from the midi file.",
     )
+    parser.add_argument(
+        "--render-backend",
+        choices=RENDER_BACKENDS,
+        default="cli",
+        help="How WAV/MP3 are rendered: 'cli' runs fluidsynth per file, 'inprocess' keeps SoundFonts loaded "
+        "through pyfluidsynth, 'auto' uses pyfluidsynth if it is installed (default: cli).",
+    )
     parser.add_argument(
         "--onset-threshold",
         type=float,
@@ -64,25 +173,699 @@ def build_parser() -> argparse.ArgumentParser:
         help="Tuning parameter determining how much energy is required for a frame to register.",
     )
     parser.add_argument("--min-note-length", type=float, default=150, help="Minimum note length in ms.")
+    parser.add_argument(
+        "--skip-silence",
+        action="store_true",
+        help="Don't run the model on silent stretches such as long pauses and count-ins. A quick loudness pass "
+        "finds them first. The notes keep their timing.",
+    )
+    parser.add_argument(
+        "--silence-threshold-db",
+        type=float,
+        default=-45.0,
+        help="Level below the loudest part of the recording that counts as silence with --skip-silence "
+        "(default: -45).",
+    )
+    parser.add_argument(
+        "--no-midi",
+        action="store_true",
+        help="Don't write the .mid file, tabs are generated from the transcription in memory. "
+        "The MIDI file is still written when WAV or MP3 output is requested.",
+    )
+    parser.add_argument(
+        "--tab-workers",
+        type=int,
+        default=1,
+        help="Processes used to work out the fingering of long pieces (default: 1). "
+        "Pieces with few notes are always done in a single process.",
+    )
+    _add_tab_arguments(parser)
+    parser.add_argument(
+        "--cache-dir",
+        type=pathlib.Path,
+        default=DEFAULT_POSTERIORGRAM_DIR,
+        help="Where raw model output is cached, so re-tuning the thresholds skips the model "
+        f"(default: {DEFAULT_POSTERIORGRAM_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=int,
+        default=2048,
+        help="Size the model output cache is trimmed to, least recently used first (default: 2048).",
+    )
+    parser.add_argument(
+        "--audio-cache-dir",
+        type=pathlib.Path,
+        default=DEFAULT_AUDIO_CACHE_DIR,
+        help="Where decoded input audio is cached, so every file is only decoded and resampled once "
+        f"(default: {DEFAULT_AUDIO_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--audio-cache-size-mb",
+        type=int,
+        default=2048,
+        help="Size the decoded audio cache is trimmed to, least recently used first (default: 2048).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always decode the audio and run the model, without reading or writing the caches.",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run basic_pitch → MIDI → audio (wav/mp3) pipeline.",
+        epilog="Run `run.py batch -h` for transcribing many files at once, "
+        "`run.py midi -h` for turning existing MIDI files into tabs, "
+        "`run.py live -h` for tabs while audio is being played, "
+        "or `run.py serve -h` for a service that keeps the model loaded between jobs.",
+    )
+    parser.add_argument(
+        "input",
+        type=pathlib.Path,
+        help="Path to the input audio (mp3, wav, …).",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        metavar="NAME=START:STOP:STEP",
+        help="Write one MIDI/tab per setting instead of a single result, e.g. --sweep onset=0.3:0.8:0.05. "
+        "NAME is onset, frame or min-note-length; values may also be a comma separated list. "
+        "Repeat to sweep a grid. The model only runs once per sweep.",
+    )
+    parser.add_argument(
+        "--long",
+        action="store_true",
+        help="Transcribe in chunks, writing MIDI and tabs as it goes, so memory use does not grow with "
+        "the length of the recording. For recordings of an hour or more.",
+    )
+    parser.add_argument(
+        "--chunk-seconds",
+        type=float,
+        default=60,
+        help="Length of the chunks transcribed at a time with --long (default: 60).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        default=None,
+        metavar="PATH",
+        help="Record the wall time, CPU time, peak memory and item counts of every stage and write them to PATH.",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=PROFILE_FORMATS,
+        default="json",
+        help="'json' for a list of stages with totals per stage, 'chrome' for a trace that chrome://tracing "
+        "and Perfetto can open (default: json).",
+    )
+    parser.add_argument(
+        "--no-profile-memory",
+        action="store_true",
+        help="Don't trace memory with --profile. Tracing slows down allocation-heavy stages.",
+    )
+    _add_pipeline_arguments(parser)
 
     return parser
 
 
+def build_batch_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py batch",
+        description="Run the pipeline over many audio files, loading the model once per worker process.",
+    )
+    parser.add_argument(
+        "source",
+        help="Directory (searched recursively), glob pattern, or manifest (.txt/.lst with one path per line).",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--report",
+        type=pathlib.Path,
+        default=None,
+        help="Where to write the per-file JSON status report (default: <output_dir>/batch_report.json).",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Use a single process that decodes, transcribes and tabs/renders consecutive files at the same time, "
+        "instead of --workers processes each doing whole files. Needs one copy of the model instead of one per "
+        "worker.",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=1,
+        help="Files waiting between two stages with --pipelined, which bounds memory use (default: 1).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every output. By default only the MIDI, tabs and audio whose input or settings changed since "
+        "the last run are rebuilt, as recorded in <output_dir>/build_manifest.json. --pipelined always rebuilds "
+        "everything.",
+    )
+    _add_pipeline_arguments(parser)
+
+    return parser
+
+
+def batch_main(argv: list[str]) -> int:
+    args = build_batch_parser().parse_args(argv)
+
+    from src.pipeline.batch import REPORT_NAME, run_batch
+    from src.pipeline.inputs import collect_inputs, output_dirs
+
+    out_dir = args.output_dir.expanduser().resolve()
+    try:
+        inputs = collect_inputs(args.source)
+        output_dirs(inputs, out_dir)  # refuse inputs that would overwrite each other's outputs
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    if args.pipelined:
+        from src.pipeline.pipelined import run_pipelined_batch
+
+        report = run_pipelined_batch(
+            inputs,
+            out_dir,
+            PipelineSettings.from_args(args),
+            queue_depth=args.queue_depth,
+            report_path=args.report,
+        )
+    else:
+        report = run_batch(
+            inputs,
+            out_dir,
+            PipelineSettings.from_args(args),
+            workers=max(1, min(args.workers, len(inputs))),
+            report_path=args.report,
+            force=args.force,
+        )
+
+    failed = [entry for entry in report if entry["status"] != "ok"]
+    print("\n=== Summary ===")
+    print(f"Processed     : {len(report)}")
+    print(f"Failed        : {len(failed)}")
+    if not args.pipelined:
+        print(f"Up to date    : {sum(1 for entry in report if entry['status'] == 'ok' and not entry['built'])}")
+    print(f"Report        : {args.report or out_dir / REPORT_NAME}")
+
+    return 1 if failed else 0
+
+
+def build_midi_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py midi",
+        description="Turn existing MIDI files into tabs. Skips audio entirely and imports no ML libraries.",
+    )
+    parser.add_argument(
+        "source",
+        help="MIDI file, directory (searched recursively), glob pattern, or manifest (.txt/.lst with one path "
+        "per line).",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=pathlib.Path,
+        default=pathlib.Path("./output"),
+        help="Directory where the tabs will be written (default: ./output).",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1). Worth it from a few hundred files.",
+    )
+    parser.add_argument(
+        "--quantisation",
+        type=float,
+        default=150,
+        help="Window in ms within which notes are considered to be played together (default: 150).",
+    )
+    _add_tab_arguments(parser)
+    parser.add_argument(
+        "--report",
+        type=pathlib.Path,
+        default=None,
+        help="Where to write the per-file JSON status report (default: <output_dir>/midi_report.json).",
+    )
+
+    return parser
+
+
+def midi_main(argv: list[str]) -> int:
+    args = build_midi_parser().parse_args(argv)
+
+    from src.pipeline.inputs import MIDI_SUFFIXES, collect_inputs, output_dirs
+    from src.pipeline.midi_tabs import REPORT_NAME, run_midi_batch
+
+    out_dir = args.output_dir.expanduser().resolve()
+    try:
+        inputs = collect_inputs(args.source, suffixes=MIDI_SUFFIXES)
+        output_dirs(inputs, out_dir)  # refuse inputs that would overwrite each other's tabs
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    report = run_midi_batch(
+        inputs,
+        out_dir,
+        PipelineSettings(
+            min_note_length=args.quantisation,
+            fingering_cache_size=args.fingering_cache_size,
+            fingering_engine=args.fingering,
+            beam_width=args.beam_width,
+            tuning=args.tuning,
+            capo=args.capo,
+        ),
+        workers=max(1, min(args.workers, len(inputs))),
+        report_path=args.report,
+    )
+    elapsed = time.perf_counter() - started
+
+    failed = [entry for entry in report if entry["status"] != "ok"]
+    print("\n=== Summary ===")
+    print(f"Converted     : {len(report) - len(failed)}")
+    print(f"Failed        : {len(failed)}")
+    print(f"Throughput    : {len(report) / elapsed * 60:.0f} files/min")
+    print(f"Report        : {args.report or out_dir / REPORT_NAME}")
+
+    return 1 if failed else 0
+
+
+def build_live_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py live",
+        description="Write tabs while audio is being played. Reads raw mono PCM at 22050 Hz, e.g. "
+        "`ffmpeg -i <input> -f f32le -ac 1 -ar 22050 - | python run.py live`.",
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default="-",
+        help="File or named pipe to read the PCM from (default: - for stdin).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("f32le", "s16le"),
+        default="f32le",
+        help="Sample format of the PCM (default: f32le).",
+    )
+    parser.add_argument(
+        "--block-samples",
+        type=int,
+        default=1024,
+        help="Samples read at a time (default: 1024, about 46 ms).",
+    )
+    parser.add_argument(
+        "--tab-out",
+        type=pathlib.Path,
+        default=None,
+        help="File the tab is appended to as it is written (default: stdout).",
+    )
+    parser.add_argument(
+        "--report",
+        type=pathlib.Path,
+        default=None,
+        help="Where to write the latency report as JSON (default: only printed).",
+    )
+    parser.add_argument(
+        "--onset-threshold",
+        type=float,
+        default=0.5,
+        help="Tuning parameter determining how much energy is required for a note to register.",
+    )
+    parser.add_argument(
+        "--frame-threshold",
+        type=float,
+        default=0.4,
+        help="Tuning parameter determining how much energy is required for a frame to register.",
+    )
+    parser.add_argument("--min-note-length", type=float, default=150, help="Minimum note length in ms.")
+    _add_tab_arguments(parser, auto_tuning=False)
+
+    _add_inference_arguments(parser)
+
+    return parser
+
+
+def live_main(argv: list[str]) -> int:
+    args = build_live_parser().parse_args(argv)
+
+    from src.pipeline.live import run_live
+
+    settings = PipelineSettings(
+        onset_threshold=args.onset_threshold,
+        frame_threshold=args.frame_threshold,
+        min_note_length=args.min_note_length,
+        fingering_cache_size=args.fingering_cache_size,
+        fingering_engine=args.fingering,
+        beam_width=args.beam_width,
+        tuning=args.tuning,
+        capo=args.capo,
+        backend=args.backend,
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+    )
+    model = settings.load_model()
+
+    try:
+        source = sys.stdin.buffer if args.source == "-" else open(args.source, "rb")
+    except OSError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    out = sys.stdout if args.tab_out is None else args.tab_out.open("a")
+    try:
+        report = run_live(source, out, model, settings, sample_format=args.format, block_samples=args.block_samples)
+    except Exception as exc:
+        print(f"Live transcription failed: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    if args.report is not None:
+        args.report.write_text(json.dumps(report, indent=2))
+
+    # stdout carries the tab
+    latency = report["latency"]
+    print("\n=== Summary ===", file=sys.stderr)
+    print(f"Audio         : {report['audio_seconds']:.1f}s", file=sys.stderr)
+    print(f"Notes         : {report['notes']}", file=sys.stderr)
+    if report["real_time_factor"] is not None:
+        print(f"Real-time     : {report['real_time_factor']:.2f}x (processing / audio time)", file=sys.stderr)
+    if latency["columns"]:
+        print(
+            f"Latency       : mean {latency['mean_ms']:.0f} ms, p50 {latency['p50_ms']:.0f} ms, "
+            f"p95 {latency['p95_ms']:.0f} ms, max {latency['max_ms']:.0f} ms",
+            file=sys.stderr,
+        )
+
+    return 0
+
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py serve",
+        description="Run a transcription service that keeps the model loaded and queues jobs submitted over HTTP.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765).")
+    parser.add_argument(
+        "--socket",
+        type=pathlib.Path,
+        default=None,
+        help="Listen on this Unix socket instead of --host and --port.",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="Inference worker processes, each keeping its own copy of the model loaded (default: 1).",
+    )
+    parser.add_argument(
+        "--stage-workers",
+        type=int,
+        default=2,
+        help="Processes writing tabs and rendering audio while the next job is transcribed (default: 2).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=16,
+        help="Jobs that may wait for a worker; further jobs are refused with 503 until one starts (default: 16).",
+    )
+    parser.add_argument(
+        "--max-upload-mb", type=int, default=512, help="Largest audio upload accepted, in MB (default: 512)."
+    )
+    _add_pipeline_arguments(parser)
+
+    return parser
+
+
+def serve_main(argv: list[str]) -> int:
+    args = build_serve_parser().parse_args(argv)
+
+    import asyncio
+
+    from src.pipeline.service import TranscriptionService, serve
+
+    service = TranscriptionService(
+        args.output_dir,
+        PipelineSettings.from_args(args),
+        workers=max(1, args.workers),
+        stage_workers=max(1, args.stage_workers),
+        queue_size=max(1, args.queue_size),
+        max_upload_bytes=args.max_upload_mb << 20,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    except OSError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def build_render_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py render",
+        description="Render audio previews of MIDI files, with several SoundFonts and formats at once. Each render "
+        "is a fluidsynth process feeding one ffmpeg encoder per format, and renders run side by side.",
+    )
+    parser.add_argument(
+        "source",
+        help="MIDI file, directory (searched recursively), glob pattern, or manifest (.txt/.lst with one path "
+        "per line).",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=pathlib.Path,
+        default=pathlib.Path("./output"),
+        help="Directory where the audio will be written (default: ./output).",
+    )
+    _add_render_arguments(parser)
+    parser.add_argument(
+        "--report",
+        type=pathlib.Path,
+        default=None,
+        help="Where to write the per-render JSON status report (default: <output_dir>/render_report.json).",
+    )
+
+    return parser
+
+
+def render_main(argv: list[str]) -> int:
+    parser = build_render_parser()
+    args = parser.parse_args(argv)
+
+    from src.converters.render_pool import render_many
+    from src.pipeline.inputs import MIDI_SUFFIXES, collect_inputs
+
+    out_dir = args.output_dir.expanduser().resolve()
+    try:
+        inputs = collect_inputs(args.source, suffixes=MIDI_SUFFIXES)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    soundfonts = args.soundfont or [DEFAULT_SOUNDFONT]
+    formats = args.gen_format or ["mp3"]
+    total = len(inputs) * len(soundfonts)
+    finished = 0
+
+    def on_finished(status: dict) -> None:
+        nonlocal finished
+        finished += 1
+        print(f"[{finished}/{total}] {status['status']:7} {status['midi']} ({pathlib.Path(status['soundfont']).name})")
+
+    started = time.perf_counter()
+    report = render_many(
+        inputs,
+        out_dir,
+        soundfonts,
+        formats,
+        workers=args.render_workers,
+        timeout=args.render_timeout,
+        on_finished=on_finished,
+    )
+    elapsed = time.perf_counter() - started
+
+    report_path = args.report or out_dir / "render_report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2))
+
+    failed = [entry for entry in report if entry["status"] != "ok"]
+    print("\n=== Summary ===")
+    print(f"Rendered      : {len(report) - len(failed)}")
+    print(f"Failed        : {len(failed)}")
+    print(f"Throughput    : {len(report) / elapsed * 60:.0f} renders/min")
+    print(f"Report        : {report_path}")
+
+    return 1 if failed else 0
+
+
+COMMANDS = {"batch": batch_main, "midi": midi_main, "live": live_main, "serve": serve_main, "render": render_main}
+
+
+def sweep_main(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+    input_path: pathlib.Path,
+    out_dir: pathlib.Path,
+    settings: PipelineSettings,
+) -> int:
+    from src.pipeline.sweep import SUMMARY_NAME, run_sweep, sweep_grid
+
+    try:
+        grid = sweep_grid(args.sweep, settings)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    try:
+        rows = run_sweep(input_path, out_dir, settings, grid)
+    except Exception as exc:
+        print(f"basic_pitch failed: {exc}", file=sys.stderr)
+        return 1
+
+    print("\n=== Sweep ===")
+    print(f"{'onset':>6} {'frame':>6} {'min len':>8} {'notes':>6}  tab")
+    for row in rows:
+        print(
+            f"{row['onset_threshold']:>6g} {row['frame_threshold']:>6g} {row['min_note_length']:>8g} "
+            f"{row['notes']:>6}  {row['tab']}"
+        )
+    print(f"\nSummary written to {out_dir / f'{input_path.stem}_sweep' / SUMMARY_NAME}")
+
+    return 0
+
+
+def long_main(
+    args: argparse.Namespace, input_path: pathlib.Path, out_dir: pathlib.Path, settings: PipelineSettings
+) -> int:
+    from src.converters.long_audio import transcribe_long_audio
+
+    try:
+        result = transcribe_long_audio(
+            input_path,
+            out_dir,
+            model=settings.load_model(),
+            onset_threshold=args.onset_threshold,
+            frame_threshold=args.frame_threshold,
+            minimum_note_length=args.min_note_length,
+            chunk_seconds=args.chunk_seconds,
+            # The renderers read the MIDI file, so it is always written when rendering
+            write_midi=settings.write_midi or bool(settings.output_formats()),
+            fingering_cache=settings.fingering_cache(),
+            engine=settings.fingering_engine,
+            beam_width=settings.beam_width,
+            tuning=settings.tuning,
+            capo=settings.capo,
+        )
+    except Exception as exc:
+        print(f"Transcription failed: {exc}", file=sys.stderr)
+        return 1
+
+    render_result = {}
+    if settings.output_formats():
+        from src.converters.render_pool import render_midi
+
+        try:
+            render_result = render_midi(
+                result["midi"],
+                out_dir,
+                settings.soundfonts,
+                settings.output_formats(),
+                backend=settings.render_backend,
+                workers=settings.render_workers,
+                timeout=settings.render_timeout,
+            )
+        except Exception as exc:
+            print(f"Rendering failed: {exc}", file=sys.stderr)
+            return 1
+
+    print("\n=== Summary ===")
+    print(f"Input audio   : {input_path}")
+    print(f"Notes         : {result['notes']}")
+    print(f"MIDI file     : {result.get('midi', '(not written)')}")
+    print(f"Tab file      : {result['tab']}")
+    for key, path in render_result.items():
+        print(f"{key.upper() + ' file':<14}: {path}")
+
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+
     parser = build_parser()
     args = parser.parse_args(argv)
 
+    if args.profile is None:
+        return transcribe_main(parser, args)
+
+    with Profiler(trace_memory=not args.no_profile_memory) as profiler:
+        code = transcribe_main(parser, args)
+    profile_path = profiler.write(args.profile, args.profile_format)
+
+    print("\n=== Profile ===")
+    for name, total in sorted(profiler.summary().items(), key=lambda item: -item[1]["wall_seconds"]):
+        counts = ", ".join(f"{key}={value}" for key, value in total["counts"].items())
+        print(f"{name:<18}: {total['wall_seconds']:8.3f}s wall {total['cpu_seconds']:8.3f}s CPU  {counts}")
+    print(f"Profile file  : {profile_path}")
+
+    return code
+
+
+def transcribe_main(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
     # Resolve paths & defaults
     input_path = args.input.expanduser().resolve()
     out_dir = args.output_dir.expanduser().resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
-    soundfont = args.soundfont
+    settings = PipelineSettings.from_args(args)
+
+    if args.sweep:
+        if args.long:
+            parser.error("--sweep can't be combined with --long")
+        return sweep_main(parser, args, input_path, out_dir, settings)
+    if args.long:
+        if args.tuning == AUTO_TUNING:
+            parser.error("--tuning auto can't be combined with --long, as the notes are tabbed as they are found")
+        return long_main(args, input_path, out_dir, settings)
+
+    from src.converters.audio_to_midi import predict_midi
+    from src.converters.midi_to_tabs import notes_to_guitar_tab
 
     # Predict → MIDI
     try:
-        midi_path, note_events = predict_to_midi(
+        midi_obj, note_events = predict_midi(
             audio_path=input_path,
-            out_dir=out_dir,
+            model_path=settings.model_file(),
+            intra_op_threads=settings.intra_op_threads,
+            inter_op_threads=settings.inter_op_threads,
+            cache=settings.posteriorgram_cache(),
+            audio_cache=settings.audio_cache(),
+            silence_gate=settings.silence_gate(),
             onset_threshold=args.onset_threshold,
             frame_threshold=args.frame_threshold,
             minimum_note_length=args.min_note_length,
@@ -91,20 +874,42 @@ def main(argv: list[str] | None = None) -> int:
         print(f"basic_pitch failed: {exc}", file=sys.stderr)
         return 1
 
-    print(f"MIDI written to {midi_path}")
+    # The renderers read the MIDI file, so it is always written when rendering
+    midi_path = None
+    if settings.write_midi or settings.output_formats():
+        midi_path = out_dir / f"{input_path.stem}.mid"
+        with stage("midi_write", notes=len(note_events)):
+            midi_obj.write(str(midi_path))
+        print(f"MIDI written to {midi_path}")
 
     # Generate guitar tabs
-    tab_path = midi_to_guitar_tab(midi_path=midi_path, out_dir=out_dir, quantisation=args.min_note_length)
+    fingering_cache = settings.fingering_cache()
+    tab_path = notes_to_guitar_tab(
+        midi_obj,
+        out_dir / f"{input_path.stem}.txt",
+        quantisation=args.min_note_length,
+        workers=settings.tab_workers,
+        fingering_cache=fingering_cache,
+        engine=settings.fingering_engine,
+        beam_width=settings.beam_width,
+        tuning=settings.tuning,
+        capo=settings.capo,
+    )
 
     # Render → WAV / MP3
-    if args.gen_wav or args.gen_mp3:
+    render_result = {}
+    if midi_path is not None and settings.output_formats():
+        from src.converters.render_pool import render_midi
+
         try:
-            render_result = render_midi_to_audio(
-                midi_path=midi_path,
-                out_dir=out_dir,
-                soundfont_path=soundfont,
-                generate_wav=args.gen_wav,
-                generate_mp3=args.gen_mp3,
+            render_result = render_midi(
+                midi_path,
+                out_dir,
+                settings.soundfonts,
+                settings.output_formats(),
+                backend=settings.render_backend,
+                workers=settings.render_workers,
+                timeout=settings.render_timeout,
             )
         except Exception as exc:
             print(f"Rendering failed: {exc}", file=sys.stderr)
@@ -112,13 +917,14 @@ def main(argv: list[str] | None = None) -> int:
 
     print("\n=== Summary ===")
     print(f"Input audio   : {input_path}")
-    print(f"MIDI file     : {midi_path}")
+    print(f"MIDI file     : {midi_path or '(not written)'}")
     print(f"Tab file      : {tab_path}")
-    if args.gen_wav:
-        print(f"WAV file     : {render_result['wav']}")
-    if args.gen_mp3:
-        print(f"MP3 file     : {render_result['mp3']}")
+    for key, path in render_result.items():
+        print(f"{key.upper() + ' file':<14}: {path}")
     print(f"Detected notes: {len(note_events)}")
+    if fingering_cache is not None:
+        lookups = fingering_cache.hits + fingering_cache.misses
+        print(f"Fingering hits: {fingering_cache.hits}/{lookups} clusters ({fingering_cache.hit_rate:.0%})")
 
     return 0
 
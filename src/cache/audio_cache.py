@@ -0,0 +1,46 @@
+import pathlib
+from typing import Optional
+
+import numpy as np
+
+from src.cache.disk_cache import DEFAULT_CACHE_ROOT, DiskCache, hash_file, hash_key
+
+DEFAULT_AUDIO_CACHE_DIR = DEFAULT_CACHE_ROOT / "audio"
+
+
+class DecodedAudioCache(DiskCache):
+    """
+    On-disk cache of input audio decoded to mono float32 at the model sample rate.
+
+    Decoding a compressed file and resampling it is a large part of a run that misses the
+    posteriorgram cache, e.g. with another model or a new decoding step. Entries are
+    ``.npy`` files, which are memory-mapped when loaded, so reading a hit costs no copy
+    and the model only pages in the windows it reads.
+    """
+
+    def __init__(self, root: pathlib.Path | str = DEFAULT_AUDIO_CACHE_DIR, max_bytes: int = 2 << 30) -> None:
+        super().__init__(root=root, max_bytes=max_bytes, suffix=".npy")
+
+    @staticmethod
+    def key_for(audio_path: pathlib.Path | str, sample_rate: int, decoder: str = "librosa") -> str:
+        """Build the cache key from the audio content, the sample rate and the decoder that resampled it."""
+        return hash_key(hash_file(audio_path), sample_rate, decoder)
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached samples for *key* as a read-only memory map, or ``None`` on a miss."""
+        path = self.lookup(key)
+        if path is None:
+            return None
+
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):  # truncated or corrupt entry
+            path.unlink(missing_ok=True)
+            return None
+
+    def store(self, key: str, audio: np.ndarray) -> None:
+        """Store *audio* under *key*."""
+        tmp_path = self.reserve()
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(audio, dtype=np.float32))
+        self.commit(tmp_path, key)
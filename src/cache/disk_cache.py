@@ -0,0 +1,91 @@
+import hashlib
+import os
+import pathlib
+import tempfile
+from typing import Optional
+
+DEFAULT_CACHE_ROOT = pathlib.Path("~/.cache/audio-tab-generator").expanduser()
+
+
+def hash_file(path: pathlib.Path | str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of the file at *path*, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_key(*parts: object) -> str:
+    """Combine *parts* into a single cache key."""
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class DiskCache:
+    """
+    A content-addressed directory of files with size-bounded LRU eviction.
+
+    Every entry is a single file named after its key. Reading an entry refreshes
+    its modification time, so eviction (oldest modification time first) removes
+    the least recently used entries once the directory grows beyond *max_bytes*.
+    Writes go through a temporary file and an atomic rename, so several processes
+    can share the same cache directory.
+    """
+
+    def __init__(self, root: pathlib.Path | str, max_bytes: int, suffix: str) -> None:
+        """
+        :param root: Directory holding the cache entries, created if missing
+        :type root: pathlib.Path | str
+        :param max_bytes: Total size the cache is trimmed back to after every write
+        :type max_bytes: int
+        :param suffix: File suffix of the entries, e.g. ``".npz"``
+        :type suffix: str
+        """
+        self.root = pathlib.Path(root).expanduser()
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}{self.suffix}"
+
+    def lookup(self, key: str) -> Optional[pathlib.Path]:
+        """Return the path of the entry for *key* and mark it as recently used, or ``None`` on a miss."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def reserve(self) -> pathlib.Path:
+        """Return a fresh temporary path inside the cache to write a new entry to."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=f".tmp{self.suffix}")
+        os.close(fd)
+        return pathlib.Path(tmp_name)
+
+    def commit(self, tmp_path: pathlib.Path, key: str) -> pathlib.Path:
+        """Atomically move a written temporary file into place as the entry for *key*."""
+        path = self.path_for(key)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        for path in self.root.glob(f"*{self.suffix}"):
+            if ".tmp" in path.name:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+from src.converters.audio_decode import load_audio
+
+from .audio_cache import DecodedAudioCache
+from .disk_cache import DiskCache
+from .posteriorgram_cache import PosteriorgramCache
+
+
+class TestDiskCache:
+    def test_evicts_least_recently_used(self, tmp_path) -> None:
+        cache = DiskCache(tmp_path, max_bytes=300, suffix=".bin")
+        for age, key in enumerate(["old", "used", "new"]):
+            path = cache.reserve()
+            path.write_bytes(b"x" * 100)
+            cache.commit(path, key)
+            os.utime(cache.path_for(key), (age, age))
+
+        cache.lookup("old")  # refreshes "old", leaving "used" as the least recently used entry
+        cache.max_bytes = 250
+        cache.evict()
+
+        assert cache.lookup("used") is None
+        assert cache.lookup("old") is not None
+        assert cache.lookup("new") is not None
+
+
+class TestPosteriorgramCache:
+    def test_round_trip(self, tmp_path) -> None:
+        audio = tmp_path / "song.wav"
+        audio.write_bytes(b"not really audio")
+        cache = PosteriorgramCache(tmp_path / "cache")
+        key = cache.key_for(audio, "model", 80, 1700)
+        output = {"note": np.ones((3, 88), dtype=np.float32), "onset": np.zeros((3, 88), dtype=np.float32)}
+
+        assert cache.load(key) is None
+        cache.store(key, output)
+        loaded = cache.load(key)
+
+        assert loaded is not None
+        assert loaded.keys() == output.keys()
+        assert all(np.array_equal(loaded[k], output[k]) for k in output)
+        assert cache.key_for(audio, "model", 80, 1000) != key
+
+
+class TestDecodedAudioCache:
+    def setup_method(self) -> None:
+        self.samples = np.linspace(-1, 1, 1000, dtype=np.float32)
+
+    def test_hits_are_memory_mapped(self, tmp_path) -> None:
+        audio = tmp_path / "song.mp3"
+        audio.write_bytes(b"not really audio")
+        cache = DecodedAudioCache(tmp_path / "cache")
+        key = cache.key_for(audio, 22050)
+
+        assert cache.load(key) is None
+        cache.store(key, self.samples)
+        loaded = cache.load(key)
+
+        assert isinstance(loaded, np.memmap)
+        assert np.array_equal(loaded, self.samples)
+        assert cache.key_for(audio, 44100) != key
+
+    def test_load_audio_reads_the_cache_without_decoding(self, tmp_path) -> None:
+        audio = tmp_path / "song.mp3"
+        audio.write_bytes(b"not really audio, so decoding it would fail")
+        cache = DecodedAudioCache(tmp_path / "cache")
+        cache.store(cache.key_for(audio, 22050), self.samples)
+
+        assert np.array_equal(load_audio(audio, cache=cache), self.samples)
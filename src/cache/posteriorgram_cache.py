@@ -0,0 +1,58 @@
+import pathlib
+from typing import Optional
+
+import numpy as np
+
+from src.cache.disk_cache import DEFAULT_CACHE_ROOT, DiskCache, hash_file, hash_key
+
+DEFAULT_POSTERIORGRAM_DIR = DEFAULT_CACHE_ROOT / "posteriorgrams"
+
+
+class PosteriorgramCache(DiskCache):
+    """
+    On-disk cache of the raw basic_pitch model output (note, onset and contour
+    posteriorgrams) for an audio file.
+
+    The onset/frame thresholds and the minimum note length only affect note
+    extraction, so re-running with different values can skip the model entirely.
+    """
+
+    def __init__(self, root: pathlib.Path | str = DEFAULT_POSTERIORGRAM_DIR, max_bytes: int = 2 << 30) -> None:
+        super().__init__(root=root, max_bytes=max_bytes, suffix=".npz")
+
+    @staticmethod
+    def key_for(
+        audio_path: pathlib.Path | str,
+        model_path: pathlib.Path | str,
+        minimum_freq: Optional[float],
+        maximum_freq: Optional[float],
+        variant: Optional[str] = None,
+    ) -> str:
+        """
+        Build the cache key from the audio content, the model and the frequency range, and
+        the *variant* of inference if it doesn't run the model on all of the audio.
+        """
+        parts = [hash_file(audio_path), pathlib.Path(model_path).resolve(), minimum_freq, maximum_freq]
+        if variant is not None:
+            parts.append(variant)
+        return hash_key(*parts)
+
+    def load(self, key: str) -> Optional[dict[str, np.ndarray]]:
+        """Return the cached model output for *key*, or ``None`` on a miss."""
+        path = self.lookup(key)
+        if path is None:
+            return None
+
+        try:
+            with np.load(path) as data:
+                return {name: data[name] for name in data.files}
+        except (OSError, ValueError):  # truncated or corrupt entry
+            path.unlink(missing_ok=True)
+            return None
+
+    def store(self, key: str, model_output: dict[str, np.ndarray]) -> None:
+        """Store *model_output* under *key*."""
+        tmp_path = self.reserve()
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **model_output)
+        self.commit(tmp_path, key)
@@ -0,0 +1,112 @@
+import pathlib
+import shutil
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+from src.cache.audio_cache import DecodedAudioCache
+from src.profiling.profiler import stage
+
+# Sample rate of the basic_pitch model input
+MODEL_SAMPLE_RATE = 22050
+
+
+def decode_audio(
+    audio_path: pathlib.Path | str,
+    pcm_path: pathlib.Path | str,
+    sample_rate: int = MODEL_SAMPLE_RATE,
+) -> np.ndarray:
+    """
+    Decode *audio_path* to mono float32 PCM at *sample_rate* in *pcm_path*, and map it into memory.
+
+    ffmpeg writes the samples straight to disk, so neither decoding nor reading the result
+    needs memory in proportion to the length of the recording: pages of the returned
+    ``np.memmap`` are only loaded as they are accessed.
+
+    Returns
+    -------
+    np.ndarray
+        Read-only memory map of the samples.
+
+    Raises
+    ------
+    RuntimeError: If ffmpeg is missing or fails.
+    """
+    audio_path = pathlib.Path(audio_path).expanduser().resolve()
+    pcm_path = pathlib.Path(pcm_path).expanduser().resolve()
+
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg not found. Is it installed and on your PATH?")
+
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        "-i",
+        str(audio_path),
+        "-f",
+        "f32le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        str(pcm_path),
+    ]
+
+    with stage("audio_decode") as timed:
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(
+                f"ffmpeg failed to decode {audio_path} with error {e.returncode}:\nSTDERR: {e.stderr}"
+            ) from e
+
+        audio = open_pcm(pcm_path)
+        timed.count(samples=len(audio))
+
+    return audio
+
+
+def load_audio(
+    audio_path: pathlib.Path | str,
+    sample_rate: int = MODEL_SAMPLE_RATE,
+    cache: Optional[DecodedAudioCache] = None,
+) -> np.ndarray:
+    """
+    Decode *audio_path* to mono float32 samples at *sample_rate* in memory, the same way
+    ``basic_pitch.inference.run_inference`` reads its input.
+
+    With a *cache*, every file is only decoded once: later calls return the cached samples
+    as a read-only memory map.
+    """
+    key = None
+    if cache is not None:
+        with stage("audio_cache_load") as timed:
+            key = cache.key_for(audio_path, sample_rate)
+            audio = cache.load(key)
+            timed.count(hits=int(audio is not None))
+        if audio is not None:
+            return audio
+
+    import librosa
+
+    with stage("audio_decode") as timed:
+        audio, _ = librosa.load(str(audio_path), sr=sample_rate, mono=True)
+        timed.count(samples=len(audio))
+
+    if cache is not None and key is not None:
+        cache.store(key, audio)
+
+    return audio
+
+
+def open_pcm(pcm_path: pathlib.Path | str) -> np.ndarray:
+    """Memory-map raw mono float32 PCM written by :func:`decode_audio`."""
+    pcm_path = pathlib.Path(pcm_path)
+    if pcm_path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.float32)  # an empty file can't be memory-mapped
+    return np.memmap(pcm_path, dtype=np.float32, mode="r")
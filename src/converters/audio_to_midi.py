@@ -1,24 +1,291 @@
 import pathlib
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from basic_pitch.inference import predict
-from basic_pitch import ICASSP_2022_MODEL_PATH
+import numpy as np
+import pretty_midi
+
+from src.cache.audio_cache import DecodedAudioCache
+from src.cache.posteriorgram_cache import PosteriorgramCache
+from src.converters.audio_decode import load_audio
+from src.converters.inference_backends import load_backend_model, resolve_model_path
+from src.converters.model_windows import run_model
+from src.converters.silence import SilenceGate
+from src.profiling.profiler import stage
+
+# basic_pitch pulls in TensorFlow, so it is only imported once a model is needed
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+NoteEvent = tuple[float, float, int, float, Optional[list[int]]]
+
+# Lowest and highest frequency in Hz notes are extracted for, a guitar's range with some room either side
+MINIMUM_FREQ = 80
+MAXIMUM_FREQ = 1700
+
+
+def load_model(
+    model_path: Optional[pathlib.Path | str] = None,
+    *,
+    backend: Optional[str] = None,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+) -> "Model":
+    """
+    Load a basic_pitch model so it can be shared between many calls to
+    :func:`predict_to_midi` instead of being re-loaded for every file.
+
+    Without a *model_path*, basic_pitch's own model is loaded in the serialization of
+    *backend* (``tf``, ``onnx`` or ``tflite``, see :mod:`src.converters.inference_backends`),
+    run on *intra_op_threads* threads per operator and *inter_op_threads* operators at once.
+
+    Returns
+    -------
+    Model
+        The loaded model, or an ONNX Runtime or TFLite model with the same ``predict``.
+    """
+    with stage("model_load"):
+        return load_backend_model(resolve_model_path(model_path, backend), intra_op_threads, inter_op_threads)
+
+
+def infer_model_output(
+    audio_path: pathlib.Path | str,
+    *,
+    model_path: Optional[pathlib.Path | str] = None,
+    model: Optional["Model"] = None,
+    backend: Optional[str] = None,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+    cache: Optional[PosteriorgramCache] = None,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    silence_gate: Optional[SilenceGate] = None,
+    minimum_freq: float = MINIMUM_FREQ,
+    maximum_freq: float = MAXIMUM_FREQ,
+) -> dict[str, np.ndarray]:
+    """
+    Run the basic_pitch network on *audio_path*, or fetch its output from *cache*.
+
+    On a miss, the decoded audio is taken from *audio_cache* if it holds it. With a
+    *silence_gate*, the model skips the windows that hold no sound. The model is loaded as
+    :func:`load_model` does unless an already loaded *model* is given. Its output is cached
+    per model file, so every backend has its own entries.
+
+    Returns
+    -------
+    dict
+        ``{'note': array, 'onset': array, 'contour': array}``, one row per model frame.
+    """
+    model_path = resolve_model_path(model_path, backend)
+
+    key = None
+    if cache is not None:
+        with stage("cache_load") as timed:
+            variant = silence_gate.cache_key() if silence_gate is not None else None
+            key = cache.key_for(audio_path, model_path, minimum_freq, maximum_freq, variant)
+            model_output = cache.load(key)
+            timed.count(hits=int(model_output is not None))
+        if model_output is not None:
+            return model_output
+
+    # Decoded and run window by window exactly as basic_pitch's run_inference does, but as separate stages
+    audio = load_audio(audio_path, cache=audio_cache)
+    if model is None:
+        model = load_model(model_path, intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+    active_windows = None
+    if silence_gate is not None:
+        with stage("silence_gate") as timed:
+            active_windows = silence_gate.active_windows(audio)
+            timed.count(windows=len(active_windows), active_windows=int(active_windows.sum()))
+    with stage("model_inference") as timed:
+        model_output = run_model(model, audio, active_windows)
+        timed.count(samples=len(audio), frames=len(model_output["note"]))
+
+    if cache is not None and key is not None:
+        cache.store(key, model_output)
+
+    return model_output
+
+
+class NoteExtractor:
+    """
+    Decodes one model output into notes, repeatedly and with different thresholds.
+
+    The frequency masking and onset inference of ``basic_pitch`` do not depend on the
+    thresholds, so they are done once up front and only the threshold-dependent note
+    decoding runs per :meth:`extract` call. The results match ``basic_pitch.predict``.
+    """
+
+    def __init__(
+        self,
+        model_output: dict[str, np.ndarray],
+        minimum_freq: Optional[float] = MINIMUM_FREQ,
+        maximum_freq: Optional[float] = MAXIMUM_FREQ,
+        times: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        :param model_output: Raw model output, see :func:`infer_model_output`. It is not modified
+        :type model_output: dict[str, np.ndarray]
+        :param minimum_freq: Lowest frequency in Hz to extract notes for
+        :type minimum_freq: float
+        :param maximum_freq: Highest frequency in Hz to extract notes for
+        :type maximum_freq: float
+        :param times: Time in seconds of every frame, for output that does not start at the
+            beginning of the audio. Defaults to basic_pitch's frame times counted from 0
+        :type times: np.ndarray
+        """
+        from basic_pitch import note_creation
+
+        with stage("note_preparation", frames=len(model_output["note"])):
+            onsets, frames = note_creation.constrain_frequency(
+                np.array(model_output["onset"]), np.array(model_output["note"]), maximum_freq, minimum_freq
+            )
+            self.frames = frames
+            self.onsets = note_creation.get_infered_onsets(onsets, frames)
+            self.contours = model_output["contour"]
+            self.times = times if times is not None else note_creation.model_frames_to_time(self.contours.shape[0])
+
+    def extract(
+        self, onset_threshold: float, frame_threshold: float, minimum_note_length: float
+    ) -> tuple[pretty_midi.PrettyMIDI, list[NoteEvent]]:
+        """
+        Extract the notes for one set of thresholds.
+
+        Returns
+        -------
+        midi_obj : pretty_midi.PrettyMIDI
+            The extracted notes as MIDI.
+        note_events : list
+            The raw note‑event list.
+        """
+        from basic_pitch import note_creation
+        from basic_pitch.constants import AUDIO_SAMPLE_RATE, FFT_HOP
+
+        with stage("note_extraction") as timed:
+            estimated_notes = note_creation.output_to_notes_polyphonic(
+                self.frames,
+                self.onsets,
+                onset_thresh=onset_threshold,
+                frame_thresh=frame_threshold,
+                min_note_len=int(np.round(minimum_note_length / 1000 * (AUDIO_SAMPLE_RATE / FFT_HOP))),  # ms → frames
+                infer_onsets=False,  # already applied in __init__
+                max_freq=None,
+                min_freq=None,
+            )
+            note_events = [
+                (self.times[start], self.times[end], pitch, amplitude, bends)
+                for start, end, pitch, amplitude, bends in note_creation.get_pitch_bends(self.contours, estimated_notes)
+            ]
+            timed.count(notes=len(note_events))
+
+            return note_creation.note_events_to_midi(note_events), note_events
+
+
+def model_output_to_midi(
+    model_output: dict[str, np.ndarray],
+    *,
+    onset_threshold: float,
+    frame_threshold: float,
+    minimum_note_length: float,
+    minimum_freq: float = MINIMUM_FREQ,
+    maximum_freq: float = MAXIMUM_FREQ,
+) -> tuple[pretty_midi.PrettyMIDI, list[NoteEvent]]:
+    """
+    Extract notes from raw model output, exactly as ``basic_pitch.predict`` does.
+
+    *model_output* is left untouched, so it can be decoded again with other thresholds.
+
+    Returns
+    -------
+    midi_obj : pretty_midi.PrettyMIDI
+        The extracted notes as MIDI.
+    note_events : list
+        The raw note‑event list.
+    """
+    extractor = NoteExtractor(model_output, minimum_freq=minimum_freq, maximum_freq=maximum_freq)
+    return extractor.extract(onset_threshold, frame_threshold, minimum_note_length)
+
+
+def predict_midi(
+    audio_path: pathlib.Path | str,
+    *,
+    model_path: Optional[pathlib.Path | str] = None,
+    model: Optional["Model"] = None,
+    backend: Optional[str] = None,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+    cache: Optional[PosteriorgramCache] = None,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    silence_gate: Optional[SilenceGate] = None,
+    onset_threshold: float,
+    frame_threshold: float,
+    minimum_note_length: float,
+    minimum_freq: float = MINIMUM_FREQ,
+    maximum_freq: float = MAXIMUM_FREQ,
+) -> tuple[pretty_midi.PrettyMIDI, list[NoteEvent]]:
+    """
+    Run the basic_pitch model on *audio_path* and keep the result in memory.
+
+    If an already loaded *model* (see :func:`load_model`) is given it is used
+    instead of loading *model_path*, or basic_pitch's model for *backend* on
+    *intra_op_threads*/*inter_op_threads* threads. With a *cache*, the model output is reused
+    between runs on the same audio, so only note extraction is repeated when the
+    thresholds change, and with an *audio_cache* every file is only decoded once.
+    A *silence_gate* skips the model on silent stretches (see :class:`SilenceGate`).
+
+    Returns
+    -------
+    midi_obj : pretty_midi.PrettyMIDI
+        The transcription, ready to be written or turned into tabs.
+    note_events : list
+        The raw note‑event list returned by ``basic_pitch``.
+    """
+    audio_path = pathlib.Path(audio_path).expanduser().resolve()
+
+    # Run the model
+    model_output = infer_model_output(
+        audio_path,
+        model_path=model_path,
+        model=model,
+        backend=backend,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
+        cache=cache,
+        audio_cache=audio_cache,
+        silence_gate=silence_gate,
+        minimum_freq=minimum_freq,
+        maximum_freq=maximum_freq,
+    )
+
+    return model_output_to_midi(
+        model_output,
+        onset_threshold=onset_threshold,
+        frame_threshold=frame_threshold,
+        minimum_note_length=minimum_note_length,
+        minimum_freq=minimum_freq,
+        maximum_freq=maximum_freq,
+    )
 
 
 def predict_to_midi(
     audio_path: pathlib.Path | str,
     out_dir: pathlib.Path | str,
     *,
-    model_path: pathlib.Path | str = ICASSP_2022_MODEL_PATH,
+    model_path: Optional[pathlib.Path | str] = None,
+    model: Optional["Model"] = None,
+    backend: Optional[str] = None,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+    cache: Optional[PosteriorgramCache] = None,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    silence_gate: Optional[SilenceGate] = None,
     onset_threshold: float,
     frame_threshold: float,
     minimum_note_length: float,
-    minimum_freq: float = 80,
-    maximum_freq: float = 1700,
-) -> tuple[pathlib.Path, list[tuple[float, float, int, float, Optional[list[int]]]]]:
+    minimum_freq: float = MINIMUM_FREQ,
+    maximum_freq: float = MAXIMUM_FREQ,
+) -> tuple[pathlib.Path, list[NoteEvent]]:
     """
-    Run ``basic_pitch.predict`` on *audio_path* and write a ``.mid`` file
-    into *out_dir*.
+    Run the basic_pitch model on *audio_path* and write a ``.mid`` file
+    into *out_dir*. See :func:`predict_midi` for the parameters.
 
     Returns
     -------
@@ -31,15 +298,21 @@ def predict_to_midi(
     out_dir = pathlib.Path(out_dir).expanduser().resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Run the model
-    _, midi_obj, note_events = predict(
-        audio_path=audio_path,
-        model_or_model_path=model_path,
+    midi_obj, note_events = predict_midi(
+        audio_path,
+        model_path=model_path,
+        model=model,
+        backend=backend,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
+        cache=cache,
+        audio_cache=audio_cache,
+        silence_gate=silence_gate,
         onset_threshold=onset_threshold,
         frame_threshold=frame_threshold,
         minimum_note_length=minimum_note_length,
-        minimum_frequency=minimum_freq,
-        maximum_frequency=maximum_freq,
+        minimum_freq=minimum_freq,
+        maximum_freq=maximum_freq,
     )
 
     # Write the MIDI file
@@ -0,0 +1,159 @@
+import pathlib
+from typing import Optional
+
+import numpy as np
+import pretty_midi
+
+# Seconds rendered after the last event so that the final notes can ring out
+RELEASE_TAIL = 1.0
+
+DRUM_CHANNEL = 9
+DRUM_BANK = 128
+
+# Event kinds, in the order they are applied when they fall on the same sample.
+# Note-offs come before note-ons so that a repeated note is re-struck rather than cut off.
+PROGRAM, NOTE_OFF, PITCH_BEND, CONTROL_CHANGE, NOTE_ON = range(5)
+
+# (sample, kind, channel, data1, data2)
+SynthEvent = tuple[int, int, int, int, int]
+
+
+def schedule_events(midi_data: pretty_midi.PrettyMIDI, sample_rate: int) -> list[SynthEvent]:
+    """
+    Flatten *midi_data* into synth events sorted by the sample they happen at.
+
+    Instruments get MIDI channels the way ``pretty_midi`` writes them: drums on
+    channel 9, everything else on the remaining channels in turn. Each channel
+    starts with a ``PROGRAM`` event whose data is ``(bank, program)``.
+    """
+    melodic_channels = [channel for channel in range(16) if channel != DRUM_CHANNEL]
+    events: list[SynthEvent] = []
+
+    for index, instrument in enumerate(midi_data.instruments):
+        if instrument.is_drum:
+            channel, bank = DRUM_CHANNEL, DRUM_BANK
+        else:
+            channel, bank = melodic_channels[index % len(melodic_channels)], 0
+
+        events.append((0, PROGRAM, channel, bank, instrument.program))
+        for note in instrument.notes:
+            events.append((round(note.start * sample_rate), NOTE_ON, channel, note.pitch, note.velocity))
+            events.append((round(note.end * sample_rate), NOTE_OFF, channel, note.pitch, 0))
+        for bend in instrument.pitch_bends:
+            events.append((round(bend.time * sample_rate), PITCH_BEND, channel, bend.pitch, 0))
+        for control in instrument.control_changes:
+            events.append((round(control.time * sample_rate), CONTROL_CHANGE, channel, control.number, control.value))
+
+    events.sort()
+    return events
+
+
+class FluidSynthRenderer:
+    """
+    Renders MIDI in-process with a single long-lived FluidSynth synth.
+
+    SoundFonts are loaded on first use and kept loaded, so rendering many files with
+    the same ``.sf2`` parses it only once, whereas :func:`midi_to_wav` starts a new
+    ``fluidsynth`` process, and re-reads the SoundFont, for every file.
+    """
+
+    def __init__(self, sample_rate: int = 44100, gain: float = 0.2) -> None:
+        """
+        :param sample_rate: Sample rate of the rendered audio
+        :type sample_rate: int
+        :param gain: FluidSynth master gain
+        :type gain: float
+        :raises RuntimeError: If pyfluidsynth is not installed
+        """
+        try:
+            import fluidsynth
+        except ImportError as exc:
+            raise RuntimeError("The in-process renderer needs pyfluidsynth: pip install pyfluidsynth") from exc
+
+        self.sample_rate = sample_rate
+        self.synth = fluidsynth.Synth(gain=gain, samplerate=float(sample_rate))
+        self.soundfonts: dict[pathlib.Path, int] = {}
+
+    def load_soundfont(self, soundfont_path: pathlib.Path | str) -> int:
+        """Load *soundfont_path* unless it is already loaded, and return its FluidSynth id."""
+        soundfont_path = pathlib.Path(soundfont_path).expanduser().resolve()
+        if soundfont_path not in self.soundfonts:
+            sfid = self.synth.sfload(str(soundfont_path))
+            if sfid < 0:
+                raise RuntimeError(f"FluidSynth could not load SoundFont {soundfont_path}")
+            self.soundfonts[soundfont_path] = sfid
+        return self.soundfonts[soundfont_path]
+
+    def render(
+        self, midi: pretty_midi.PrettyMIDI | pathlib.Path | str, soundfont_path: pathlib.Path | str
+    ) -> np.ndarray:
+        """
+        Render *midi* (a ``PrettyMIDI`` object or a MIDI file) with *soundfont_path*.
+
+        Returns
+        -------
+        np.ndarray
+            Interleaved 16-bit stereo samples, of shape ``(n_samples, 2)``.
+        """
+        if not isinstance(midi, pretty_midi.PrettyMIDI):
+            midi = pretty_midi.PrettyMIDI(str(pathlib.Path(midi).expanduser().resolve()))
+
+        sfid = self.load_soundfont(soundfont_path)
+        events = schedule_events(midi, self.sample_rate)
+        n_samples = (events[-1][0] if events else 0) + round(RELEASE_TAIL * self.sample_rate)
+
+        # Clear whatever the previous render left sounding or set
+        self.synth.system_reset()
+
+        pcm = np.zeros((n_samples, 2), dtype=np.int16)
+        position = 0
+        for sample, kind, channel, data1, data2 in events:
+            if sample > position:
+                pcm[position:sample] = self._samples(sample - position)
+                position = sample
+
+            if kind == PROGRAM:
+                self.synth.program_select(channel, sfid, data1, data2)
+            elif kind == NOTE_ON:
+                self.synth.noteon(channel, data1, data2)
+            elif kind == NOTE_OFF:
+                self.synth.noteoff(channel, data1)
+            elif kind == PITCH_BEND:
+                self.synth.pitch_bend(channel, data1)
+            else:
+                self.synth.cc(channel, data1, data2)
+
+        if n_samples > position:
+            pcm[position:] = self._samples(n_samples - position)
+
+        return pcm
+
+    def _samples(self, n_samples: int) -> np.ndarray:
+        """The next *n_samples* stereo samples from the synth."""
+        return np.asarray(self.synth.get_samples(n_samples), dtype=np.int16).reshape(-1, 2)
+
+    def close(self) -> None:
+        """Free the synth and the SoundFonts it holds."""
+        self.synth.delete()
+        self.soundfonts.clear()
+
+    def __enter__(self) -> "FluidSynthRenderer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_shared_renderers: dict[int, FluidSynthRenderer] = {}
+
+
+def shared_renderer(sample_rate: int = 44100) -> FluidSynthRenderer:
+    """
+    The renderer for *sample_rate* shared by this process, created on first use.
+
+    Reusing it across calls is what keeps the SoundFonts loaded between renders.
+    """
+    renderer: Optional[FluidSynthRenderer] = _shared_renderers.get(sample_rate)
+    if renderer is None:
+        renderer = _shared_renderers[sample_rate] = FluidSynthRenderer(sample_rate)
+    return renderer
@@ -0,0 +1,23 @@
+import pretty_midi
+
+from .fluidsynth_renderer import DRUM_BANK, DRUM_CHANNEL, NOTE_OFF, NOTE_ON, PROGRAM, schedule_events
+
+
+class TestScheduleEvents:
+    def setup_method(self) -> None:
+        self.midi = pretty_midi.PrettyMIDI()
+        guitar = pretty_midi.Instrument(program=25)
+        guitar.notes.append(pretty_midi.Note(velocity=100, pitch=64, start=0.5, end=1.0))
+        guitar.notes.append(pretty_midi.Note(velocity=90, pitch=64, start=1.0, end=1.5))
+        drums = pretty_midi.Instrument(program=0, is_drum=True)
+        drums.notes.append(pretty_midi.Note(velocity=80, pitch=36, start=0.0, end=0.1))
+        self.midi.instruments.extend([guitar, drums])
+
+    def test_events_are_in_sample_order_with_note_offs_first(self) -> None:
+        events = schedule_events(self.midi, sample_rate=1000)
+
+        assert events == sorted(events)
+        assert (0, PROGRAM, 0, 0, 25) in events
+        assert (0, PROGRAM, DRUM_CHANNEL, DRUM_BANK, 0) in events
+        at_one_second = [event for event in events if event[0] == 1000]
+        assert at_one_second == [(1000, NOTE_OFF, 0, 64, 0), (1000, NOTE_ON, 0, 64, 90)]
@@ -0,0 +1,228 @@
+import importlib.util
+import pathlib
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+# Serializations of the basic_pitch model that run on the CPU, and the runtime each one needs
+INFERENCE_BACKENDS = ("tf", "onnx", "tflite")
+BACKEND_MODULES = {"tf": "tensorflow", "onnx": "onnxruntime", "tflite": "tflite_runtime"}
+DEFAULT_BACKEND = "tf"
+
+# File of each serialization inside basic_pitch's saved_models/icassp_2022 directory
+_MODEL_FILES = {"tf": "nmp", "onnx": "nmp.onnx", "tflite": "nmp.tflite"}
+
+# Outputs of the ONNX graph, as named by the SavedModel it was converted from
+_ONNX_OUTPUTS = {
+    "note": "StatefulPartitionedCall:1",
+    "onset": "StatefulPartitionedCall:2",
+    "contour": "StatefulPartitionedCall:0",
+}
+
+
+def model_path_for(backend: str) -> pathlib.Path:
+    """
+    Path of basic_pitch's bundled model in the serialization of *backend*.
+
+    It is found without importing basic_pitch, which would import every runtime it can find.
+
+    Raises
+    ------
+    ValueError
+        If *backend* is unknown.
+    RuntimeError
+        If basic_pitch is not installed.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {', '.join(INFERENCE_BACKENDS)}")
+    spec = importlib.util.find_spec("basic_pitch")
+    if spec is None or not spec.submodule_search_locations:
+        raise RuntimeError("Transcription needs basic_pitch: pip install basic-pitch")
+    return pathlib.Path(spec.submodule_search_locations[0]) / "saved_models" / "icassp_2022" / _MODEL_FILES[backend]
+
+
+def backend_for(model_path: pathlib.Path | str) -> str:
+    """The backend that runs *model_path*, going by its file extension as basic_pitch does."""
+    suffix = pathlib.Path(model_path).suffix
+    if suffix == ".onnx":
+        return "onnx"
+    if suffix == ".tflite":
+        return "tflite"
+    return "tf"
+
+
+def resolve_model_path(model_path: Optional[pathlib.Path | str] = None, backend: Optional[str] = None) -> pathlib.Path:
+    """
+    The model file to load: *model_path* if given, otherwise the bundled model for *backend*
+    (default: :data:`DEFAULT_BACKEND`).
+
+    Raises
+    ------
+    ValueError
+        If *model_path* is not a model for *backend*.
+    """
+    if model_path is None:
+        return model_path_for(backend or DEFAULT_BACKEND)
+    if backend is not None and backend_for(model_path) != backend:
+        raise ValueError(f"{model_path} is a {backend_for(model_path)} model, not a {backend} one")
+    return pathlib.Path(model_path)
+
+
+def _check_threads(intra_op_threads: Optional[int], inter_op_threads: Optional[int]) -> None:
+    for name, threads in (("intra-op", intra_op_threads), ("inter-op", inter_op_threads)):
+        if threads is not None and threads < 1:
+            raise ValueError(f"{name} threads must be at least 1, got {threads}")
+
+
+class OnnxModel:
+    """The basic_pitch model run by ONNX Runtime on the CPU, with the same ``predict`` as basic_pitch's ``Model``."""
+
+    def __init__(
+        self,
+        model_path: pathlib.Path | str,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+    ) -> None:
+        """
+        :param model_path: The ``.onnx`` model
+        :type model_path: pathlib.Path | str
+        :param intra_op_threads: Threads each operator is split across (default: one per core)
+        :type intra_op_threads: int
+        :param inter_op_threads: Threads independent operators run on at the same time. Operators
+            run one after another unless it is given
+        :type inter_op_threads: int
+        :raises RuntimeError: If onnxruntime is not installed
+        """
+        try:
+            import onnxruntime
+        except ImportError as exc:
+            raise RuntimeError("The onnx backend needs onnxruntime: pip install onnxruntime") from exc
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads is not None:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads is not None:
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, x: np.ndarray) -> dict[str, np.ndarray]:
+        outputs = self.session.run(list(_ONNX_OUTPUTS.values()), {self.input_name: x})
+        return dict(zip(_ONNX_OUTPUTS, outputs))
+
+
+class TfliteModel:
+    """The basic_pitch model run by the TFLite interpreter, with the same ``predict`` as basic_pitch's ``Model``."""
+
+    def __init__(self, model_path: pathlib.Path | str, threads: Optional[int] = None) -> None:
+        """
+        :param model_path: The ``.tflite`` model
+        :type model_path: pathlib.Path | str
+        :param threads: Threads the interpreter runs operators on (default: the interpreter's choice)
+        :type threads: int
+        :raises RuntimeError: If neither tflite_runtime nor TensorFlow is installed
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tensorflow.lite import Interpreter
+            except ImportError as exc:
+                raise RuntimeError("The tflite backend needs tflite_runtime: pip install tflite-runtime") from exc
+
+        self.runner = Interpreter(model_path=str(model_path), num_threads=threads).get_signature_runner()
+
+    def predict(self, x: np.ndarray) -> dict[str, np.ndarray]:
+        return self.runner(input_2=x)
+
+
+def configure_tensorflow_threads(
+    intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None
+) -> None:
+    """
+    Set the thread pools of TensorFlow, which are shared by every model in the process.
+
+    Raises
+    ------
+    RuntimeError
+        If TensorFlow already runs with other settings; they can only be set before it starts.
+    """
+    if intra_op_threads is None and inter_op_threads is None:
+        return
+
+    import tensorflow as tf
+
+    threading = tf.config.threading
+    for threads, get, set_ in (
+        (intra_op_threads, threading.get_intra_op_parallelism_threads, threading.set_intra_op_parallelism_threads),
+        (inter_op_threads, threading.get_inter_op_parallelism_threads, threading.set_inter_op_parallelism_threads),
+    ):
+        if threads is None or get() == threads:
+            continue
+        try:
+            set_(threads)
+        except RuntimeError as exc:
+            raise RuntimeError("TensorFlow is already running, its threads can only be set before it starts") from exc
+
+
+def load_backend_model(
+    model_path: pathlib.Path | str,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+) -> "Model | OnnxModel | TfliteModel":
+    """
+    Load *model_path* with the runtime of its serialization (see :func:`backend_for`).
+
+    TensorFlow models are loaded by basic_pitch itself. The TFLite interpreter has a single
+    thread pool, sized by *intra_op_threads*.
+
+    Returns
+    -------
+    Model | OnnxModel | TfliteModel
+        An object whose ``predict`` maps a batch of audio windows to the model output.
+    """
+    _check_threads(intra_op_threads, inter_op_threads)
+    backend = backend_for(model_path)
+    if backend == "onnx":
+        return OnnxModel(model_path, intra_op_threads, inter_op_threads)
+    if backend == "tflite":
+        return TfliteModel(model_path, intra_op_threads)
+
+    configure_tensorflow_threads(intra_op_threads, inter_op_threads)
+    from basic_pitch.inference import Model
+
+    return Model(model_path)
+
+
+def note_agreement(reference: Sequence[tuple], other: Sequence[tuple], onset_tolerance: float = 0.05) -> float:
+    """
+    How closely two transcriptions of the same audio agree, e.g. those of two backends.
+
+    Notes match when they have the same pitch and their onsets are at most *onset_tolerance*
+    seconds apart; every note matches at most one other.
+
+    Returns
+    -------
+    float
+        Matched notes as a share of all notes, from 0 (nothing in common) to 1 (the same notes).
+    """
+    if not reference and not other:
+        return 1.0
+
+    unmatched: dict[int, list[float]] = {}
+    for note in other:
+        unmatched.setdefault(int(note[2]), []).append(float(note[0]))
+    matched = 0
+    for note in reference:
+        onsets = unmatched.get(int(note[2]))
+        if not onsets:
+            continue
+        nearest = int(np.argmin(np.abs(np.array(onsets) - float(note[0]))))
+        if abs(onsets[nearest] - float(note[0])) <= onset_tolerance:
+            onsets.pop(nearest)
+            matched += 1
+    return 2 * matched / (len(reference) + len(other))
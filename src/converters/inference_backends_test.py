@@ -0,0 +1,81 @@
+import importlib.util
+import pathlib
+
+import pytest
+
+from .inference_backends import (
+    BACKEND_MODULES,
+    INFERENCE_BACKENDS,
+    backend_for,
+    load_backend_model,
+    model_path_for,
+    note_agreement,
+    resolve_model_path,
+)
+
+TEST_AUDIO = pathlib.Path(__file__).resolve().parents[2] / "test_audio" / "open_strings.mp3"
+
+
+class TestModelPaths:
+    def test_backend_follows_the_extension(self) -> None:
+        assert backend_for("models/nmp") == "tf"
+        assert backend_for("models/nmp.onnx") == "onnx"
+        assert backend_for(pathlib.Path("models/nmp.tflite")) == "tflite"
+
+    def test_explicit_paths_must_match_the_backend(self) -> None:
+        assert resolve_model_path("models/nmp.onnx", "onnx") == pathlib.Path("models/nmp.onnx")
+        assert resolve_model_path("models/nmp.onnx") == pathlib.Path("models/nmp.onnx")
+        with pytest.raises(ValueError):
+            resolve_model_path("models/nmp.onnx", "tflite")
+
+    def test_invalid_settings(self) -> None:
+        with pytest.raises(ValueError):
+            model_path_for("coreml")
+        with pytest.raises(ValueError):
+            load_backend_model("models/nmp.onnx", intra_op_threads=0)
+
+
+class TestNoteAgreement:
+    def setup_method(self) -> None:
+        self.notes = [(0.0, 0.5, 40), (0.5, 1.0, 45), (1.0, 1.5, 50), (1.0, 1.5, 55)]
+
+    def test_identical_and_empty(self) -> None:
+        assert note_agreement(self.notes, list(self.notes)) == 1.0
+        assert note_agreement([], []) == 1.0
+        assert note_agreement(self.notes, []) == 0.0
+
+    def test_onsets_may_differ_within_the_tolerance(self) -> None:
+        shifted = [(start + 0.02, end, pitch) for start, end, pitch in self.notes]
+
+        assert note_agreement(self.notes, shifted) == 1.0
+        assert note_agreement(self.notes, shifted, onset_tolerance=0.01) == 0.0
+
+    def test_every_note_matches_once(self) -> None:
+        doubled = self.notes + [(0.01, 0.5, 40)]
+
+        assert note_agreement(self.notes, doubled) == pytest.approx(8 / 9)
+
+
+class TestBackendsAgree:
+    @pytest.mark.parametrize("backend", [backend for backend in INFERENCE_BACKENDS if backend != "tf"])
+    def test_notes_match_tensorflow(self, backend: str) -> None:
+        pytest.importorskip("basic_pitch")
+        pytest.importorskip("tensorflow")
+        if backend != "tflite" and importlib.util.find_spec(BACKEND_MODULES[backend]) is None:
+            pytest.skip(f"{BACKEND_MODULES[backend]} is not installed")
+        from .audio_to_midi import predict_midi
+
+        transcriptions = [
+            predict_midi(
+                TEST_AUDIO,
+                backend=name,
+                intra_op_threads=2,
+                onset_threshold=0.5,
+                frame_threshold=0.4,
+                minimum_note_length=150,
+            )[1]
+            for name in ("tf", backend)
+        ]
+
+        assert transcriptions[0]
+        assert note_agreement(*transcriptions) >= 0.95
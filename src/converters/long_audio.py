@@ -0,0 +1,233 @@
+import pathlib
+import tempfile
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import numpy as np
+
+from src.converters.audio_decode import MODEL_SAMPLE_RATE, decode_audio
+from src.converters.audio_to_midi import MAXIMUM_FREQ, MINIMUM_FREQ, NoteEvent, NoteExtractor, load_model
+from src.converters.midi_to_tabs import TabStream, TabWriter
+from src.converters.midi_writer import StreamingMidiWriter
+from src.converters.model_windows import (
+    FRAMES_PER_WINDOW,
+    HOP_SIZE,
+    frame_count,
+    infer_windows,
+    model_frame_times,
+    window_count,
+)
+from src.models.fingering_beam import BEAM_WIDTH
+from src.models.fingering_cache import FingeringCache
+from src.models.tuning import get_tuning
+from src.profiling.profiler import stage
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+# Windows of context decoded on either side of a chunk, so notes near its edges are seen whole
+MARGIN_WINDOWS = 4
+
+
+def iter_long_audio_notes(
+    audio: np.ndarray,
+    model: "Model",
+    *,
+    onset_threshold: float,
+    frame_threshold: float,
+    minimum_note_length: float,
+    minimum_freq: float = MINIMUM_FREQ,
+    maximum_freq: float = MAXIMUM_FREQ,
+    chunk_seconds: float = 60,
+) -> Iterator[tuple[list[NoteEvent], float]]:
+    """
+    Transcribe *audio* chunk by chunk, so memory use depends on *chunk_seconds* and not on
+    the length of the recording.
+
+    Every chunk is run through the model with :data:`MARGIN_WINDOWS` of context either
+    side, and keeps the notes that start inside it. A note that runs into the right-hand
+    context is held back and joined with its continuation in the next chunk.
+
+    Notes are decoded per chunk, so they can differ slightly from a whole-file
+    transcription near chunk edges: basic_pitch normalises inferred onsets by their
+    maximum over the decoded range.
+
+    Yields
+    ------
+    notes : list
+        Finished note events, in order of their start time.
+    horizon : float
+        No note yielded later starts before this time.
+    """
+    n_frames = frame_count(len(audio))
+    # basic_pitch trims its output to n_frames, which can leave the last windows unused
+    n_windows = min(window_count(len(audio)), -(-n_frames // FRAMES_PER_WINDOW))
+    chunk_windows = max(1, int(round(chunk_seconds * MODEL_SAMPLE_RATE / HOP_SIZE)))
+
+    stitcher = NoteStitcher()
+    for first_core in range(0, n_windows, chunk_windows):
+        stop_core = min(first_core + chunk_windows, n_windows)
+        first_window = max(first_core - MARGIN_WINDOWS, 0)
+        stop_window = min(stop_core + MARGIN_WINDOWS, n_windows)
+        first_frame = first_window * FRAMES_PER_WINDOW
+        stop_frame = min(stop_window * FRAMES_PER_WINDOW, n_frames)
+
+        with stage("model_inference", frames=stop_frame - first_frame):
+            model_output = infer_windows(model, audio, first_window, stop_window)
+            model_output = {key: value[: stop_frame - first_frame] for key, value in model_output.items()}
+        times = model_frame_times(first_frame, stop_frame)
+        extractor = NoteExtractor(model_output, minimum_freq=minimum_freq, maximum_freq=maximum_freq, times=times)
+        _, note_events = extractor.extract(onset_threshold, frame_threshold, minimum_note_length)
+
+        core_start = times[first_core * FRAMES_PER_WINDOW - first_frame]
+        core_stop = float("inf") if stop_core == n_windows else times[stop_core * FRAMES_PER_WINDOW - first_frame]
+        # Notes reaching the last frame were cut off, unless this is the end of the audio
+        cut_off_at = times[-1] if stop_frame < n_frames else float("inf")
+        yield stitcher.add(note_events, core_start, core_stop, cut_off_at)
+
+
+class NoteStitcher:
+    """
+    Joins the notes decoded from overlapping ranges of the model output into one stream.
+
+    Every range is decoded with some context around its core. Only the notes starting in
+    the core are kept, and notes cut off at the end of the decoded range are held back
+    until the next range shows where they end.
+    """
+
+    def __init__(self) -> None:
+        # As mutable [start, end, pitch, amplitude] lists
+        self._held: list[list] = []
+        self._finished: list[list] = []
+
+    def add(
+        self, note_events: list[NoteEvent], core_start: float, core_stop: float, cut_off_at: float
+    ) -> tuple[list[NoteEvent], float]:
+        """
+        Add the notes decoded from one range.
+
+        Parameters
+        ----------
+        note_events : list
+            All notes decoded from the range, including its context.
+        core_start, core_stop : float
+            The notes starting in ``[core_start, core_stop)`` belong to this range.
+        cut_off_at : float
+            End of the decoded range; notes reaching it may still go on.
+
+        Returns
+        -------
+        notes : list
+            Finished note events, in order of their start time.
+        horizon : float
+            No note returned later starts before this time.
+        """
+        notes = [[start, end, pitch, amplitude] for start, end, pitch, amplitude, _ in note_events]
+
+        # Join the notes cut off by the previous range with their continuation here
+        still_held = []
+        for note in self._held:
+            for other in notes:
+                if other[2] == note[2] and other[0] <= note[1] < other[1]:
+                    note[1] = other[1]
+                    other[2] = -1  # consumed
+            (still_held if note[1] >= cut_off_at else self._finished).append(note)
+
+        for note in notes:
+            if note[2] >= 0 and core_start <= note[0] < core_stop:
+                (still_held if note[1] >= cut_off_at else self._finished).append(note)
+        self._held = still_held
+
+        # Everything before the earliest note that may still come or change is final
+        horizon = min([core_stop] + [note[0] for note in self._held])
+        self._finished.sort(key=lambda note: note[0])
+        ready = [note for note in self._finished if note[0] < horizon]
+        self._finished = [note for note in self._finished if note[0] >= horizon]
+        return [(start, end, pitch, amplitude, None) for start, end, pitch, amplitude in ready], horizon
+
+
+def transcribe_long_audio(
+    audio_path: pathlib.Path | str,
+    out_dir: pathlib.Path | str,
+    *,
+    model_path: Optional[pathlib.Path | str] = None,
+    model: Optional["Model"] = None,
+    onset_threshold: float,
+    frame_threshold: float,
+    minimum_note_length: float,
+    minimum_freq: float = MINIMUM_FREQ,
+    maximum_freq: float = MAXIMUM_FREQ,
+    chunk_seconds: float = 60,
+    write_midi: bool = True,
+    quantisation: Optional[int] = None,
+    fingering_cache: Optional[FingeringCache] = None,
+    engine: str = "greedy",
+    beam_width: int = BEAM_WIDTH,
+    tuning: str = "standard",
+    capo: int = 0,
+) -> dict:
+    """
+    Transcribe a recording of any length into MIDI and tabs with bounded memory.
+
+    The audio is decoded once to a memory-mapped temporary file, transcribed chunk by
+    chunk (see :func:`iter_long_audio_notes`) and every finished note is written to the
+    MIDI file and the tab straight away. Pitch bends are not written.
+
+    Unlike :func:`~src.converters.audio_decode.load_audio`, which the other modes use, the
+    audio is decoded and resampled by ffmpeg rather than librosa, so that it never has to
+    be held in memory, and is not read from or stored in the decoded-audio cache. The
+    resampling differs slightly, so a few notes near the thresholds may differ from those
+    of :func:`~src.converters.audio_to_midi.predict_midi`.
+
+    Returns
+    -------
+    dict
+        ``{'midi': Path (if written), 'tab': Path, 'notes': int}``
+    """
+    audio_path = pathlib.Path(audio_path).expanduser().resolve()
+    out_dir = pathlib.Path(out_dir).expanduser().resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model = model if model is not None else load_model(model_path)
+
+    tab_stream = TabStream(
+        TabWriter(out_dir / f"{audio_path.stem}.txt", string_names=get_tuning(tuning).string_names, capo=capo),
+        quantisation=minimum_note_length if quantisation is None else quantisation,
+        fingering_cache=fingering_cache,
+        engine=engine,
+        beam_width=beam_width,
+        tuning=tuning,
+        capo=capo,
+    )
+    midi_writer = StreamingMidiWriter(out_dir / f"{audio_path.stem}.mid") if write_midi else None
+
+    with tempfile.TemporaryDirectory(prefix="audio-tab-generator-") as tmp_dir:
+        try:
+            audio = decode_audio(audio_path, pathlib.Path(tmp_dir) / "audio.f32")
+            for note_events, horizon in iter_long_audio_notes(
+                audio,
+                model,
+                onset_threshold=onset_threshold,
+                frame_threshold=frame_threshold,
+                minimum_note_length=minimum_note_length,
+                minimum_freq=minimum_freq,
+                maximum_freq=maximum_freq,
+                chunk_seconds=chunk_seconds,
+            ):
+                tab_stream.add([(start, end, pitch) for start, end, pitch, *_ in note_events], horizon)
+                if midi_writer is not None:
+                    with stage("midi_write", notes=len(note_events)):
+                        midi_writer.add_notes(
+                            (start, end, pitch, int(np.round(127 * amplitude)))
+                            for start, end, pitch, amplitude, _ in note_events
+                        )
+                        midi_writer.flush(horizon)
+            del audio  # release the memory map before the file is removed
+        finally:
+            if midi_writer is not None:
+                midi_writer.close()
+
+    if not tab_stream.note_count:
+        raise ValueError(f"No playable notes found for {audio_path.name}")
+    result = {"tab": tab_stream.close(), "notes": tab_stream.note_count}
+    if midi_writer is not None:
+        result["midi"] = midi_writer.midi_path
+    return result
@@ -0,0 +1,64 @@
+import pathlib
+import shutil
+
+import pretty_midi
+import pytest
+
+from .inference_backends import note_agreement
+from .long_audio import NoteStitcher, transcribe_long_audio
+
+TEST_AUDIO = pathlib.Path(__file__).resolve().parents[2] / "test_audio" / "open_strings.mp3"
+
+
+class TestNoteStitcher:
+    def setup_method(self) -> None:
+        self.stitcher = NoteStitcher()
+
+    def test_keeps_notes_starting_in_core(self) -> None:
+        notes, horizon = self.stitcher.add(
+            [(0.5, 0.8, 60, 0.5, None), (2.1, 2.5, 62, 0.5, None), (3.0, 3.2, 64, 0.5, None)],
+            core_start=1.0,
+            core_stop=3.0,
+            cut_off_at=4.0,
+        )
+        assert notes == [(2.1, 2.5, 62, 0.5, None)]
+        assert horizon == 3.0
+
+    def test_joins_held_note_with_its_continuation(self) -> None:
+        notes, horizon = self.stitcher.add(
+            [(1.0, 1.2, 60, 0.5, None), (1.5, 4.0, 64, 0.7, None)], core_start=0.0, core_stop=3.0, cut_off_at=4.0
+        )
+        # The held note may still go on, so nothing after its start is final
+        assert notes == [(1.0, 1.2, 60, 0.5, None)]
+        assert horizon == 1.5
+
+        notes, horizon = self.stitcher.add(
+            [(1.5, 5.5, 64, 0.7, None), (3.5, 3.6, 67, 0.4, None)],
+            core_start=3.0,
+            core_stop=float("inf"),
+            cut_off_at=float("inf"),
+        )
+        assert notes == [(1.5, 5.5, 64, 0.7, None), (3.5, 3.6, 67, 0.4, None)]
+        assert horizon == float("inf")
+
+
+class TestTranscribeLongAudio:
+    @pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+    def test_notes_match_predict_midi(self, tmp_path) -> None:
+        pytest.importorskip("basic_pitch")
+        pytest.importorskip("librosa")
+        from .audio_to_midi import load_model, predict_midi
+
+        thresholds = {"onset_threshold": 0.5, "frame_threshold": 0.4, "minimum_note_length": 150}
+        model = load_model()
+        _, note_events = predict_midi(TEST_AUDIO, model=model, **thresholds)
+        # Short chunks, so the stitching between them is part of what is compared
+        result = transcribe_long_audio(TEST_AUDIO, tmp_path, model=model, chunk_seconds=5, **thresholds)
+
+        long_notes = [
+            (note.start, note.end, note.pitch)
+            for note in pretty_midi.PrettyMIDI(str(result["midi"])).instruments[0].notes
+        ]
+        # ffmpeg and librosa resample a little differently, which may only move notes near the thresholds
+        assert note_events
+        assert note_agreement(note_events, long_notes) >= 0.9
@@ -0,0 +1,44 @@
+import numpy as np
+import pretty_midi
+
+from .midi_parser import read_midi_notes
+
+
+class TestReadMidiNotes:
+    def setup_method(self) -> None:
+        self.midi = pretty_midi.PrettyMIDI(initial_tempo=100)
+        guitar = pretty_midi.Instrument(program=25)
+        bass = pretty_midi.Instrument(program=33)
+        for i, pitch in enumerate([40, 45, 50, 55, 59, 64, 64, 52]):
+            guitar.notes.append(pretty_midi.Note(velocity=90, pitch=pitch, start=i * 0.37, end=i * 0.37 + 0.6))
+            bass.notes.append(pretty_midi.Note(velocity=90, pitch=pitch - 12, start=i * 0.5, end=i * 0.5 + 0.25))
+        self.midi.instruments.extend([guitar, bass])
+
+    def test_matches_pretty_midi(self, tmp_path) -> None:
+        midi_path = tmp_path / "song.mid"
+        self.midi.write(str(midi_path))
+        expected = pretty_midi.PrettyMIDI(str(midi_path))
+        expected.remove_invalid_notes()
+
+        notes = read_midi_notes(midi_path)
+
+        assert [tuple(note) for note in notes.tolist()] == [
+            (note.start, note.end, note.pitch) for inst in expected.instruments for note in inst.notes
+        ]
+
+    def test_running_status_and_tempo(self, tmp_path) -> None:
+        # 480 ticks per beat; tempo 0.25 s per beat; note-on E4 then running-status note-off
+        track = bytes(
+            [0x00, 0xFF, 0x51, 0x03, 0x03, 0xD0, 0x90]
+            + [0x00, 0x90, 0x40, 0x64]
+            + [0x83, 0x60, 0x40, 0x00]
+            + [0x00, 0xFF, 0x2F, 0x00]
+        )
+        header = b"MThd" + (6).to_bytes(4, "big") + bytes([0, 0, 0, 1, 0x01, 0xE0])
+        midi_path = tmp_path / "running.mid"
+        midi_path.write_bytes(header + b"MTrk" + len(track).to_bytes(4, "big") + track)
+
+        notes = read_midi_notes(midi_path)
+
+        assert notes["pitch"].tolist() == [64]
+        assert np.allclose(notes["end_time"] - notes["start_time"], 0.25)
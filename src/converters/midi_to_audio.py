@@ -1,14 +1,42 @@
+import contextlib
 import pathlib
+import shutil
+import tempfile
+import threading
+import wave
+from typing import TYPE_CHECKING, BinaryIO, Optional
 
-from pydub import AudioSegment
+import numpy as np
 import subprocess
 
+from src.profiling.profiler import stage
+
+# pydub and the in-process renderer are only imported by the renders that use them
+if TYPE_CHECKING:
+    from src.converters.fluidsynth_renderer import FluidSynthRenderer
+
+# Raw PCM written by fluidsynth in streaming mode: signed 16-bit little-endian stereo
+PCM_CHANNELS = 2
+PCM_SAMPLE_WIDTH = 2
+
+# "cli" starts a fluidsynth process per render, "inprocess" keeps a FluidSynthRenderer
+# with its SoundFonts loaded, and "auto" uses the latter when pyfluidsynth is installed
+RENDER_BACKENDS = ("cli", "inprocess", "auto")
+
+# Bytes moved from the synth to the encoder per read, which bounds the memory used
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Formats audio can be rendered to, and the ffmpeg codec of each one that is encoded
+AUDIO_FORMATS = ("wav", "mp3", "flac", "ogg")
+_ENCODER_CODECS = {"mp3": "libmp3lame", "flac": "flac", "ogg": "libvorbis"}
+
 
 def midi_to_wav(
     midi_path: pathlib.Path | str,
     wav_path: pathlib.Path | str,
     soundfont_path: pathlib.Path | str,
     sample_rate: int = 44100,
+    timeout: Optional[float] = None,
 ) -> pathlib.Path:
     """
     Convert *midi_path* → *wav_path* using FluidSynth via direct CLI call.
@@ -21,6 +49,7 @@ def midi_to_wav(
     Raises
     ------
     RuntimeError: If fluidsynth command fails.
+    subprocess.TimeoutExpired: If fluidsynth runs for longer than *timeout* seconds; it is killed.
     """
     midi_path = pathlib.Path(midi_path).expanduser().resolve()
     wav_path = pathlib.Path(wav_path).expanduser().resolve()
@@ -38,7 +67,7 @@ def midi_to_wav(
     ]
 
     try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=timeout)
     except subprocess.CalledProcessError as e:
         raise RuntimeError(
             f"FluidSynth failed with error {e.returncode}:\n" f"STDOUT: {e.stdout}\nSTDERR: {e.stderr}"
@@ -63,6 +92,8 @@ def wav_to_mp3(
     wav_path = pathlib.Path(wav_path).expanduser().resolve()
     mp3_path = pathlib.Path(mp3_path).expanduser().resolve()
 
+    from pydub import AudioSegment
+
     # pydub automatically calls ffmpeg; raise a helpful error if it is missing.
     try:
         audio = AudioSegment.from_wav(str(wav_path))
@@ -73,6 +104,292 @@ def wav_to_mp3(
     return mp3_path
 
 
+def _stream_pcm(source: BinaryIO, sinks: list[BinaryIO], chunk_size: int = STREAM_CHUNK_BYTES) -> int:
+    """Copy *source* into every sink in chunks of *chunk_size* bytes, returning the number of bytes copied."""
+    total = 0
+    while chunk := source.read(chunk_size):
+        for sink in sinks:
+            sink.write(chunk)
+        total += len(chunk)
+    return total
+
+
+class _WaveSink:
+    """Adapts a ``wave.Wave_write`` to the ``write``/``close`` interface used by :func:`_stream_pcm`."""
+
+    def __init__(self, wav_file: wave.Wave_write) -> None:
+        self.wav_file = wav_file
+
+    def write(self, data: bytes) -> None:
+        self.wav_file.writeframesraw(data)
+
+    def close(self) -> None:
+        self.wav_file.close()
+
+
+def _open_wav(wav_path: pathlib.Path, sample_rate: int) -> wave.Wave_write:
+    """Open *wav_path* for writing 16-bit stereo PCM."""
+    wav_file = wave.open(str(wav_path), "wb")
+    wav_file.setnchannels(PCM_CHANNELS)
+    wav_file.setsampwidth(PCM_SAMPLE_WIDTH)
+    wav_file.setframerate(sample_rate)
+    return wav_file
+
+
+def _mp3_encoder_command(mp3_path: pathlib.Path, sample_rate: int, bitrate: str) -> list[str]:
+    """ffmpeg command that encodes 16-bit stereo PCM from stdin to *mp3_path*."""
+    return _encoder_command(mp3_path, "mp3", sample_rate, bitrate)
+
+
+def _encoder_command(out_path: pathlib.Path, audio_format: str, sample_rate: int, bitrate: str) -> list[str]:
+    """ffmpeg command that encodes 16-bit stereo PCM from stdin to *out_path* in one of the encoded formats."""
+    # FLAC is lossless, so it takes no bitrate
+    quality = [] if audio_format == "flac" else ["-b:a", bitrate]
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        "-f",
+        "s16le",
+        "-ar",
+        str(sample_rate),
+        "-ac",
+        str(PCM_CHANNELS),
+        "-i",
+        "pipe:0",
+        "-codec:a",
+        _ENCODER_CODECS[audio_format],
+        *quality,
+        str(out_path),
+    ]
+
+
+def _check_exit_code(name: str, code: int, stderr_file: BinaryIO) -> None:
+    """Raise a ``RuntimeError`` with the captured stderr if a subprocess failed."""
+    if code != 0:
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors="replace")
+        raise RuntimeError(f"{name} failed with error {code}:\nSTDERR: {stderr}")
+
+
+def pcm_to_wav(pcm: np.ndarray, wav_path: pathlib.Path | str, sample_rate: int = 44100) -> pathlib.Path:
+    """
+    Write rendered 16-bit stereo samples, e.g. from :class:`FluidSynthRenderer`, to *wav_path*.
+
+    Returns
+    -------
+    wav_path : pathlib.Path
+        Path of the created WAV file.
+    """
+    wav_path = pathlib.Path(wav_path).expanduser().resolve()
+    with _open_wav(wav_path, sample_rate) as wav_file:
+        wav_file.writeframes(np.ascontiguousarray(pcm, dtype=np.int16))
+    return wav_path
+
+
+def pcm_to_mp3(
+    pcm: np.ndarray,
+    mp3_path: pathlib.Path | str,
+    sample_rate: int = 44100,
+    bitrate: str = "192k",
+) -> pathlib.Path:
+    """
+    Encode rendered 16-bit stereo samples to *mp3_path* by piping them into ffmpeg.
+
+    Returns
+    -------
+    mp3_path : pathlib.Path
+        Path of the created MP3 file.
+
+    Raises
+    ------
+    RuntimeError: If ffmpeg is missing or fails.
+    """
+    mp3_path = pathlib.Path(mp3_path).expanduser().resolve()
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg not found. Is it installed and on your PATH?")
+
+    pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+    with tempfile.TemporaryFile() as encoder_err:
+        encoder = subprocess.Popen(
+            _mp3_encoder_command(mp3_path, sample_rate, bitrate), stdin=subprocess.PIPE, stderr=encoder_err
+        )
+        try:
+            encoder.stdin.write(memoryview(pcm).cast("B"))
+            encoder.stdin.close()
+        except BrokenPipeError:
+            pass  # the encoder died; its exit code and stderr are reported below
+        _check_exit_code("ffmpeg", encoder.wait(), encoder_err)
+
+    return mp3_path
+
+
+def midi_to_mp3_stream(
+    midi_path: pathlib.Path | str,
+    mp3_path: pathlib.Path | str,
+    soundfont_path: pathlib.Path | str,
+    sample_rate: int = 44100,
+    bitrate: str = "192k",
+    wav_path: Optional[pathlib.Path | str] = None,
+) -> dict:
+    """
+    Render *midi_path* with FluidSynth and encode it to *mp3_path* without an intermediate WAV.
+
+    If *wav_path* is given, the same PCM is also written there as a WAV. See
+    :func:`midi_to_audio_stream`.
+
+    Returns
+    -------
+    dict
+        ``{'mp3': Path, 'wav': Path (if wav_path was given)}``
+
+    Raises
+    ------
+    RuntimeError: If fluidsynth or ffmpeg is missing or fails.
+    """
+    outputs = {"mp3": mp3_path}
+    if wav_path is not None:
+        outputs["wav"] = wav_path
+    return midi_to_audio_stream(midi_path, outputs, soundfont_path, sample_rate=sample_rate, bitrate=bitrate)
+
+
+def midi_to_audio_stream(
+    midi_path: pathlib.Path | str,
+    outputs: dict[str, pathlib.Path | str],
+    soundfont_path: pathlib.Path | str,
+    sample_rate: int = 44100,
+    bitrate: str = "192k",
+    timeout: Optional[float] = None,
+) -> dict:
+    """
+    Render *midi_path* once with FluidSynth and write it in every format of *outputs*.
+
+    FluidSynth writes raw PCM to a pipe, which is copied in chunks of ``STREAM_CHUNK_BYTES``
+    to one ffmpeg encoder per encoded format and to a WAV writer, so memory use does not
+    grow with the length of the track and no intermediate WAV is written.
+
+    Parameters
+    ----------
+    outputs : dict
+        Path to write for each format of ``AUDIO_FORMATS``, e.g. ``{'mp3': 'song.mp3'}``.
+    timeout : float, optional
+        Seconds after which fluidsynth and the encoders are killed.
+
+    Returns
+    -------
+    dict
+        The path written for each format of *outputs*.
+
+    Raises
+    ------
+    ValueError: If a format is unknown.
+    RuntimeError: If fluidsynth or ffmpeg is missing or fails.
+    subprocess.TimeoutExpired: If the render took longer than *timeout*.
+    """
+    unknown = set(outputs) - set(AUDIO_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown audio formats {', '.join(sorted(unknown))}, expected any of {AUDIO_FORMATS}")
+
+    midi_path = pathlib.Path(midi_path).expanduser().resolve()
+    soundfont_path = pathlib.Path(soundfont_path).expanduser().resolve()
+    result = {fmt: pathlib.Path(path).expanduser().resolve() for fmt, path in outputs.items()}
+    encoded = [fmt for fmt in result if fmt != "wav"]
+
+    for tool in ("fluidsynth", *(["ffmpeg"] if encoded else [])):
+        if shutil.which(tool) is None:
+            raise RuntimeError(f"{tool} not found. Is it installed and on your PATH?")
+
+    synth_cmd = [
+        "fluidsynth",
+        "-ni",
+        "-q",
+        "-T",
+        "raw",
+        "-O",
+        "s16",
+        "-E",
+        "little",
+        "-F",
+        "-",
+        "-r",
+        str(sample_rate),
+        str(soundfont_path),
+        str(midi_path),
+    ]
+
+    # stderr goes to temporary files so that a chatty process can never block on a full pipe
+    with contextlib.ExitStack() as stack:
+        synth_err = stack.enter_context(tempfile.TemporaryFile())
+        encoder_errs = [stack.enter_context(tempfile.TemporaryFile()) for _ in encoded]
+        synth = subprocess.Popen(synth_cmd, stdout=subprocess.PIPE, stderr=synth_err)
+        encoders = [
+            subprocess.Popen(
+                _encoder_command(result[fmt], fmt, sample_rate, bitrate), stdin=subprocess.PIPE, stderr=err
+            )
+            for fmt, err in zip(encoded, encoder_errs)
+        ]
+
+        # Killing the processes ends the copy below, as the synth's output is closed
+        timed_out = threading.Event()
+        stopped: set[int] = set()
+
+        def stop() -> None:
+            # Once nothing reads the synth's output it blocks on the full pipe, so it is killed
+            # rather than waited for, and so are the encoders still reading the PCM
+            for process in (synth, *encoders):
+                if process.poll() is None:
+                    stopped.add(process.pid)
+                    process.kill()
+
+        def kill() -> None:
+            timed_out.set()
+            stop()
+
+        watchdog = threading.Timer(timeout, kill) if timeout is not None else None
+        if watchdog is not None:
+            watchdog.start()
+        copied = False
+        try:
+            sinks = [encoder.stdin for encoder in encoders]
+            try:
+                if "wav" in result:
+                    sinks.append(_WaveSink(_open_wav(result["wav"], sample_rate)))
+                _stream_pcm(synth.stdout, sinks)
+                copied = True
+            finally:
+                for sink in sinks:
+                    with contextlib.suppress(BrokenPipeError):
+                        sink.close()
+        except BrokenPipeError:
+            pass  # an encoder died; its exit code and stderr are reported below
+        finally:
+            if not copied:
+                stop()
+            synth.stdout.close()
+            synth_code = synth.wait()
+            encoder_codes = [encoder.wait() for encoder in encoders]
+            if watchdog is not None:
+                watchdog.cancel()
+
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(synth_cmd, timeout)
+        # The process that failed first is reported, not those stopped because of it
+        for code, err, process in zip(encoder_codes, encoder_errs, encoders):
+            if process.pid not in stopped:
+                _check_exit_code("ffmpeg", code, err)
+        if synth.pid not in stopped:
+            _check_exit_code("FluidSynth", synth_code, synth_err)
+        # An encoder that closed its input may still have been exiting when it was stopped
+        for code, err in zip(encoder_codes, encoder_errs):
+            _check_exit_code("ffmpeg", code, err)
+        if stopped:
+            raise RuntimeError("Rendering stopped because an encoder closed its input early")
+
+    return result
+
+
 def render_midi_to_audio(
     midi_path: pathlib.Path,
     out_dir: pathlib.Path,
@@ -81,10 +398,16 @@ def render_midi_to_audio(
     generate_mp3: bool = False,
     sample_rate: int = 44100,
     mp3_bitrate: str = "192k",
+    backend: str = "cli",
+    renderer: Optional["FluidSynthRenderer"] = None,
 ) -> dict:
     """
     High‑level helper that does the whole “MIDI → WAV → (MP3)” pipeline.
 
+    When an MP3 is requested it is encoded straight from FluidSynth's output (see
+    :func:`midi_to_mp3_stream`), and a WAV is only written if *generate_wav* is set.
+    The in-process backends render into memory instead and encode from there.
+
     Parameters
     ----------
     midi_path : Path
@@ -93,34 +416,81 @@ def render_midi_to_audio(
         Directory where *song.wav* and (optionally) *song.mp3* will be stored.
     soundfont_path : Path
         FluidSynth SoundFont (*.sf2*). Required.
-    generate_mp3 : bool, default True
-        If ``True`` also produce an MP3 file.
+    generate_wav : bool, default False
+        If ``True`` produce a WAV file.
+    generate_mp3 : bool, default False
+        If ``True`` produce an MP3 file.
     sample_rate : int, default 44100
-        Sample rate for the intermediate WAV.
+        Sample rate the MIDI is rendered at.
     mp3_bitrate : str, default "192k"
         Bitrate passed to ffmpeg when creating the MP3.
+    backend : str, default "cli"
+        One of ``RENDER_BACKENDS``. "auto" falls back to "cli" if pyfluidsynth is missing.
+    renderer : FluidSynthRenderer, optional
+        Renderer used by the in-process backends, defaults to :func:`shared_renderer`.
 
     Returns
     -------
     dict
-        ``{'wav': Path, 'mp3': Path (if generated)}``
+        ``{'wav': Path (if generated), 'mp3': Path (if generated)}``
+
+    Raises
+    ------
+    ValueError
+        If *backend* is unknown.
     """
+    if backend not in RENDER_BACKENDS:
+        raise ValueError(f"Unknown render backend {backend!r}, expected one of {', '.join(RENDER_BACKENDS)}")
+
     midi_path = pathlib.Path(midi_path)
-    out_dir = pathlib.Path(out_dir.expanduser().resolve())
+    out_dir = pathlib.Path(out_dir).expanduser().resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
     wav_path = out_dir / f"{midi_path.stem}.wav"
-    wav_path = midi_to_wav(
-        midi_path=midi_path,
-        wav_path=wav_path,
-        soundfont_path=soundfont_path,
-        sample_rate=sample_rate,
-    )
-
-    result = {"wav": wav_path} if generate_wav else dict()
+    mp3_path = out_dir / f"{midi_path.stem}.mp3"
+
+    if backend != "cli" and renderer is None:
+        from src.converters.fluidsynth_renderer import shared_renderer
+
+        try:
+            renderer = shared_renderer(sample_rate)
+        except RuntimeError:
+            if backend == "inprocess":
+                raise
+
+    if backend != "cli" and renderer is not None:
+        with stage("fluidsynth") as timed:
+            pcm = renderer.render(midi_path, soundfont_path)
+            timed.count(samples=len(pcm))
+        result = dict()
+        if generate_wav:
+            with stage("wav_write", samples=len(pcm)):
+                result["wav"] = pcm_to_wav(pcm, wav_path, renderer.sample_rate)
+        if generate_mp3:
+            with stage("ffmpeg", samples=len(pcm)):
+                result["mp3"] = pcm_to_mp3(pcm, mp3_path, renderer.sample_rate, bitrate=mp3_bitrate)
+        return result
+
     if generate_mp3:
-        mp3_path = out_dir / f"{midi_path.stem}.mp3"
-        mp3_path = wav_to_mp3(wav_path, mp3_path, bitrate=mp3_bitrate)
-        result["mp3"] = mp3_path
+        # fluidsynth and ffmpeg run at the same time, so they are timed together
+        with stage("fluidsynth_ffmpeg"):
+            return midi_to_mp3_stream(
+                midi_path=midi_path,
+                mp3_path=mp3_path,
+                soundfont_path=soundfont_path,
+                sample_rate=sample_rate,
+                bitrate=mp3_bitrate,
+                wav_path=wav_path if generate_wav else None,
+            )
+
+    result = dict()
+    if generate_wav:
+        with stage("fluidsynth"):
+            result["wav"] = midi_to_wav(
+                midi_path=midi_path,
+                wav_path=wav_path,
+                soundfont_path=soundfont_path,
+                sample_rate=sample_rate,
+            )
 
     return result
@@ -0,0 +1,126 @@
+import io
+import os
+import pathlib
+import sys
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+from .midi_to_audio import (
+    PCM_CHANNELS,
+    PCM_SAMPLE_WIDTH,
+    _stream_pcm,
+    _WaveSink,
+    midi_to_audio_stream,
+    midi_to_mp3_stream,
+    pcm_to_wav,
+)
+
+# Streams far more PCM than a pipe buffer holds, so it blocks once nothing reads it
+_STUB_FLUIDSYNTH = """
+import sys
+chunk = bytes(65536)
+for _ in range(2000):
+    sys.stdout.buffer.write(chunk)
+"""
+
+_STUB_FFMPEG = """
+import sys
+sys.stderr.write("Unknown encoder\\n")
+sys.exit(3)
+"""
+
+
+def stub_tools(directory: pathlib.Path, monkeypatch) -> None:
+    """Put a ``fluidsynth`` that streams silence and an ``ffmpeg`` that fails at once first on the PATH."""
+    directory.mkdir(exist_ok=True)
+    for name, source in (("fluidsynth", _STUB_FLUIDSYNTH), ("ffmpeg", _STUB_FFMPEG)):
+        path = directory / name
+        path.write_text(f"#!{sys.executable}\n{source}")
+        path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{directory}{os.pathsep}{os.environ['PATH']}")
+
+
+class _RecordingSink(io.BytesIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.largest_write = 0
+
+    def write(self, data: bytes) -> int:
+        self.largest_write = max(self.largest_write, len(data))
+        return super().write(data)
+
+
+class TestStreamPcm:
+    def setup_method(self) -> None:
+        self.pcm = bytes(range(256)) * 1000
+
+    def test_copies_to_every_sink_in_bounded_chunks(self, tmp_path) -> None:
+        encoder = _RecordingSink()
+        wav_path = tmp_path / "song.wav"
+        wav_file = wave.open(str(wav_path), "wb")
+        wav_file.setnchannels(PCM_CHANNELS)
+        wav_file.setsampwidth(PCM_SAMPLE_WIDTH)
+        wav_file.setframerate(44100)
+        wav_sink = _WaveSink(wav_file)
+
+        copied = _stream_pcm(io.BytesIO(self.pcm), [encoder, wav_sink], chunk_size=4096)
+        wav_sink.close()
+
+        assert copied == len(self.pcm)
+        assert encoder.getvalue() == self.pcm
+        assert encoder.largest_write <= 4096
+        with wave.open(str(wav_path), "rb") as written:
+            assert written.getnframes() == len(self.pcm) // (PCM_CHANNELS * PCM_SAMPLE_WIDTH)
+            assert written.readframes(written.getnframes()) == self.pcm
+
+
+class TestPcmToWav:
+    def test_round_trip(self, tmp_path) -> None:
+        pcm = np.arange(-500, 500, dtype=np.int16).reshape(-1, PCM_CHANNELS)
+
+        wav_path = pcm_to_wav(pcm, tmp_path / "song.wav", sample_rate=22050)
+
+        with wave.open(str(wav_path), "rb") as written:
+            assert written.getframerate() == 22050
+            assert written.getnchannels() == PCM_CHANNELS
+            frames = np.frombuffer(written.readframes(written.getnframes()), dtype=np.int16)
+        assert np.array_equal(frames.reshape(-1, PCM_CHANNELS), pcm)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the stub tools are scripts")
+class TestStreamFailures:
+    def setup_method(self) -> None:
+        self.outcome: list[BaseException] = []
+
+    def _render(self, render, *args, **kwargs) -> None:
+        """Run *render* in a thread, so a regression fails the test instead of hanging it."""
+
+        def target() -> None:
+            try:
+                render(*args, **kwargs)
+            except BaseException as exc:
+                self.outcome.append(exc)
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(20)
+        assert not thread.is_alive()
+
+    def test_failing_encoder_is_reported_without_hanging(self, tmp_path, monkeypatch) -> None:
+        stub_tools(tmp_path / "bin", monkeypatch)
+
+        self._render(midi_to_mp3_stream, "song.mid", tmp_path / "song.mp3", "guitar.sf2", wav_path=tmp_path / "a.wav")
+
+        assert isinstance(self.outcome[0], RuntimeError)
+        assert "ffmpeg failed with error 3" in str(self.outcome[0])
+        assert "Unknown encoder" in str(self.outcome[0])
+
+    def test_failing_wav_write_stops_the_synth(self, tmp_path, monkeypatch) -> None:
+        stub_tools(tmp_path / "bin", monkeypatch)
+
+        self._render(midi_to_audio_stream, "song.mid", {"wav": tmp_path / "missing" / "song.wav"}, "guitar.sf2")
+
+        assert isinstance(self.outcome[0], FileNotFoundError)
@@ -1,7 +1,44 @@
+import multiprocessing
 import pathlib
-import pretty_midi
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Optional, Sequence, TextIO
+
+import numpy as np
+from src.models.fingering_beam import BEAM_WIDTH, assign_beam
+from src.models.fingering_cache import FingeringCache
+from src.models.note_array import NOTE_DTYPE, NoteArray
 from src.models.note_cluster import NoteCluster
-from src.models.note import NoteCandidate, FinalNote
+from src.models.note import FinalNote
+from src.models.tuning import TUNINGS, Tuning, best_tuning, get_tuning
+from src.profiling.profiler import stage
+
+# pretty_midi is only needed when reading with it, not for note arrays from the streaming parser
+if TYPE_CHECKING:
+    import pretty_midi
+
+# A note event as produced by basic_pitch: (start_s, end_s, pitch, amplitude, pitch_bends)
+NoteEvent = tuple[float, float, int, float, Optional[list[int]]]
+
+STRING_NAMES = ["E", "A", "D", "G", "B", "e"]
+
+# Tab columns buffered per string before they are written out
+_TAB_FLUSH_COLUMNS = 4096
+# Size up to which each string of a TabWriter is kept in memory rather than in a temporary file
+_TAB_SPOOL_BYTES = 1 << 20
+
+# Below this many notes, fingering in a process pool costs more than it saves
+PARALLEL_MIN_NOTES = 20_000
+
+# Ways of choosing the string and fret of every note, see `_assign_clusters`
+FINGERING_ENGINES = ("greedy", "beam")
+
+# Tuning name that picks the registered tuning which plays the notes best, see `_resolve_tuning`
+AUTO_TUNING = "auto"
+
+# First line of a tab played with a capo, whose frets count from the capo
+CAPO_HEADER = "Capo {capo}"
 
 
 def midi_to_guitar_tab(
@@ -9,9 +46,15 @@ def midi_to_guitar_tab(
     out_dir: pathlib.Path,
     quantisation: int,
     max_fret: int = 24,
+    workers: int = 1,
+    fingering_cache: Optional[FingeringCache] = None,
+    engine: str = "greedy",
+    beam_width: int = BEAM_WIDTH,
+    tuning: str = "standard",
+    capo: int = 0,
 ) -> pathlib.Path:
     """
-    Convert a MIDI file into guitar tablature using standard EADGBE tuning.
+    Convert a MIDI file into guitar tablature, in standard EADGBE tuning unless another is given.
 
     Parameters
     ----------
@@ -23,6 +66,22 @@ def midi_to_guitar_tab(
         Timeframe within which notes will be considered to be concurrent.
     max_fret : int, default 24
         Highest fret number allowed when mapping notes to strings (not fully implemented yet)
+    workers : int, default 1
+        Number of processes to finger clusters with. Pieces shorter than
+        ``PARALLEL_MIN_NOTES`` notes are always fingered serially.
+    fingering_cache : FingeringCache, optional
+        Reuses the fingering of repeated phrases; its hit statistics are updated in place.
+        Only the greedy engine uses it.
+    engine : {"greedy", "beam"}, default "greedy"
+        Fingers every note on its lowest free fret, or searches for the fingering with the
+        least hand movement over the whole piece (see :func:`assign_beam`).
+    beam_width : int, default BEAM_WIDTH
+        Fingerings the beam engine keeps after every group of notes.
+    tuning : str, default "standard"
+        Name of a registered tuning (see :data:`TUNINGS`), or ``"auto"`` for the one that
+        plays the notes best (see :func:`best_tuning`).
+    capo : int, default 0
+        Fret of the capo. Frets in the tab count from it.
 
     Returns
     -------
@@ -32,102 +91,505 @@ def midi_to_guitar_tab(
     Raises
     ------
     ValueError
-        If the MIDI file is invalid or contains no usable notes.
+        If the MIDI file is invalid or contains no usable notes, or the tuning is unknown.
 
     Notes
     -----
     - Standard tuning MIDI values: E2=40, A2=45, D3=50, G3=55, B3=59, E4=64.
-    - The output is a plain-text tablature with one line per string.
+    - The output is a plain-text tablature with one line per string, labelled with the
+      open strings of the tuning.
     """
 
+    import pretty_midi
+
     midi_path = pathlib.Path(midi_path).expanduser().resolve()
     out_dir = pathlib.Path(out_dir).expanduser().resolve()
-    out_dir.parent.mkdir(parents=True, exist_ok=True)
-
-    # String tuning values (low E → high e)
-    STRING_MIDI = [40, 45, 50, 55, 59, 64]
-    STRING_NAMES = ["E", "A", "D", "G", "B", "e"]
-    NUM_STRINGS = len(STRING_MIDI)
-
-    out_file = out_dir / f"{midi_path.stem}.txt"
-    out_file.parent.mkdir(parents=True, exist_ok=True)
 
     # Load MIDI data and ensure validity
-    try:
-        midi_data = pretty_midi.PrettyMIDI(str(midi_path))
-        midi_data.remove_invalid_notes()
-    except (OSError, ValueError) as e:
-        raise ValueError(f"Invalid MIDI file: {midi_path}") from e
-
-    # Flatten notes and sort by onset
-    notes = sorted(
-        [note for inst in midi_data.instruments for note in inst.notes],
-        key=lambda n: n.start,
-    )
+    with stage("midi_parse") as timed:
+        try:
+            midi_data = pretty_midi.PrettyMIDI(str(midi_path))
+            midi_data.remove_invalid_notes()
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Invalid MIDI file: {midi_path}") from e
 
+        notes = [(note.start, note.end, note.pitch) for inst in midi_data.instruments for note in inst.notes]
+        timed.count(notes=len(notes))
     if not notes:
         raise ValueError(f"No playable notes found in {midi_path}")
 
-    # Convert MIDI notes into NoteCandidate objects with possible fret positions
-    note_candidates = []
-    for note in notes:
-        candidates = []
-        for string_midi in STRING_MIDI:
-            fret = note.pitch - string_midi
-            candidates.append(fret if 0 <= fret <= max_fret else -1)
-
-        note_candidates.append(
-            NoteCandidate(
-                start_time=note.start,
-                end_time=note.end,
-                candidates=candidates,
-            )
-        )
+    return _write_guitar_tab(
+        notes,
+        out_dir / f"{midi_path.stem}.txt",
+        quantisation,
+        max_fret,
+        workers,
+        fingering_cache,
+        engine,
+        beam_width,
+        tuning,
+        capo,
+    )
 
-    # Group overlapping notes into buckets
-    clusters = []
-    idx = 0
-    while idx < len(note_candidates):
-        group = [note_candidates[idx]]
-        group_end_time = note_candidates[idx].end_time
-        while idx + 1 < len(note_candidates) and note_candidates[idx + 1].start_time < group_end_time:
-            idx += 1
-            group.append(note_candidates[idx])
-            group_end_time = max(group_end_time, note_candidates[idx].end_time)
 
-        clusters.append(group)
-        idx += 1
+def notes_to_guitar_tab(
+    notes: "pretty_midi.PrettyMIDI | np.ndarray | Sequence[NoteEvent]",
+    out_file: pathlib.Path,
+    quantisation: int,
+    max_fret: int = 24,
+    workers: int = 1,
+    fingering_cache: Optional[FingeringCache] = None,
+    engine: str = "greedy",
+    beam_width: int = BEAM_WIDTH,
+    tuning: str = "standard",
+    capo: int = 0,
+) -> pathlib.Path:
+    """
+    Convert in-memory notes into guitar tablature, without a MIDI file on disk.
+
+    Parameters
+    ----------
+    notes : PrettyMIDI, note array or list of note events
+        A ``PrettyMIDI`` object (e.g. from :func:`predict_midi`), a ``NOTE_DTYPE`` array
+        (e.g. from :func:`read_midi_notes`) or basic_pitch note events
+        ``(start_s, end_s, pitch, amplitude, pitch_bends)``.
+    out_file : Path
+        Path of the tablature (.txt) to write.
+    quantisation : int
+        Timeframe in ms within which notes will be considered to be concurrent.
+    max_fret : int, default 24
+        Highest fret number allowed when mapping notes to strings.
+    workers : int, default 1
+        Number of processes to finger clusters with, see :func:`midi_to_guitar_tab`.
+    fingering_cache : FingeringCache, optional
+        Reuses the fingering of repeated phrases; its hit statistics are updated in place.
+    engine : {"greedy", "beam"}, default "greedy"
+        How notes are fingered, see :func:`midi_to_guitar_tab`.
+    beam_width : int, default BEAM_WIDTH
+        Fingerings the beam engine keeps after every group of notes.
+    tuning : str, default "standard"
+        Name of a registered tuning, or ``"auto"``, see :func:`midi_to_guitar_tab`.
+    capo : int, default 0
+        Fret of the capo. Frets in the tab count from it.
+
+    Returns
+    -------
+    Path
+        The path to the created tablature file.
+
+    Raises
+    ------
+    ValueError
+        If there are no usable notes, or the tuning is unknown.
+
+    Notes
+    -----
+    A ``PrettyMIDI`` object gives exactly the same tab as writing it to a file and
+    passing that to :func:`midi_to_guitar_tab`: note times are snapped to MIDI ticks
+    and notes are ordered as they would be read back from the file. Note arrays and
+    note events are used with their times as they are.
+    """
+    out_file = pathlib.Path(out_file).expanduser().resolve()
+
+    if isinstance(notes, np.ndarray):
+        flat_notes = notes[notes["end_time"] > notes["start_time"]]
+    else:
+        import pretty_midi
+
+        if isinstance(notes, pretty_midi.PrettyMIDI):
+            flat_notes = _notes_as_written(notes)
+        else:
+            flat_notes = [(start, end, int(pitch)) for start, end, pitch, *_ in notes if end > start]
+
+    if not len(flat_notes):
+        raise ValueError(f"No playable notes found for {out_file.name}")
+
+    return _write_guitar_tab(
+        flat_notes, out_file, quantisation, max_fret, workers, fingering_cache, engine, beam_width, tuning, capo
+    )
+
+
+def _notes_as_written(midi_data: "pretty_midi.PrettyMIDI") -> list[tuple[float, float, int]]:
+    """
+    Flatten the notes of *midi_data* exactly as they would be read back from a file
+    written by ``midi_data.write()``: times are snapped to ticks, and note-on/off
+    events are ordered and paired up the same way pretty_midi does it.
+    """
+    notes = []
+    for instrument in midi_data.instruments:
+        # pretty_midi writes note-offs as note-ons with velocity 0 and sorts by (tick, pitch, velocity)
+        events = []
+        for note in instrument.notes:
+            events.append((midi_data.time_to_tick(note.start), note.pitch, note.velocity))
+            events.append((midi_data.time_to_tick(note.end), note.pitch, 0))
+        events.sort()
+
+        # A note-off closes every open note of its pitch, except those opened on the same tick
+        open_notes: dict[int, list[int]] = {}
+        for tick, pitch, velocity in events:
+            if velocity > 0:
+                open_notes.setdefault(pitch, []).append(tick)
+            elif pitch in open_notes:
+                start_ticks = open_notes.pop(pitch)
+                notes.extend(
+                    (midi_data.tick_to_time(start_tick), midi_data.tick_to_time(tick), pitch)
+                    for start_tick in start_ticks
+                    if start_tick != tick
+                )
+                still_open = [start_tick for start_tick in start_ticks if start_tick == tick]
+                if still_open and len(still_open) < len(start_ticks):
+                    open_notes[pitch] = still_open
+
+    return notes
+
+
+def _assign_clusters(
+    note_array: NoteArray,
+    bounds: np.ndarray,
+    quantisation: int,
+    fingering_cache: Optional[FingeringCache] = None,
+    engine: str = "greedy",
+    beam_width: int = BEAM_WIDTH,
+) -> list[list[FinalNote]]:
+    """
+    Finger each cluster ``bounds[k]:bounds[k + 1]`` of *note_array*, in order.
+
+    The greedy engine fingers cluster by cluster with :class:`NoteCluster`, the beam engine
+    searches all of them at once with :func:`assign_beam`.
+    """
+    if engine == "beam":
+        return assign_beam(note_array, bounds, quantisation, beam_width)
+    if engine != "greedy":
+        raise ValueError(f"Unknown fingering engine {engine!r}, expected one of {', '.join(FINGERING_ENGINES)}")
 
-    # Let cluster determine the optimal fingering for each group
     grouped_final_notes: list[list[FinalNote]] = []
-    for note_group in clusters:
-        cluster = NoteCluster(notes=note_group, quantisation=quantisation)
+    for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        cluster = NoteCluster(
+            notes=note_array.to_candidates(start, stop), quantisation=quantisation, fingering_cache=fingering_cache
+        )
         cluster.assign_notes()
         grouped_final_notes.extend(cluster.grouped_final_notes)
 
+    return grouped_final_notes
+
+
+def _assign_cluster_chunk(
+    chunk: tuple[NoteArray, np.ndarray, int, Optional[int], str, int],
+) -> tuple[list[list[FinalNote]], int, int]:
+    """Worker entry point of :func:`_assign_clusters_parallel`, returns the groups and cache hits/misses."""
+    note_array, bounds, quantisation, cache_size, engine, beam_width = chunk
+    fingering_cache = FingeringCache(cache_size) if cache_size is not None else None
+    grouped_final_notes = _assign_clusters(note_array, bounds, quantisation, fingering_cache, engine, beam_width)
+    if fingering_cache is None:
+        return grouped_final_notes, 0, 0
+    return grouped_final_notes, fingering_cache.hits, fingering_cache.misses
+
+
+def _assign_clusters_parallel(
+    note_array: NoteArray,
+    bounds: np.ndarray,
+    quantisation: int,
+    workers: int,
+    fingering_cache: Optional[FingeringCache] = None,
+    engine: str = "greedy",
+    beam_width: int = BEAM_WIDTH,
+) -> list[list[FinalNote]]:
+    """
+    Finger the clusters of *note_array* across a pool of *workers* processes.
+
+    Clusters share no state, so they are handed out in chunks of consecutive clusters
+    with roughly equal note counts and the results are concatenated in order. With a
+    *fingering_cache*, every chunk uses a fresh cache of the same size and their
+    hit/miss counts are added to *fingering_cache*. The beam engine searches every chunk
+    on its own, so the hand position is not carried from one chunk to the next.
+    """
+    # A few chunks per worker evens out clusters of very different sizes
+    num_chunks = min(workers * 4, len(bounds) - 1)
+    targets = np.linspace(0, len(note_array), num_chunks + 1)[1:-1]
+    cuts = np.unique(np.concatenate(([0], np.searchsorted(bounds, targets), [len(bounds) - 1])))
+    cache_size = fingering_cache.max_size if fingering_cache is not None else None
+
+    chunks = []
+    for lo, hi in zip(cuts[:-1].tolist(), cuts[1:].tolist()):
+        first, last = int(bounds[lo]), int(bounds[hi])
+        chunk_bounds = bounds[lo:hi] - first
+        chunk_notes = note_array[first:last]
+        chunks.append(
+            (chunk_notes, np.append(chunk_bounds, last - first), quantisation, cache_size, engine, beam_width)
+        )
+
+    grouped_final_notes: list[list[FinalNote]] = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for groups, hits, misses in pool.map(_assign_cluster_chunk, chunks):
+            grouped_final_notes.extend(groups)
+            if fingering_cache is not None:
+                fingering_cache.add_stats(hits, misses)
+
+    return grouped_final_notes
+
+
+def _write_guitar_tab(
+    notes: list[tuple[float, float, int]] | np.ndarray,
+    out_file: pathlib.Path,
+    quantisation: int,
+    max_fret: int,
+    workers: int = 1,
+    fingering_cache: Optional[FingeringCache] = None,
+    engine: str = "greedy",
+    beam_width: int = BEAM_WIDTH,
+    tuning: str = "standard",
+    capo: int = 0,
+) -> pathlib.Path:
+    """Finger *notes*, ``(start, end, pitch)`` tuples or a ``NOTE_DTYPE`` array, and write them as tablature."""
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    if not isinstance(notes, np.ndarray):
+        notes = np.array(notes, dtype=NOTE_DTYPE)
+    chosen = _resolve_tuning(tuning, capo, notes["pitch"], max_fret)
+
+    with stage("clustering") as timed:
+        # Sort by onset and work out the possible fret positions of every note
+        note_array = NoteArray(notes, tuning=chosen.pitches, max_fret=max_fret, capo=capo)
+        note_array.check_playable()
+
+        # Group overlapping notes into buckets
+        bounds = note_array.cluster_bounds()
+        timed.count(notes=len(note_array), clusters=len(bounds) - 1)
+
+    # Let cluster determine the optimal fingering for each group
+    with stage("assign_notes", clusters=len(bounds) - 1):
+        if workers > 1 and len(note_array) >= PARALLEL_MIN_NOTES:
+            grouped_final_notes = _assign_clusters_parallel(
+                note_array, bounds, quantisation, workers, fingering_cache, engine, beam_width
+            )
+        else:
+            grouped_final_notes = _assign_clusters(
+                note_array, bounds, quantisation, fingering_cache, engine, beam_width
+            )
+
     # Create and write tablature
-    with out_file.open("w") as f:
-        tab_lines = [[f"{STRING_NAMES[i]}|-"] for i in range(NUM_STRINGS)]
+    with stage("tab_write", columns=len(grouped_final_notes)):
+        writer = TabWriter(out_file, string_names=chosen.string_names, capo=capo)
+        writer.write_groups(grouped_final_notes)
+        writer.close()
+
+    return out_file
+
+
+def _resolve_tuning(tuning: str, capo: int, pitches: np.ndarray, max_fret: int) -> Tuning:
+    """
+    The registered tuning called *tuning*, or with ``"auto"`` the one that plays *pitches*
+    best with the given *capo*, scored for all registered tunings at once.
+    """
+    if tuning != AUTO_TUNING:
+        return get_tuning(tuning)
+
+    with stage("tuning_search", tunings=len(TUNINGS)):
+        chosen, _ = best_tuning(pitches, capos=(capo,), max_fret=max_fret)
+    return chosen
+
 
-        # Iterate through the groups
+def _tab_cells(final_group: list[FinalNote]) -> list[str]:
+    """The tab column of one fingered group and its separator, low string first."""
+    frets: dict[int, int] = {}
+    for note in final_group:
+        frets.setdefault(note.string, note.fret)
+    return [f"{frets[s]}-" if s in frets else "--" for s in range(1, len(STRING_NAMES) + 1)]
+
+
+class TabWriter:
+    """
+    Writes tablature one fingered group at a time.
+
+    Every string is a single line across the whole piece, so each line is spooled to its
+    own temporary file (kept in memory while small) and the lines are joined on
+    :meth:`close`. A tab can therefore be written while the piece is still being
+    transcribed, without holding it all in memory. With a capo, the tab starts with a
+    :data:`CAPO_HEADER` line.
+    """
+
+    def __init__(self, out_file: pathlib.Path, string_names: Sequence[str] = STRING_NAMES, capo: int = 0) -> None:
+        """
+        :param out_file: Path of the tablature (.txt) to write
+        :type out_file: pathlib.Path
+        :param string_names: Label of each string, low to high, e.g. :attr:`Tuning.string_names`
+        :type string_names: Sequence[str]
+        :param capo: Fret of the capo the frets count from
+        :type capo: int
+        """
+        self.out_file = pathlib.Path(out_file)
+        self.capo = capo
+        self._lines = [tempfile.SpooledTemporaryFile(max_size=_TAB_SPOOL_BYTES, mode="w+") for _ in string_names]
+        self._columns: list[list[str]] = [[f"{name}|-"] for name in string_names]
+
+    def write_groups(self, grouped_final_notes: list[list[FinalNote]]) -> None:
+        """Append one column per group, each followed by a separator column."""
         for final_group in grouped_final_notes:
-            for s in range(1, 7):
-                string_written = False
-                for note in final_group:
-                    if note.string == s:
-                        tab_lines[s - 1].append(f"{note.fret}")
-                        string_written = True
-                        break
+            for column, cell in zip(self._columns, _tab_cells(final_group)):
+                column.append(cell)
 
-                if not string_written:
-                    tab_lines[s - 1].append("-")
+        if len(self._columns[0]) >= _TAB_FLUSH_COLUMNS:
+            self._flush()
 
-            # Append separator
-            for s in range(NUM_STRINGS):
-                tab_lines[s - 1].append("-")
+    def _flush(self) -> None:
+        for line, column in zip(self._lines, self._columns):
+            line.write("".join(column))
+            column.clear()
 
-        # Finalize output
-        tab_text = "\n".join("".join(line) for line in tab_lines[::-1])
-        f.write(tab_text)
+    def close(self) -> pathlib.Path:
+        """Write the tablature to ``out_file``, high string first."""
+        self._flush()
+        with self.out_file.open("w") as f:
+            if self.capo:
+                f.write(CAPO_HEADER.format(capo=self.capo) + "\n")
+            for i, line in enumerate(reversed(self._lines)):
+                if i:
+                    f.write("\n")
+                line.seek(0)
+                shutil.copyfileobj(line, f)
+                line.close()
 
-    return out_file
+        return self.out_file
+
+
+class TabBlockWriter:
+    """
+    Writes tablature to an open text stream as soon as it is fingered.
+
+    Every call to :meth:`write_groups` prints a block of six lines, high string first,
+    followed by a blank line, and flushes the stream. Used for live output, where
+    nothing may be held back until the end of the piece. With a capo, the first block is
+    preceded by a :data:`CAPO_HEADER` line.
+    """
+
+    def __init__(self, stream: TextIO, string_names: Sequence[str] = STRING_NAMES, capo: int = 0) -> None:
+        """
+        :param stream: Text stream to write to, e.g. ``sys.stdout``
+        :type stream: TextIO
+        :param string_names: Label of each string, low to high, e.g. :attr:`Tuning.string_names`
+        :type string_names: Sequence[str]
+        :param capo: Fret of the capo the frets count from
+        :type capo: int
+        """
+        self.stream = stream
+        self.string_names = list(string_names)
+        self._header = CAPO_HEADER.format(capo=capo) + "\n" if capo else ""
+
+    def write_groups(self, grouped_final_notes: list[list[FinalNote]]) -> None:
+        """Write one block with a column per group."""
+        if not grouped_final_notes:
+            return
+        lines = [[f"{name}|-"] for name in self.string_names]
+        for final_group in grouped_final_notes:
+            for line, cell in zip(lines, _tab_cells(final_group)):
+                line.append(cell)
+        self.stream.write(self._header + "\n".join("".join(line) for line in reversed(lines)) + "\n\n")
+        self._header = ""
+        self.stream.flush()
+
+    def close(self) -> TextIO:
+        self.stream.flush()
+        return self.stream
+
+
+class TabStream:
+    """
+    Fingers notes and writes them as tablature while they are still arriving.
+
+    Notes are passed to :meth:`add` in batches, together with a horizon before which no
+    later note starts. Every cluster that can no longer grow is fingered and written
+    straight away, so only the notes of the last, still open cluster are held. With the
+    greedy engine the result is the same as passing all notes to :func:`notes_to_guitar_tab`
+    at once. The beam engine searches every batch of closed clusters on its own.
+    """
+
+    def __init__(
+        self,
+        writer: TabWriter | TabBlockWriter,
+        quantisation: int,
+        max_fret: int = 24,
+        fingering_cache: Optional[FingeringCache] = None,
+        engine: str = "greedy",
+        beam_width: int = BEAM_WIDTH,
+        tuning: str = "standard",
+        capo: int = 0,
+    ) -> None:
+        """
+        :param writer: Where the fingered groups are written
+        :type writer: TabWriter | TabBlockWriter
+        :param quantisation: Timeframe in ms within which notes are considered to be concurrent
+        :type quantisation: int
+        :param max_fret: Highest fret a note may be played on
+        :type max_fret: int
+        :param fingering_cache: Reuses the fingering of repeated phrases
+        :type fingering_cache: FingeringCache
+        :param engine: How notes are fingered, one of :data:`FINGERING_ENGINES`
+        :type engine: str
+        :param beam_width: Fingerings the beam engine keeps after every group of notes
+        :type beam_width: int
+        :param tuning: Name of a registered tuning. ``"auto"`` needs every note up front, so it isn't supported.
+        :type tuning: str
+        :param capo: Fret of the capo; frets in the tab count from it. Give the *writer* the same capo
+        :type capo: int
+        """
+        if tuning == AUTO_TUNING:
+            raise ValueError("The tuning can't be chosen automatically while notes are still arriving")
+        self.writer = writer
+        self.quantisation = quantisation
+        self.max_fret = max_fret
+        self.fingering_cache = fingering_cache
+        self.engine = engine
+        self.beam_width = beam_width
+        self.tuning = get_tuning(tuning)
+        self.capo = capo
+        self.note_count = 0
+        self._pending = np.empty(0, dtype=NOTE_DTYPE)
+
+    def add(self, notes: list[tuple[float, float, int]] | np.ndarray, horizon: float) -> None:
+        """
+        Add *notes*, ``(start, end, pitch)`` tuples or a ``NOTE_DTYPE`` array, none of which
+        starts before a horizon passed earlier, and finger what can no longer change.
+
+        Raises
+        ------
+        UnplayableError
+            If a note has no string it can be played on.
+        """
+        if not isinstance(notes, np.ndarray):
+            notes = np.array(notes, dtype=NOTE_DTYPE)
+        notes = notes[notes["end_time"] > notes["start_time"]]
+        self.note_count += len(notes)
+        self._pending = np.concatenate((self._pending, notes))
+        if not len(self._pending):
+            return
+
+        with stage("clustering") as timed:
+            note_array = NoteArray(self._pending, tuning=self.tuning.pitches, max_fret=self.max_fret, capo=self.capo)
+            note_array.check_playable()
+            bounds = note_array.cluster_bounds()
+
+            # All clusters but the last are closed; the last one too once every later note starts after it ends
+            closed = len(bounds) - 2
+            if note_array.end_times.max() <= horizon:
+                closed += 1
+            timed.count(notes=len(notes), clusters=max(closed, 0))
+
+        if closed > 0:
+            with stage("assign_notes", clusters=closed):
+                groups = _assign_clusters(
+                    note_array,
+                    bounds[: closed + 1],
+                    self.quantisation,
+                    self.fingering_cache,
+                    self.engine,
+                    self.beam_width,
+                )
+            with stage("tab_write", columns=len(groups)):
+                self.writer.write_groups(groups)
+            first_open = bounds[closed]
+            self._pending = note_array.notes[first_open:]
+
+    def close(self) -> pathlib.Path | TextIO:
+        """Finger the remaining notes and close the writer, returning what it returns."""
+        self.add(np.empty(0, dtype=NOTE_DTYPE), float("inf"))
+        return self.writer.close()
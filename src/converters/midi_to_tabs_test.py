@@ -0,0 +1,135 @@
+import pathlib
+import random
+
+import pretty_midi
+
+from src.models.note_array import NoteArray
+from src.models.tuning import TUNINGS
+
+from .midi_to_tabs import (
+    CAPO_HEADER,
+    TabBlockWriter,
+    TabStream,
+    TabWriter,
+    _assign_clusters,
+    _assign_clusters_parallel,
+    _write_guitar_tab,
+    midi_to_guitar_tab,
+    notes_to_guitar_tab,
+)
+
+
+class TestNotesToGuitarTab:
+    def setup_method(self) -> None:
+        rng = random.Random(0)
+        self.midi = pretty_midi.PrettyMIDI(initial_tempo=120)
+        instrument = pretty_midi.Instrument(program=4)
+        start = 0.0
+        for _ in range(40):
+            start += rng.choice([0.0116, 0.2, 0.3])
+            length = rng.choice([0.1, 0.2, 0.4])
+            instrument.notes.append(
+                pretty_midi.Note(velocity=80, pitch=rng.randint(40, 76), start=start, end=start + length)
+            )
+        self.midi.instruments.append(instrument)
+
+    def test_matches_midi_file_round_trip(self, tmp_path) -> None:
+        midi_path = tmp_path / "song.mid"
+        self.midi.write(str(midi_path))
+
+        from_file = midi_to_guitar_tab(midi_path, tmp_path / "from_file", quantisation=150)
+        in_memory = notes_to_guitar_tab(self.midi, tmp_path / "in_memory" / "song.txt", quantisation=150)
+
+        assert in_memory.read_text() == from_file.read_text()
+
+    def _tab_pitches(self, tab_path: pathlib.Path) -> list[int]:
+        """The pitch of every fret in *tab_path*, read back with the tuning its strings are labelled with."""
+        lines = tab_path.read_text().splitlines()
+        capo = 0
+        prefix = CAPO_HEADER.format(capo="")
+        if lines[0].startswith(prefix):
+            capo = int(lines.pop(0).removeprefix(prefix))
+        names = [line.split("|")[0] for line in reversed(lines)]
+        (tuning,) = [tuning for tuning in TUNINGS.values() if tuning.string_names == names]
+        pitches = []
+        for open_pitch, line in zip(tuning.pitches, reversed(lines)):
+            pitches += [open_pitch + capo + int(fret) for fret in line.split("|", 1)[1].split("-") if fret]
+        return sorted(pitches)
+
+    def test_capo_tabs_read_back_as_the_notes(self, tmp_path) -> None:
+        # Above the open low string with any capo used here
+        notes = [(index * 0.3, index * 0.3 + 0.2, 45 + (index * 7) % 31) for index in range(40)]
+        pitches = sorted(pitch for _, _, pitch in notes)
+
+        plain = notes_to_guitar_tab(notes, tmp_path / "plain.txt", quantisation=150)
+        capo = notes_to_guitar_tab(notes, tmp_path / "capo.txt", quantisation=150, capo=2)
+        auto = notes_to_guitar_tab(notes, tmp_path / "auto.txt", quantisation=150, tuning="auto", capo=3)
+
+        assert not plain.read_text().startswith("Capo")
+        assert capo.read_text().splitlines()[0] == "Capo 2"
+        assert auto.read_text().splitlines()[0] == "Capo 3"
+        for tab_path in (plain, capo, auto):
+            assert self._tab_pitches(tab_path) == pitches
+
+
+class TestParallelFingering:
+    def test_matches_serial(self) -> None:
+        rng = random.Random(1)
+        notes = []
+        start = 0.0
+        for _ in range(3_000):
+            start += rng.choice([0.15, 0.2, 0.3])
+            notes.append((start, start + rng.choice([0.1, 0.2, 0.4]), rng.randint(55, 64)))
+        note_array = NoteArray.from_tuples(notes)
+        bounds = note_array.cluster_bounds()
+
+        assert _assign_clusters_parallel(note_array, bounds, 150, workers=2) == _assign_clusters(
+            note_array, bounds, 150
+        )
+
+
+class TestTabStream:
+    def setup_method(self) -> None:
+        rng = random.Random(2)
+        self.notes = []
+        start = 0.0
+        for _ in range(200):
+            start += rng.choice([0.2, 0.3, 0.5])
+            for offset, pitch in enumerate(rng.sample(range(55, 72), rng.choice([1, 1, 2, 3]))):
+                self.notes.append((start + 0.0116 * offset, start + rng.choice([0.1, 0.15]), pitch))
+
+    def test_matches_writing_all_notes_at_once(self, tmp_path) -> None:
+        expected_notes = list(self.notes)
+        expected = _write_guitar_tab(self.notes, tmp_path / "whole.txt", quantisation=150, max_fret=24)
+
+        stream = TabStream(TabWriter(tmp_path / "streamed.txt"), quantisation=150)
+        for horizon in (5.0, 5.0, 20.0, 33.3, 60.0, 61.0):
+            stream.add([note for note in self.notes if note[0] < horizon], horizon)
+            self.notes = [note for note in self.notes if note[0] >= horizon]
+        stream.add(self.notes, float("inf"))
+
+        assert stream.close().read_text() == expected.read_text()
+        assert stream.note_count == len(expected_notes)
+
+    def test_block_writer_writes_each_batch_straight_away(self, tmp_path) -> None:
+        with (tmp_path / "live.txt").open("w") as out:
+            stream = TabStream(TabBlockWriter(out), quantisation=150)
+            stream.add([(0.0, 0.1, 64), (0.3, 0.4, 52)], horizon=0.35)
+            # Only the first cluster is closed; the second could still be joined by a later note
+            assert (tmp_path / "live.txt").read_text() == "e|-0-\nB|---\nG|---\nD|---\nA|---\nE|---\n\n"
+
+            stream.add([], horizon=1.0)
+            stream.close()
+
+        blocks = (tmp_path / "live.txt").read_text().split("\n\n")
+        assert blocks[1] == "e|---\nB|---\nG|---\nD|-2-\nA|---\nE|---"
+
+    def test_block_writer_heads_capo_tabs(self, tmp_path) -> None:
+        with (tmp_path / "live.txt").open("w") as out:
+            stream = TabStream(TabBlockWriter(out, capo=2), quantisation=150, capo=2)
+            stream.add([(0.0, 0.1, 66)], horizon=0.2)
+            stream.add([(0.3, 0.4, 54)], horizon=1.0)
+            stream.close()
+
+        assert (tmp_path / "live.txt").read_text().startswith("Capo 2\ne|-0-\n")
+        assert (tmp_path / "live.txt").read_text().count("Capo") == 1
@@ -0,0 +1,97 @@
+import heapq
+import pathlib
+import struct
+from typing import Iterable
+
+# Program basic_pitch writes its transcriptions with ("Electric Piano 1")
+DEFAULT_PROGRAM = 4
+
+
+def _varlen(value: int) -> bytes:
+    """Encode *value* as a MIDI variable-length quantity."""
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+class StreamingMidiWriter:
+    """
+    Writes a single-track MIDI file as notes arrive, instead of building it in memory.
+
+    Only the note-offs of notes still sounding are held back. Events are written in the
+    same order as ``pretty_midi`` writes them (by tick, then pitch, then velocity, with
+    note-offs as velocity 0 note-ons), so the file reads back the same way.
+    """
+
+    def __init__(
+        self,
+        midi_path: pathlib.Path | str,
+        resolution: int = 220,
+        tempo: float = 120,
+        program: int = DEFAULT_PROGRAM,
+    ) -> None:
+        """
+        :param midi_path: File to write
+        :type midi_path: pathlib.Path | str
+        :param resolution: Ticks per beat
+        :type resolution: int
+        :param tempo: Tempo in beats per minute
+        :type tempo: float
+        :param program: General MIDI program of the track
+        :type program: int
+        """
+        self.midi_path = pathlib.Path(midi_path).expanduser().resolve()
+        self.ticks_per_second = resolution * tempo / 60
+        self._events: list[tuple[int, int, int]] = []  # heap of (tick, pitch, velocity)
+        self._last_tick = 0
+
+        self._file = self.midi_path.open("wb")
+        self._file.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, resolution))
+        self._file.write(b"MTrk\x00\x00\x00\x00")  # the track length is filled in by close()
+        self._track_start = self._file.tell()
+        self._file.write(b"\x00\xff\x51\x03" + round(6e7 / tempo).to_bytes(3, "big"))
+        self._file.write(bytes([0x00, 0xC0, program]))
+
+    def time_to_tick(self, time: float) -> int:
+        return int(round(time * self.ticks_per_second))
+
+    def add_notes(self, notes: Iterable[tuple[float, float, int, int]]) -> None:
+        """Queue ``(start, end, pitch, velocity)`` notes; they are written by :meth:`flush`."""
+        for start, end, pitch, velocity in notes:
+            heapq.heappush(self._events, (self.time_to_tick(start), pitch, velocity))
+            heapq.heappush(self._events, (self.time_to_tick(end), pitch, 0))
+
+    def flush(self, horizon: float = float("inf")) -> None:
+        """
+        Write every queued event before *horizon* seconds.
+
+        No note added later may start before *horizon*, otherwise events end up out of order.
+        """
+        stop_tick = self.time_to_tick(horizon) if horizon != float("inf") else None
+        chunk = bytearray()
+        while self._events and (stop_tick is None or self._events[0][0] < stop_tick):
+            tick, pitch, velocity = heapq.heappop(self._events)
+            chunk += _varlen(tick - self._last_tick)
+            chunk += bytes([0x90, pitch, velocity])
+            self._last_tick = tick
+        self._file.write(chunk)
+
+    def close(self) -> pathlib.Path:
+        """Write the remaining events and the end of the track, and close the file."""
+        self.flush()
+        self._file.write(b"\x00\xff\x2f\x00")
+        track_length = self._file.tell() - self._track_start
+        self._file.seek(self._track_start - 4)
+        self._file.write(struct.pack(">I", track_length))
+        self._file.close()
+        return self.midi_path
+
+    def __enter__(self) -> "StreamingMidiWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if not self._file.closed:
+            self.close()
@@ -0,0 +1,41 @@
+import random
+
+import pretty_midi
+
+from .midi_parser import read_midi_notes
+from .midi_writer import StreamingMidiWriter
+
+
+class TestStreamingMidiWriter:
+    def setup_method(self) -> None:
+        rng = random.Random(0)
+        self.notes = []
+        start = 0.0
+        for _ in range(300):
+            start += rng.choice([0.0, 0.1, 0.25])
+            self.notes.append((start, start + rng.choice([0.1, 0.5, 2.0]), rng.randint(40, 76), rng.randint(1, 127)))
+
+    def test_matches_pretty_midi(self, tmp_path) -> None:
+        midi = pretty_midi.PrettyMIDI(initial_tempo=120)
+        instrument = pretty_midi.Instrument(program=4)
+        for start, end, pitch, velocity in self.notes:
+            instrument.notes.append(pretty_midi.Note(velocity=velocity, pitch=pitch, start=start, end=end))
+        midi.instruments.append(instrument)
+        midi.write(str(tmp_path / "expected.mid"))
+
+        with StreamingMidiWriter(tmp_path / "streamed.mid") as writer:
+            for horizon in (3.0, 10.0, 10.0, 40.0):
+                writer.add_notes(note for note in self.notes if note[0] < horizon)
+                self.notes = [note for note in self.notes if note[0] >= horizon]
+                writer.flush(horizon)
+            writer.add_notes(self.notes)
+
+        expected = read_midi_notes(tmp_path / "expected.mid")
+        streamed = read_midi_notes(tmp_path / "streamed.mid")
+        assert streamed.tolist() == expected.tolist()
+
+        read_back = pretty_midi.PrettyMIDI(str(tmp_path / "streamed.mid"))
+        assert read_back.instruments[0].program == 4
+        assert [note.velocity for note in read_back.instruments[0].notes] == [
+            note.velocity for note in pretty_midi.PrettyMIDI(str(tmp_path / "expected.mid")).instruments[0].notes
+        ]
@@ -0,0 +1,115 @@
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from src.converters.audio_decode import MODEL_SAMPLE_RATE
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+# Mirrors basic_pitch.constants, which can't be imported without loading TensorFlow
+FFT_HOP = 256
+ANNOTATIONS_FPS = MODEL_SAMPLE_RATE // FFT_HOP
+ANNOT_N_FRAMES = ANNOTATIONS_FPS * 2
+AUDIO_N_SAMPLES = MODEL_SAMPLE_RATE * 2 - FFT_HOP
+
+# Windowing of basic_pitch.inference.run_inference: windows overlap by 30 frames, half of
+# which is dropped from either end of every window's output
+N_OVERLAPPING_FRAMES = 30
+OVERLAP_LEN = N_OVERLAPPING_FRAMES * FFT_HOP
+HOP_SIZE = AUDIO_N_SAMPLES - OVERLAP_LEN
+FRAMES_PER_WINDOW = ANNOT_N_FRAMES - N_OVERLAPPING_FRAMES
+
+# Frequency bins of every model output
+OUTPUT_BINS = {"note": 88, "onset": 88, "contour": 264}
+
+
+def model_frame_times(start: int, stop: int) -> np.ndarray:
+    """
+    Times in seconds of model frames ``start:stop``, as ``basic_pitch.note_creation.model_frames_to_time``
+    gives them for a whole file, without computing the frames before *start*.
+    """
+    frames = np.arange(start, stop)
+    original_times = (frames * FFT_HOP) / float(MODEL_SAMPLE_RATE)
+    window_numbers = np.floor(frames / ANNOT_N_FRAMES)
+    window_offset = (FFT_HOP / MODEL_SAMPLE_RATE) * (ANNOT_N_FRAMES - (AUDIO_N_SAMPLES / FFT_HOP)) + 0.0018
+    return original_times - (window_offset * window_numbers)
+
+
+def window_count(n_samples: int) -> int:
+    """Number of model windows basic_pitch runs over *n_samples* of audio."""
+    padded_length = n_samples + OVERLAP_LEN // 2
+    return -(-padded_length // HOP_SIZE)
+
+
+def frame_count(n_samples: int) -> int:
+    """Number of model frames basic_pitch keeps for *n_samples* of audio."""
+    return int(np.floor(n_samples * (ANNOTATIONS_FPS / MODEL_SAMPLE_RATE)))
+
+
+def infer_windows(
+    model: "Model", audio: np.ndarray, first_window: int, stop_window: int, offset: int = 0
+) -> dict[str, np.ndarray]:
+    """
+    Run the model over windows ``first_window:stop_window`` of *audio*.
+
+    Only the audio under those windows is read, and the output is exactly the matching
+    slice of what ``basic_pitch.inference.run_inference`` returns for the whole file
+    (except at the very end, where it is not yet trimmed to :func:`frame_count`).
+    *audio* may be the tail of the file, starting at sample *offset*, as long as it
+    covers the windows.
+
+    Returns
+    -------
+    dict
+        ``{'note': array, 'onset': array, 'contour': array}`` for frames
+        ``first_window * FRAMES_PER_WINDOW`` to ``stop_window * FRAMES_PER_WINDOW``.
+    """
+    n_olap = N_OVERLAPPING_FRAMES // 2
+    outputs: dict[str, list[np.ndarray]] = {"note": [], "onset": [], "contour": []}
+    for window_index in range(first_window, stop_window):
+        # basic_pitch pads the start of the audio with half an overlap of silence
+        start = window_index * HOP_SIZE - OVERLAP_LEN // 2 - offset
+        window = np.zeros(AUDIO_N_SAMPLES, dtype=np.float32)
+        lo, hi = max(start, 0), min(start + AUDIO_N_SAMPLES, len(audio))
+        if hi > lo:
+            window_lo, window_hi = lo - start, hi - start
+            window[window_lo:window_hi] = audio[lo:hi]
+
+        for key, value in model.predict(window[np.newaxis, :, np.newaxis]).items():
+            outputs[key].append(value[0, n_olap:-n_olap, :])
+
+    return {key: np.concatenate(values) for key, values in outputs.items()}
+
+
+def run_model(model: "Model", audio: np.ndarray, active_windows: Optional[np.ndarray] = None) -> dict[str, np.ndarray]:
+    """
+    Run the model over the whole of *audio*, as ``basic_pitch.inference.run_inference`` does
+    after decoding the file.
+
+    If *active_windows* is given (see :meth:`SilenceGate.active_windows`), the model only
+    runs on the windows marked ``True``, and the output of the others is all zeros.
+
+    Returns
+    -------
+    dict
+        ``{'note': array, 'onset': array, 'contour': array}``, one row per model frame.
+    """
+    n_frames = frame_count(len(audio))
+    n_windows = window_count(len(audio))
+    if active_windows is None or active_windows.all():
+        model_output = infer_windows(model, audio, 0, n_windows)
+    else:
+        # Run the model on every stretch of active windows, and fill the gaps in between with zeros
+        outputs: dict[str, list[np.ndarray]] = {key: [] for key in OUTPUT_BINS}
+        changes = np.flatnonzero(active_windows[1:] != active_windows[:-1]) + 1
+        bounds = [0, *changes.tolist(), n_windows]
+        for first, stop in zip(bounds, bounds[1:]):
+            if active_windows[first]:
+                for key, value in infer_windows(model, audio, first, stop).items():
+                    outputs[key].append(value)
+            else:
+                for key, bins in OUTPUT_BINS.items():
+                    outputs[key].append(np.zeros(((stop - first) * FRAMES_PER_WINDOW, bins), dtype=np.float32))
+        model_output = {key: np.concatenate(values) for key, values in outputs.items()}
+    return {key: value[:n_frames] for key, value in model_output.items()}
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from .model_windows import (
+    FRAMES_PER_WINDOW,
+    HOP_SIZE,
+    OVERLAP_LEN,
+    frame_count,
+    infer_windows,
+    model_frame_times,
+    run_model,
+    window_count,
+)
+
+
+class TestWindowing:
+    def test_window_count_matches_basic_pitch_loop(self) -> None:
+        for n_samples in (0, 1, HOP_SIZE - OVERLAP_LEN // 2, HOP_SIZE, 22050 * 60, 22050 * 3600 + 17):
+            padded_length = n_samples + OVERLAP_LEN // 2
+            assert window_count(n_samples) == len(range(0, padded_length, HOP_SIZE))
+
+    def test_frame_times_match_whole_file(self) -> None:
+        note_creation = pytest.importorskip("basic_pitch.note_creation")
+        n_frames = frame_count(22050 * 30)
+        expected = note_creation.model_frames_to_time(n_frames)
+
+        assert np.allclose(model_frame_times(0, n_frames), expected)
+        assert np.allclose(model_frame_times(1000, 2000), expected[1000:2000])
+
+
+class TestInferWindows:
+    def setup_method(self) -> None:
+        rng = np.random.default_rng(0)
+        self.audio = (0.1 * rng.standard_normal(22050 * 5)).astype(np.float32)
+
+    def test_matches_run_inference(self) -> None:
+        inference = pytest.importorskip("basic_pitch.inference")
+        model = inference.Model(inference.ICASSP_2022_MODEL_PATH)
+
+        audio_original = np.concatenate([np.zeros(OVERLAP_LEN // 2, dtype=np.float32), self.audio])
+        expected: dict[str, list[np.ndarray]] = {"note": [], "onset": [], "contour": []}
+        for window, _ in inference.window_audio_file(audio_original, HOP_SIZE):
+            for key, value in model.predict(window).items():
+                expected[key].append(value)
+        n_olap = 15
+        expected_frames = {
+            key: np.concatenate([value[0, n_olap:-n_olap] for value in values]) for key, values in expected.items()
+        }
+
+        stop_window = window_count(len(self.audio))
+        output = infer_windows(model, self.audio, 1, stop_window)
+        first_frame = FRAMES_PER_WINDOW
+        for key, value in output.items():
+            assert np.allclose(value, expected_frames[key][first_frame:])
+
+    def test_run_model_matches_run_inference(self, tmp_path) -> None:
+        inference = pytest.importorskip("basic_pitch.inference")
+        soundfile = pytest.importorskip("soundfile")
+        model = inference.Model(inference.ICASSP_2022_MODEL_PATH)
+        audio_path = tmp_path / "noise.wav"
+        soundfile.write(audio_path, self.audio, 22050, subtype="FLOAT")
+
+        expected = inference.run_inference(audio_path, model)
+        output = run_model(model, self.audio)
+        for key, value in output.items():
+            assert value.shape == expected[key].shape
+            assert np.allclose(value, expected[key])
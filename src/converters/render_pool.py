@@ -0,0 +1,253 @@
+import os
+import pathlib
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, Sequence
+
+from src.converters.midi_to_audio import AUDIO_FORMATS, midi_to_audio_stream, render_midi_to_audio
+from src.profiling.profiler import stage
+
+# Seconds a single render (one MIDI file with one SoundFont, in every format) may take before it is killed
+DEFAULT_RENDER_TIMEOUT = 600
+
+
+class RenderJob:
+    """One MIDI file rendered with one SoundFont, written in one or more formats."""
+
+    __slots__ = ("midi_path", "soundfont_path", "outputs")
+
+    def __init__(self, midi_path: pathlib.Path, soundfont_path: pathlib.Path, outputs: dict[str, pathlib.Path]) -> None:
+        """
+        :param midi_path: MIDI file to render
+        :type midi_path: pathlib.Path
+        :param soundfont_path: SoundFont (.sf2) to render it with
+        :type soundfont_path: pathlib.Path
+        :param outputs: Path to write for each format of ``AUDIO_FORMATS``
+        :type outputs: dict[str, pathlib.Path]
+        """
+        self.midi_path = midi_path
+        self.soundfont_path = soundfont_path
+        self.outputs = outputs
+
+
+def _labelled(soundfonts: Sequence[pathlib.Path], labelled: Optional[bool]) -> bool:
+    return len(soundfonts) > 1 if labelled is None else labelled
+
+
+def output_key(
+    audio_format: str,
+    soundfont_path: pathlib.Path,
+    soundfonts: Sequence[pathlib.Path],
+    labelled: Optional[bool] = None,
+) -> str:
+    """
+    Name of a rendered file in results: the format, followed by the SoundFont when there are several
+    (or if *labelled*), e.g. ``mp3`` or ``mp3_wah_wah``.
+    """
+    if not _labelled(soundfonts, labelled):
+        return audio_format
+    return f"{audio_format}_{pathlib.Path(soundfont_path).stem}"
+
+
+def plan_renders(
+    midi_paths: Sequence[pathlib.Path],
+    out_dir: pathlib.Path,
+    soundfonts: Sequence[pathlib.Path],
+    formats: Sequence[str],
+    labelled: Optional[bool] = None,
+) -> list[RenderJob]:
+    """
+    One job per MIDI file and SoundFont. Files are written to *out_dir* as ``<midi stem>.<format>``,
+    or ``<midi stem>_<soundfont stem>.<format>`` when there are several SoundFonts. *labelled*
+    overrides that, e.g. to re-render one of several SoundFonts under the same names.
+
+    Raises
+    ------
+    ValueError
+        If a format is unknown or nothing is to be rendered.
+    """
+    unknown = set(formats) - set(AUDIO_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown audio formats {', '.join(sorted(unknown))}, expected any of {AUDIO_FORMATS}")
+    if not soundfonts or not formats:
+        raise ValueError("At least one SoundFont and one audio format are needed to render")
+
+    out_dir = pathlib.Path(out_dir).expanduser().resolve()
+    label = _labelled(soundfonts, labelled)
+    jobs = []
+    for midi_path in midi_paths:
+        midi_path = pathlib.Path(midi_path)
+        for soundfont_path in soundfonts:
+            stem = f"{midi_path.stem}_{pathlib.Path(soundfont_path).stem}" if label else midi_path.stem
+            outputs = {fmt: out_dir / f"{stem}.{fmt}" for fmt in dict.fromkeys(formats)}
+            jobs.append(RenderJob(midi_path, pathlib.Path(soundfont_path), outputs))
+    return jobs
+
+
+def run_render_job(
+    job: RenderJob,
+    timeout: Optional[float] = DEFAULT_RENDER_TIMEOUT,
+    sample_rate: int = 44100,
+    bitrate: str = "192k",
+) -> dict:
+    """
+    Render *job* with one fluidsynth process feeding an encoder per format, and describe the outcome.
+
+    Failures are recorded in the returned status instead of being raised, so one bad file or
+    SoundFont does not abort the others.
+
+    Returns
+    -------
+    dict
+        ``{'midi', 'soundfont', 'status', <format>: path, 'error', 'seconds'}``, where the
+        status is ``ok``, ``failed`` or ``timeout``.
+    """
+    started = time.perf_counter()
+    status: dict = {"midi": str(job.midi_path), "soundfont": str(job.soundfont_path), "status": "ok"}
+    try:
+        job.outputs[next(iter(job.outputs))].parent.mkdir(parents=True, exist_ok=True)
+        with stage("fluidsynth_ffmpeg"):
+            written = midi_to_audio_stream(
+                job.midi_path,
+                job.outputs,
+                job.soundfont_path,
+                sample_rate=sample_rate,
+                bitrate=bitrate,
+                timeout=timeout,
+            )
+        status.update({fmt: str(path) for fmt, path in written.items()})
+    except subprocess.TimeoutExpired:
+        status["status"] = "timeout"
+        status["error"] = f"Rendering took longer than {timeout}s"
+    except Exception as exc:
+        status["status"] = "failed"
+        status["error"] = f"{type(exc).__name__}: {exc}"
+
+    status["seconds"] = round(time.perf_counter() - started, 3)
+    return status
+
+
+def render_many(
+    midi_paths: Sequence[pathlib.Path],
+    out_dir: pathlib.Path,
+    soundfonts: Sequence[pathlib.Path],
+    formats: Sequence[str] = ("mp3",),
+    *,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = DEFAULT_RENDER_TIMEOUT,
+    sample_rate: int = 44100,
+    bitrate: str = "192k",
+    on_finished: Optional[Callable[[dict], None]] = None,
+    labelled: Optional[bool] = None,
+) -> list[dict]:
+    """
+    Render every MIDI file of *midi_paths* with every SoundFont of *soundfonts*, in every format.
+
+    The work happens in fluidsynth and ffmpeg subprocesses, so the jobs (see :func:`plan_renders`)
+    run on a pool of *workers* threads that each look after one render at a time. That bounds
+    the number of fluidsynth processes to *workers*, one per core by default. A render that takes
+    longer than *timeout* seconds is killed and reported as ``timeout``.
+
+    Returns
+    -------
+    list[dict]
+        The status of every job, in job order (see :func:`run_render_job`). *on_finished* is
+        called with each status, in the calling thread, as soon as its job is done.
+    """
+    jobs = plan_renders(midi_paths, out_dir, soundfonts, formats, labelled)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render") as pool:
+        futures = {
+            pool.submit(run_render_job, job, timeout=timeout, sample_rate=sample_rate, bitrate=bitrate): index
+            for index, job in enumerate(jobs)
+        }
+        statuses: list[dict] = [{}] * len(jobs)
+        for future in as_completed(futures):
+            statuses[futures[future]] = future.result()
+            if on_finished is not None:
+                on_finished(future.result())
+    return statuses
+
+
+def _inprocess_available() -> bool:
+    """Whether the in-process renderer can start, starting it if so."""
+    from src.converters.fluidsynth_renderer import shared_renderer
+
+    try:
+        shared_renderer()
+    except RuntimeError:
+        return False
+    return True
+
+
+def render_midi(
+    midi_path: pathlib.Path,
+    out_dir: pathlib.Path,
+    soundfonts: Sequence[pathlib.Path],
+    formats: Sequence[str],
+    *,
+    backend: str = "cli",
+    workers: Optional[int] = None,
+    timeout: Optional[float] = DEFAULT_RENDER_TIMEOUT,
+    labelled: Optional[bool] = None,
+) -> dict:
+    """
+    Render one MIDI file with every SoundFont in every format, the SoundFonts at the same time.
+    Files are named as by :func:`plan_renders`.
+
+    The in-process backends keep their SoundFonts loaded in this process, so with those the
+    SoundFonts are rendered one after another by :func:`render_midi_to_audio`, in WAV and MP3 only.
+    ``"auto"`` renders with the command-line tools instead when other formats are asked for or
+    the in-process renderer can't start.
+
+    Returns
+    -------
+    dict
+        The path written for every format and SoundFont, keyed by :func:`output_key`.
+
+    Raises
+    ------
+    RuntimeError
+        If any render failed or timed out.
+    ValueError
+        If the ``"inprocess"`` backend is asked for a format other than WAV or MP3.
+    """
+    unsupported = set(formats) - {"wav", "mp3"}
+    if backend == "auto":
+        backend = "cli" if unsupported or not _inprocess_available() else "inprocess"
+    if backend == "inprocess" and unsupported:
+        raise ValueError(f"The {backend} backend can't render {', '.join(sorted(unsupported))}")
+
+    if backend != "cli":
+
+        result = {}
+        for soundfont_path in soundfonts:
+            rendered = render_midi_to_audio(
+                midi_path=midi_path,
+                out_dir=out_dir,
+                soundfont_path=soundfont_path,
+                generate_wav="wav" in formats,
+                generate_mp3="mp3" in formats,
+                backend=backend,
+            )
+            for fmt, path in rendered.items():
+                if _labelled(soundfonts, labelled):
+                    # Every SoundFont renders to the same name, so move each out of the way of the next
+                    path = path.rename(path.with_name(f"{path.stem}_{pathlib.Path(soundfont_path).stem}{path.suffix}"))
+                result[output_key(fmt, soundfont_path, soundfonts, labelled)] = path
+        return result
+
+    statuses = render_many(
+        [midi_path], out_dir, soundfonts, formats, workers=workers, timeout=timeout, labelled=labelled
+    )
+    failed = [status for status in statuses if status["status"] != "ok"]
+    if failed:
+        raise RuntimeError("; ".join(f"{status['soundfont']}: {status['error']}" for status in failed))
+
+    return {
+        output_key(fmt, pathlib.Path(status["soundfont"]), soundfonts, labelled): pathlib.Path(status[fmt])
+        for status in statuses
+        for fmt in dict.fromkeys(formats)
+    }
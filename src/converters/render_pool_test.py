@@ -0,0 +1,118 @@
+import pathlib
+import shutil
+import sys
+
+import pytest
+
+from .midi_to_audio_test import stub_tools
+from .midi_writer import StreamingMidiWriter
+from .render_pool import RenderJob, output_key, plan_renders, render_many, render_midi, run_render_job
+
+SOUNDFONTS = [pathlib.Path("instruments/clean_acoustic.sf2"), pathlib.Path("instruments/wah_wah.sf2")]
+
+
+def _write_midi(notes: list[tuple[float, float, int]], midi_path: pathlib.Path) -> pathlib.Path:
+    with StreamingMidiWriter(midi_path) as writer:
+        writer.add_notes((start, end, pitch, 100) for start, end, pitch in notes)
+    return midi_path
+
+
+needs_tools = pytest.mark.skipif(
+    shutil.which("fluidsynth") is None or shutil.which("ffmpeg") is None, reason="fluidsynth and ffmpeg are needed"
+)
+
+
+class TestPlanRenders:
+    def test_one_soundfont_keeps_the_midi_name(self, tmp_path) -> None:
+        jobs = plan_renders([pathlib.Path("songs/riff.mid")], tmp_path, SOUNDFONTS[:1], ["mp3", "flac", "mp3"])
+
+        assert len(jobs) == 1
+        assert jobs[0].outputs == {"mp3": tmp_path / "riff.mp3", "flac": tmp_path / "riff.flac"}
+        assert output_key("mp3", SOUNDFONTS[0], SOUNDFONTS[:1]) == "mp3"
+
+    def test_several_soundfonts_are_named_in_the_files(self, tmp_path) -> None:
+        jobs = plan_renders([pathlib.Path("a.mid"), pathlib.Path("b.mid")], tmp_path, SOUNDFONTS, ["ogg"])
+
+        assert [job.outputs["ogg"].name for job in jobs] == [
+            "a_clean_acoustic.ogg",
+            "a_wah_wah.ogg",
+            "b_clean_acoustic.ogg",
+            "b_wah_wah.ogg",
+        ]
+        assert output_key("ogg", SOUNDFONTS[1], SOUNDFONTS) == "ogg_wah_wah"
+
+    def test_invalid_requests(self, tmp_path) -> None:
+        with pytest.raises(ValueError):
+            plan_renders([pathlib.Path("a.mid")], tmp_path, SOUNDFONTS, ["aiff"])
+        with pytest.raises(ValueError):
+            plan_renders([pathlib.Path("a.mid")], tmp_path, [], ["mp3"])
+
+
+class TestRenderMany:
+    def setup_method(self) -> None:
+        self.notes = [(index * 0.25, index * 0.25 + 0.2, 52 + index % 12) for index in range(16)]
+
+    def test_failures_are_reported_not_raised(self, tmp_path) -> None:
+        job = RenderJob(tmp_path / "missing.mid", tmp_path / "missing.sf2", {"mp3": tmp_path / "missing.mp3"})
+
+        status = run_render_job(job)
+
+        assert status["status"] == "failed"
+        assert status["error"]
+        assert "mp3" not in status
+
+    @needs_tools
+    def test_renders_every_soundfont_and_format(self, tmp_path) -> None:
+        midi_path = _write_midi(self.notes, tmp_path / "riff.mid")
+        finished = []
+
+        report = render_many(
+            [midi_path], tmp_path / "out", SOUNDFONTS, ["wav", "mp3", "flac"], workers=2, on_finished=finished.append
+        )
+
+        assert [status["status"] for status in report] == ["ok", "ok"]
+        assert len(finished) == 2
+        for status in report:
+            for fmt in ("wav", "mp3", "flac"):
+                assert pathlib.Path(status[fmt]).stat().st_size > 0
+
+    @needs_tools
+    def test_slow_renders_time_out(self, tmp_path) -> None:
+        midi_path = _write_midi([(0.0, 600.0, 52)], tmp_path / "drone.mid")
+
+        (status,) = render_many([midi_path], tmp_path / "out", SOUNDFONTS[:1], ["flac"], timeout=0.01)
+
+        assert status["status"] == "timeout"
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="the stub tools are scripts")
+    def test_failing_encoder_is_reported_not_timed_out(self, tmp_path, monkeypatch) -> None:
+        stub_tools(tmp_path / "bin", monkeypatch)
+        midi_paths = [_write_midi(self.notes, tmp_path / f"riff{index}.mid") for index in range(2)]
+
+        report = render_many(midi_paths, tmp_path / "out", SOUNDFONTS[:1], ["wav", "mp3"], workers=2, timeout=60)
+
+        assert [status["status"] for status in report] == ["failed", "failed"]
+        for status in report:
+            assert "ffmpeg failed with error 3" in status["error"]
+            assert "Unknown encoder" in status["error"]
+            assert status["seconds"] < 30
+
+
+class TestRenderMidi:
+    def setup_method(self) -> None:
+        self.notes = [(index * 0.25, index * 0.25 + 0.2, 52 + index % 12) for index in range(16)]
+
+    def test_inprocess_backend_refuses_other_formats(self, tmp_path) -> None:
+        midi_path = _write_midi(self.notes, tmp_path / "riff.mid")
+
+        with pytest.raises(ValueError, match="can't render flac"):
+            render_midi(midi_path, tmp_path / "out", SOUNDFONTS[:1], ["wav", "flac"], backend="inprocess")
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="the stub tools are scripts")
+    def test_auto_backend_renders_other_formats_with_the_tools(self, tmp_path, monkeypatch) -> None:
+        stub_tools(tmp_path / "bin", monkeypatch)
+        midi_path = _write_midi(self.notes, tmp_path / "riff.mid")
+
+        # The stub ffmpeg fails, which shows the command-line tools were used
+        with pytest.raises(RuntimeError, match="ffmpeg failed"):
+            render_midi(midi_path, tmp_path / "out", SOUNDFONTS[:1], ["flac"], backend="auto", timeout=60)
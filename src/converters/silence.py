@@ -0,0 +1,85 @@
+import numpy as np
+
+from src.converters.audio_decode import MODEL_SAMPLE_RATE
+from src.converters.model_windows import AUDIO_N_SAMPLES, HOP_SIZE, OVERLAP_LEN, window_count
+
+# Samples over which the loudness is measured (~46 ms)
+ENERGY_FRAME_SAMPLES = 1024
+
+
+class SilenceGate:
+    """
+    Finds the model windows that contain any sound, so the model can skip the rest.
+
+    The RMS level of every ~46 ms frame is compared with the loudest frame of the file.
+    Frames within *threshold_db* of it are active, and so are the frames within
+    *padding_seconds* of an active frame, so note onsets and decays next to silence are
+    kept. A model window runs if it overlaps any active frame. The others are given an
+    all-zero output, so the notes keep their place on the original timeline and the output
+    of every window that runs is exactly what the model would have produced anyway.
+    """
+
+    def __init__(self, threshold_db: float = -45.0, padding_seconds: float = 0.25) -> None:
+        """
+        :param threshold_db: Level, relative to the loudest frame, below which a frame is silent
+        :type threshold_db: float
+        :param padding_seconds: Audio around every active frame that is treated as active too
+        :type padding_seconds: float
+        """
+        self.threshold_db = threshold_db
+        self.padding_seconds = padding_seconds
+
+    def cache_key(self) -> str:
+        """Identifies the gate in cache keys, as it changes the model output."""
+        return f"silence_gate({self.threshold_db},{self.padding_seconds})"
+
+    def active_frames(self, audio: np.ndarray) -> np.ndarray:
+        """Whether each :data:`ENERGY_FRAME_SAMPLES` frame of *audio* (padding included) is active."""
+        n_frames = -(-len(audio) // ENERGY_FRAME_SAMPLES)
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+
+        whole = len(audio) // ENERGY_FRAME_SAMPLES * ENERGY_FRAME_SAMPLES
+        frames = np.asarray(audio[:whole], dtype=np.float32).reshape(-1, ENERGY_FRAME_SAMPLES)
+        # einsum squares and sums row by row, without a temporary array the size of the audio
+        energy = np.einsum("ij,ij->i", frames, frames) / ENERGY_FRAME_SAMPLES
+        if whole < len(audio):
+            tail = np.asarray(audio[whole:], dtype=np.float32)
+            energy = np.append(energy, np.dot(tail, tail) / len(tail))
+
+        peak = energy.max()
+        if peak <= 0:
+            return np.zeros(n_frames, dtype=bool)
+        # Compare energies rather than RMS levels, hence the factor of 10 rather than 20
+        active = energy >= peak * 10 ** (self.threshold_db / 10)
+
+        # Widen every active frame by the padding on both sides
+        pad = int(np.ceil(self.padding_seconds * MODEL_SAMPLE_RATE / ENERGY_FRAME_SAMPLES))
+        counts = np.concatenate(([0], np.cumsum(active)))
+        index = np.arange(n_frames)
+        return counts[np.minimum(index + pad + 1, n_frames)] - counts[np.maximum(index - pad, 0)] > 0
+
+    def active_windows(self, audio: np.ndarray) -> np.ndarray:
+        """Whether each model window of *audio* (see :func:`window_count`) overlaps active audio."""
+        active = self.active_frames(audio)
+        n_windows = window_count(len(audio))
+        if not active.any():
+            return np.zeros(n_windows, dtype=bool)
+
+        # basic_pitch pads the start of the audio with half an overlap of silence
+        starts = np.arange(n_windows) * HOP_SIZE - OVERLAP_LEN // 2
+        first = np.clip(starts // ENERGY_FRAME_SAMPLES, 0, len(active))
+        stop = np.clip(-(-(starts + AUDIO_N_SAMPLES) // ENERGY_FRAME_SAMPLES), 0, len(active))
+        counts = np.concatenate(([0], np.cumsum(active)))
+        return counts[stop] - counts[first] > 0
+
+    def active_regions(self, audio: np.ndarray) -> list[tuple[float, float]]:
+        """The ``(start, end)`` times in seconds of the active audio, padding included."""
+        active = self.active_frames(audio)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+        frame_seconds = ENERGY_FRAME_SAMPLES / MODEL_SAMPLE_RATE
+        audio_seconds = len(audio) / MODEL_SAMPLE_RATE
+        return [
+            (start * frame_seconds, min(stop * frame_seconds, audio_seconds))
+            for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist())
+        ]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from .model_windows import FRAMES_PER_WINDOW, HOP_SIZE, run_model, window_count
+from .silence import SilenceGate
+
+SAMPLE_RATE = 22050
+
+
+def _tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def _silence(seconds: float, level: float = 0.0) -> np.ndarray:
+    return np.full(int(seconds * SAMPLE_RATE), level, dtype=np.float32)
+
+
+class TestSilenceGate:
+    def setup_method(self) -> None:
+        self.gate = SilenceGate(threshold_db=-45, padding_seconds=0.25)
+        # A count-in of silence, two phrases and a quiet noise floor at the end
+        self.audio = np.concatenate([_silence(10), _tone(3), _silence(20), _tone(3), _silence(5, level=1e-4)])
+
+    def test_active_regions_are_padded(self) -> None:
+        regions = self.gate.active_regions(self.audio)
+
+        assert len(regions) == 2
+        for (start, end), (tone_start, tone_end) in zip(regions, [(10, 13), (33, 36)]):
+            assert tone_start - 0.35 < start <= tone_start - 0.25
+            assert tone_end + 0.25 <= end < tone_end + 0.35
+
+    def test_only_windows_with_sound_run(self) -> None:
+        windows = self.gate.active_windows(self.audio)
+
+        assert len(windows) == window_count(len(self.audio))
+        assert 0 < windows.sum() < len(windows) / 2
+        # Every window holding part of a tone runs
+        for tone_start in (10, 33):
+            first = int(tone_start * SAMPLE_RATE) // HOP_SIZE
+            stop = first + 2
+            assert windows[first:stop].all()
+
+    def test_silent_and_empty_audio(self) -> None:
+        assert not self.gate.active_windows(_silence(5)).any()
+        assert not self.gate.active_windows(np.zeros(0, dtype=np.float32)).any()
+        assert self.gate.active_regions(_silence(5)) == []
+
+    def test_cache_key_depends_on_the_settings(self) -> None:
+        assert SilenceGate(-45).cache_key() != SilenceGate(-50).cache_key()
+
+    def test_gated_model_output_matches_where_the_model_ran(self) -> None:
+        inference = pytest.importorskip("basic_pitch.inference")
+        model = inference.Model(inference.ICASSP_2022_MODEL_PATH)
+        windows = self.gate.active_windows(self.audio)
+
+        expected = run_model(model, self.audio)
+        gated = run_model(model, self.audio, windows)
+
+        ran = np.repeat(windows, FRAMES_PER_WINDOW)[: len(expected["note"])]
+        for key, value in gated.items():
+            assert value.shape == expected[key].shape
+            assert np.allclose(value[ran], expected[key][ran])
+            assert not value[~ran].any()
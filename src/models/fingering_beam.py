@@ -0,0 +1,234 @@
+from typing import Optional
+
+import numpy as np
+
+from src.models.note import FinalNote, UnplayableError
+from src.models.note_array import NoteArray, quantise_start_times
+
+# Hand positions kept after every group of notes; the work per note is bounded by this
+BEAM_WIDTH = 32
+
+# Cheapest voicings of a group that are considered, so huge chords stay cheap too
+MAX_VOICINGS = 64
+
+# Voicings enumerated per group before the search for more stops
+MAX_ENUMERATED = 4096
+
+# Costs of a fingering: moving the hand by one fret, stretching beyond a comfortable span,
+# and playing higher up the neck (which keeps the preference of the greedy assigner for low frets)
+MOVE_WEIGHT = 1.0
+STRETCH_WEIGHT = 2.0
+FRET_WEIGHT = 0.1
+
+# Frets between the lowest and the highest fretted note that can be held without stretching,
+# and the largest span allowed at all (unless a chord can't be played otherwise)
+COMFORT_SPAN = 3
+MAX_SPAN = 5
+
+N_STRINGS = 6
+
+
+class _Voicings:
+    """
+    Every way of playing one group of notes on distinct strings, as arrays.
+
+    ``strings[v, j]`` is the string (0 = low E) note ``j`` is played on in voicing ``v``,
+    and ``frets`` the matching ``(voicings, strings)`` table, -1 where a string isn't used.
+    """
+
+    __slots__ = ("strings", "frets", "uses", "position", "cost")
+
+    def __init__(self, candidates: np.ndarray) -> None:
+        """
+        :param candidates: ``(notes, strings)`` candidate frets of the group, -1 where unplayable
+        :type candidates: np.ndarray
+        """
+        if len(candidates) > N_STRINGS:
+            raise UnplayableError(f"{len(candidates)} notes can't be played at once on {N_STRINGS} strings")
+
+        # Try lower frets first, so the cap on enumeration keeps the most likely voicings
+        options = [
+            sorted((int(fret), string) for string, fret in enumerate(row) if fret != -1) for row in candidates.tolist()
+        ]
+        voicings: list[tuple[int, ...]] = []
+
+        def place(note: int, used: tuple[int, ...]) -> None:
+            if len(voicings) >= MAX_ENUMERATED:
+                return
+            if note == len(options):
+                voicings.append(used)
+                return
+            for _, string in options[note]:
+                if string not in used:
+                    place(note + 1, used + (string,))
+
+        place(0, ())
+        if not voicings:
+            raise UnplayableError("The notes of a group can't all be played on different strings")
+
+        strings = np.array(voicings, dtype=np.intp).reshape(len(voicings), len(candidates))
+        rows = np.arange(len(voicings))[:, None]
+        frets = np.full((len(voicings), N_STRINGS), -1, dtype=np.int16)
+        frets[rows, strings] = candidates[np.arange(len(candidates))[None, :], strings]
+
+        # Open strings don't need the hand, so only fretted notes set its position and span
+        fretted = frets > 0
+        n_fretted = fretted.sum(axis=1)
+        fret_sum = np.where(fretted, frets, 0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            position = np.where(n_fretted > 0, fret_sum / np.maximum(n_fretted, 1), np.nan)
+        highest = np.where(fretted, frets, -1).max(axis=1)
+        lowest = np.where(fretted, frets, np.iinfo(np.int16).max).min(axis=1)
+        span = np.where(n_fretted > 1, highest - lowest, 0)
+        cost = STRETCH_WEIGHT * np.maximum(span - COMFORT_SPAN, 0) + FRET_WEIGHT * np.where(fretted, frets, 0).sum(
+            axis=1
+        ) / max(len(candidates), 1)
+
+        keep = np.flatnonzero(span <= MAX_SPAN)
+        if len(keep) == 0:
+            keep = np.arange(len(voicings))
+        if len(keep) > MAX_VOICINGS:
+            keep = keep[np.argpartition(cost[keep], MAX_VOICINGS - 1)[:MAX_VOICINGS]]
+
+        self.strings = strings[keep]
+        self.frets = frets[keep]
+        self.uses = self.frets >= 0
+        self.position = position[keep]
+        self.cost = cost[keep]
+
+
+def _group_bounds(note_array: NoteArray, bounds: np.ndarray, quantisation: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantise the start times of every cluster as :class:`NoteCluster` does, and split the
+    notes into groups sharing a quantised start time.
+
+    Returns
+    -------
+    starts : np.ndarray
+        Quantised start time of every note.
+    group_bounds : np.ndarray
+        Index of the first note of each group, followed by the number of notes.
+    """
+    starts = np.empty(len(note_array), dtype=np.float64)
+    for first, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        starts[first:stop] = quantise_start_times(note_array.start_times[first:stop], quantisation)
+    if len(starts) == 0:
+        return starts, np.zeros(1, dtype=np.intp)
+
+    # Clusters never share a start time, so a new start time always begins a new group
+    changes = np.flatnonzero(starts[1:] != starts[:-1]) + 1
+    return starts, np.concatenate(([0], changes, [len(starts)])).astype(np.intp)
+
+
+def assign_beam(
+    note_array: NoteArray, bounds: np.ndarray, quantisation: float, beam_width: int = BEAM_WIDTH
+) -> list[list[FinalNote]]:
+    """
+    Finger the clusters ``bounds[k]:bounds[k + 1]`` of *note_array* with a beam-limited
+    Viterbi search over the whole sequence of note groups.
+
+    Unlike the greedy :meth:`NoteCluster.assign_notes`, which fingers every note on the
+    lowest free fret and fails if an early choice blocks a later note, the search keeps the
+    *beam_width* cheapest fingerings of everything so far. Each state is a hand position
+    together with the time every string is busy until. A group moves each state to every
+    voicing that fits around the notes still ringing. The cost of a move comes from tables
+    computed with NumPy: the hand movement, the stretch of the chord and how high up the
+    neck it is. The work per group is bounded by ``beam_width * MAX_VOICINGS``, so the
+    runtime is linear in the number of notes.
+
+    Returns
+    -------
+    list[list[FinalNote]]
+        One list per group of concurrent notes, sorted by string, as :func:`_assign_clusters` returns.
+
+    Raises
+    ------
+    UnplayableError
+        If no fingering keeps every note on a string of its own.
+    ValueError
+        If *beam_width* is less than 1.
+    """
+    if beam_width < 1:
+        raise ValueError(f"beam_width must be at least 1, got {beam_width}")
+
+    starts, group_bounds = _group_bounds(note_array, bounds, quantisation)
+    ends = note_array.end_times
+    candidates = note_array.candidates
+
+    # The beam: cost, hand position (NaN until the first fretted note) and the time each string is busy until
+    cost = np.zeros(1)
+    position = np.full(1, np.nan)
+    busy = np.full((1, N_STRINGS), -np.inf)
+
+    voicings_by_signature: dict[bytes, _Voicings] = {}
+    history: list[tuple[_Voicings, np.ndarray, np.ndarray]] = []
+    for first, stop in zip(group_bounds[:-1].tolist(), group_bounds[1:].tolist()):
+        group_candidates = candidates[first:stop]
+        signature = group_candidates.tobytes() + len(group_candidates).to_bytes(4, "little")
+        voicings = voicings_by_signature.get(signature)
+        if voicings is None:
+            voicings = voicings_by_signature[signature] = _Voicings(group_candidates)
+
+        # Time each string of each voicing is busy until
+        string_ends = np.full(voicings.frets.shape, -np.inf)
+        string_ends[np.arange(len(voicings.strings))[:, None], voicings.strings] = ends[first:stop][None, :]
+
+        # (states, voicings) tables of the transition costs
+        blocked = ((busy > starts[first])[:, None, :] & voicings.uses[None, :, :]).any(axis=2)
+        moving = ~np.isnan(position)[:, None] & ~np.isnan(voicings.position)[None, :]
+        movement = np.where(moving, np.abs(position[:, None] - voicings.position[None, :]), 0.0)
+        total = cost[:, None] + MOVE_WEIGHT * np.nan_to_num(movement) + voicings.cost[None, :]
+        total[blocked] = np.inf
+
+        flat = total.ravel()
+        n_open = int(np.isfinite(flat).sum())
+        if n_open == 0:
+            raise UnplayableError(f"Cannot assign note starting at {starts[first]}s")
+        keep = np.argpartition(flat, min(beam_width, n_open) - 1)[: min(beam_width, n_open)]
+        keep = keep[np.isfinite(flat[keep])]
+        parent, voicing = np.divmod(keep, len(voicings.strings))
+
+        cost = flat[keep]
+        new_position = voicings.position[voicing]
+        position = np.where(np.isnan(new_position), position[parent], new_position)
+        busy = np.maximum(busy[parent], string_ends[voicing])
+        history.append((voicings, parent, voicing))
+
+    # Follow the back pointers from the cheapest final state
+    chosen: list[int] = []
+    state = int(np.argmin(cost)) if history else 0
+    for voicings, parent, voicing in reversed(history):
+        chosen.append(int(voicing[state]))
+        state = int(parent[state])
+    chosen.reverse()
+
+    grouped_final_notes: list[list[FinalNote]] = []
+    for (voicings, _, _), voicing, first, stop in zip(
+        history, chosen, group_bounds[:-1].tolist(), group_bounds[1:].tolist()
+    ):
+        strings = voicings.strings[voicing].tolist()
+        group = [
+            FinalNote(start_time=start, end_time=end, string=string + 1, fret=int(candidates[note, string]))
+            for note, start, end, string in zip(
+                range(first, stop), starts[first:stop].tolist(), ends[first:stop].tolist(), strings
+            )
+        ]
+        group.sort(key=lambda n: n.string)
+        grouped_final_notes.append(group)
+
+    return grouped_final_notes
+
+
+def hand_movement(grouped_final_notes: list[list[FinalNote]]) -> float:
+    """Total distance in frets the fretting hand moves over *grouped_final_notes*, as the beam search counts it."""
+    total = 0.0
+    previous: Optional[float] = None
+    for group in grouped_final_notes:
+        fretted = [note.fret for note in group if note.fret > 0]
+        if not fretted:
+            continue
+        current = sum(fretted) / len(fretted)
+        if previous is not None:
+            total += abs(current - previous)
+        previous = current
+    return total
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from src.converters.midi_to_tabs import _assign_clusters, notes_to_guitar_tab
+from src.models.note import UnplayableError
+from src.models.note_array import NoteArray
+
+from . import fingering_beam as fingering_beam_module
+from .fingering_beam import assign_beam, hand_movement
+
+
+def _assign(notes: list[tuple[float, float, int]], engine: str, quantisation: int = 20):
+    note_array = NoteArray.from_tuples(notes)
+    bounds = note_array.cluster_bounds()
+    if engine == "beam":
+        return assign_beam(note_array, bounds, quantisation)
+    return _assign_clusters(note_array, bounds, quantisation)
+
+
+def _phrase(repeats: int) -> list[tuple[float, float, int]]:
+    # A lick the lowest-fret rule plays by jumping between the 1st and the 4th fret
+    pitches = [54, 60, 54, 60, 56, 61, 56, 61]
+    return [(step * 0.2, step * 0.2 + 0.18, pitch) for step, pitch in enumerate(pitches * repeats)]
+
+
+class TestAssignBeam:
+    def setup_method(self) -> None:
+        self.notes = _phrase(4)
+
+    def test_every_note_is_played_once_without_overlaps(self) -> None:
+        groups = assign_beam(*self._prepared(self.notes))
+
+        played = sorted(
+            (note.start_time, 40 + [0, 5, 10, 15, 19, 24][note.string - 1] + note.fret) for g in groups for note in g
+        )
+        assert played == sorted((start, pitch) for start, _, pitch in self.notes)
+
+        by_string: dict[int, list[tuple[float, float]]] = {}
+        for group in groups:
+            for note in group:
+                by_string.setdefault(note.string, []).append((note.start_time, note.end_time))
+        for spans in by_string.values():
+            spans.sort()
+            assert all(end <= next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+
+    def test_less_hand_movement_than_greedy(self) -> None:
+        beam = _assign(self.notes, "beam")
+        greedy = _assign(self.notes, "greedy")
+
+        assert len(beam) == len(greedy)
+        assert hand_movement(beam) < hand_movement(greedy)
+
+    def test_chords_are_sorted_by_string(self) -> None:
+        # An open E major chord, strummed
+        chord = [(0.0, 1.0, pitch) for pitch in (40, 47, 52, 56, 59, 64)]
+        (group,) = _assign(chord, "beam")
+
+        assert [note.string for note in group] == [1, 2, 3, 4, 5, 6]
+        assert max(note.fret for note in group) <= 2
+
+    def test_finds_fingerings_the_greedy_assigner_misses(self) -> None:
+        # Greedy lets the long E ring on the open high e string, the only one the high C can be played on
+        notes = [(0.0, 2.0, 64), (0.5, 1.0, 84)]
+        with pytest.raises(UnplayableError):
+            _assign(notes, "greedy")
+
+        groups = _assign(notes, "beam")
+        assert sum(len(group) for group in groups) == len(notes)
+
+    def test_unplayable_groups_raise(self) -> None:
+        notes = [(0.0, 1.0, 40 + pitch) for pitch in range(7)]
+        with pytest.raises(UnplayableError):
+            _assign(notes, "beam")
+
+    def test_unplayable_groups_of_any_size_raise(self) -> None:
+        notes = [(0.0, 1.0, 40 + pitch % 40) for pitch in range(300)]
+        with pytest.raises(UnplayableError):
+            _assign(notes, "beam")
+
+    def test_work_per_group_is_bounded(self, monkeypatch) -> None:
+        built = []
+
+        class RecordingVoicings(fingering_beam_module._Voicings):
+            def __init__(self, candidates: np.ndarray) -> None:
+                super().__init__(candidates)
+                built.append(len(self.strings))
+
+        monkeypatch.setattr(fingering_beam_module, "_Voicings", RecordingVoicings)
+        # Fewer than these open chords can be voiced in, so the cap is what bounds the work
+        monkeypatch.setattr(fingering_beam_module, "MAX_VOICINGS", 4)
+        chords = [(52, 55, 59, 64), (50, 57, 62, 66), (52, 57, 60, 64)]
+        notes = [(step * 0.5, step * 0.5 + 0.4, pitch) for step in range(300) for pitch in chords[step % 3]]
+
+        groups = assign_beam(*self._prepared(notes), beam_width=8)
+
+        assert sum(len(group) for group in groups) == len(notes)
+        # Repeated groups reuse their voicings, and each group is expanded from at most
+        # beam_width states into MAX_VOICINGS voicings, however long the piece is
+        assert len(built) == len(chords)
+        assert max(built) == 4
+
+    def test_selected_through_notes_to_guitar_tab(self, tmp_path) -> None:
+        notes = np.array(self.notes, dtype=[("start_time", "f8"), ("end_time", "f8"), ("pitch", "i2")])
+
+        beam = notes_to_guitar_tab(notes, tmp_path / "beam.txt", 20, engine="beam").read_text()
+        greedy = notes_to_guitar_tab(notes, tmp_path / "greedy.txt", 20).read_text()
+
+        assert beam != greedy
+        assert len(beam.splitlines()) == len(greedy.splitlines())
+
+    @staticmethod
+    def _prepared(notes: list[tuple[float, float, int]]) -> tuple[NoteArray, np.ndarray, int]:
+        note_array = NoteArray.from_tuples(notes)
+        return note_array, note_array.cluster_bounds(), 20
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import Optional
+
+from src.models.note import NoteCandidate
+
+# Relative times are rounded to this many decimals, to absorb floating point noise
+SIGNATURE_DECIMALS = 6
+
+Signature = tuple[tuple[float, float, tuple[int, ...]], ...]
+Assignment = tuple[tuple[int, int], ...]
+
+
+class FingeringCache:
+    """
+    Bounded LRU cache of cluster fingerings, so repeated phrases are only fingered once.
+
+    A cluster is identified by its signature: the candidate frets of every note (which
+    already encode pitch, tuning and maximum fret) with its start and end relative to the
+    start of the cluster, after quantisation. The cached value is the ``(string, fret)``
+    of every note, which holds for any cluster with the same signature regardless of
+    where it sits in the piece. Times are rounded, so clusters that differ by less than
+    the rounding share a signature; a fingering that doesn't fit such a cluster is
+    dropped, see :meth:`discard`.
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        """
+        :param max_size: Number of fingerings kept before the least recently used is dropped
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Signature, Assignment] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def signature(notes: list[NoteCandidate]) -> Signature:
+        """Signature of a cluster of quantised *notes*, sorted by start time."""
+        origin = notes[0].start_time
+        return tuple(
+            (
+                round(note.start_time - origin, SIGNATURE_DECIMALS),
+                round(note.end_time - origin, SIGNATURE_DECIMALS),
+                tuple(note.candidates),
+            )
+            for note in notes
+        )
+
+    def get(self, signature: Signature) -> Optional[Assignment]:
+        """Return the cached fingering for *signature*, or ``None`` on a miss."""
+        assignment = self._entries.get(signature)
+        if assignment is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(signature)
+        self.hits += 1
+        return assignment
+
+    def put(self, signature: Signature, assignment: Assignment) -> None:
+        """Cache *assignment* for *signature*, dropping the least recently used entry if full."""
+        self._entries[signature] = assignment
+        self._entries.move_to_end(signature)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, signature: Signature) -> None:
+        """Drop the fingering just returned by :meth:`get` for *signature*, which didn't fit, and count a miss."""
+        if self._entries.pop(signature, None) is not None:
+            self.hits -= 1
+            self.misses += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def add_stats(self, hits: int, misses: int) -> None:
+        """Fold in the hit/miss counts of another cache, e.g. one used by a worker process."""
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "size": len(self)}
@@ -0,0 +1,52 @@
+from src.models.note import NoteCandidate
+
+from .fingering_cache import FingeringCache
+from .note_cluster import NoteCluster
+
+
+class TestFingeringCache:
+    @staticmethod
+    def _riff(offset: float) -> list[NoteCandidate]:
+        return [
+            NoteCandidate(start_time=offset, end_time=offset + 0.3, candidates=[5, 0, -1, -1, -1, -1]),
+            NoteCandidate(start_time=offset + 0.02, end_time=offset + 0.3, candidates=[12, 7, 2, -1, -1, -1]),
+            NoteCandidate(start_time=offset + 0.2, end_time=offset + 0.5, candidates=[15, 10, 5, 0, -1, -1]),
+        ]
+
+    def test_repeated_phrase_is_reused_at_new_time(self) -> None:
+        cache = FingeringCache()
+        first = NoteCluster(notes=self._riff(0.0), quantisation=50, fingering_cache=cache)
+        first.assign_notes()
+        repeat = NoteCluster(notes=self._riff(4.0), quantisation=50, fingering_cache=cache)
+        repeat.assign_notes()
+
+        uncached = NoteCluster(notes=self._riff(4.0), quantisation=50)
+        uncached.assign_notes()
+
+        assert repeat.grouped_final_notes == uncached.grouped_final_notes
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = FingeringCache(max_size=1)
+        cache.put(FingeringCache.signature(self._riff(0.0)), ((1, 5),))
+        cache.put(FingeringCache.signature(self._riff(0.0)[:1]), ((1, 5),))
+
+        assert len(cache) == 1
+        assert cache.get(FingeringCache.signature(self._riff(0.0))) is None
+
+    def test_fingerings_that_dont_fit_are_discarded(self) -> None:
+        cache = FingeringCache()
+        # Ends within the signature's rounding of the next start, so the second note can go on the first's string
+        notes = [
+            NoteCandidate(start_time=0.0, end_time=0.2, candidates=[5, 0, -1, -1, -1, -1]),
+            NoteCandidate(start_time=0.2, end_time=0.4, candidates=[3, -1, -1, -1, -1, -1]),
+        ]
+        cache.put(FingeringCache.signature(notes), ((1, 5), (1, 3)))
+        notes[0].end_time = 0.2000000001
+
+        cluster = NoteCluster(notes=notes, quantisation=50, fingering_cache=cache)
+        cluster.assign_notes()
+
+        assert [(note.string, note.fret) for group in cluster.grouped_final_notes for note in group] == [(2, 0), (1, 3)]
+        assert (cache.hits, cache.misses) == (0, 1)
+        assert cache.get(FingeringCache.signature(notes)) == ((2, 0), (1, 3))
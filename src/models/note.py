@@ -7,6 +7,8 @@ class UnplayableError(Exception):
 class Note:
     """Basic timed note."""
 
+    __slots__ = ("start_time", "end_time")
+
     def __init__(self, start_time: float, end_time: float) -> None:
         self.start_time = start_time
         self.end_time = end_time
@@ -22,6 +24,8 @@ class NoteCandidate(Note):
         Possible fret values per string; -1 where the note is unplayable.
     """
 
+    __slots__ = ("candidates",)
+
     def __init__(self, candidates: list[int], *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.candidates = candidates
@@ -42,6 +46,8 @@ class FinalNote(Note):
 
     """
 
+    __slots__ = ("string", "fret")
+
     def __init__(self, string: int, fret: int, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.string = string
@@ -0,0 +1,158 @@
+import numpy as np
+
+from src.models.note import NoteCandidate, UnplayableError
+from src.models.tuning import STANDARD, fret_table
+
+# String tuning values (low E → high e)
+STANDARD_TUNING = np.array(STANDARD.pitches, dtype=np.int16)
+
+NOTE_DTYPE = np.dtype([("start_time", np.float64), ("end_time", np.float64), ("pitch", np.int16)])
+
+
+def candidate_frets(
+    pitches: np.ndarray, tuning: np.ndarray = STANDARD_TUNING, max_fret: int = 24, capo: int = 0
+) -> np.ndarray:
+    """
+    Fret of every pitch on every string, looked up in the precomputed :func:`fret_table`.
+
+    Returns
+    -------
+    np.ndarray
+        ``(len(pitches), len(tuning))`` array of frets, counted from the *capo*; -1 where the
+        pitch is unplayable on a string.
+    """
+    table = fret_table(tuple(int(pitch) for pitch in tuning), capo, max_fret)
+    return table[np.asarray(pitches, dtype=np.intp)]
+
+
+def cluster_bounds(start_times: np.ndarray, end_times: np.ndarray) -> np.ndarray:
+    """
+    Split notes sorted by start time into clusters of overlapping notes.
+
+    A note starts a new cluster when it starts no earlier than every previous note has ended.
+
+    Returns
+    -------
+    np.ndarray
+        Index of the first note of each cluster, followed by the number of notes, so that
+        cluster ``k`` is ``bounds[k]:bounds[k + 1]``.
+    """
+    if len(start_times) == 0:
+        return np.zeros(1, dtype=np.intp)
+
+    running_end = np.maximum.accumulate(end_times)
+    starts = np.flatnonzero(start_times[1:] >= running_end[:-1]) + 1
+    return np.concatenate(([0], starts, [len(start_times)])).astype(np.intp)
+
+
+def quantise_start_times(start_times: np.ndarray, quantisation: float) -> np.ndarray:
+    """
+    Quantise sorted *start_times* so that notes starting within *quantisation* ms of the
+    earliest note of their window take that note's start time.
+
+    Each window is found with a binary search, so the cost grows with the number of
+    windows rather than the number of notes.
+    """
+    window = quantisation / 1000
+    quantised = np.empty_like(start_times)
+
+    idx = 0
+    while idx < len(start_times):
+        anchor = start_times[idx]
+        end = int(np.searchsorted(start_times, anchor + window, side="right"))
+        # Keep the exact `start - anchor <= window` semantics despite floating point rounding
+        while end < len(start_times) and start_times[end] - anchor <= window:
+            end += 1
+        while end > idx + 1 and start_times[end - 1] - anchor > window:
+            end -= 1
+
+        quantised[idx:end] = anchor
+        idx = end
+
+    return quantised
+
+
+class NoteArray:
+    """
+    Compact, columnar storage of the notes of a whole piece.
+
+    Notes are kept in a NumPy structured array sorted by start time, with the candidate
+    frets of every note on every string in a matching ``(notes, strings)`` array.
+    :class:`NoteCandidate` objects are only created per cluster, as thin views for
+    :class:`NoteCluster`.
+    """
+
+    __slots__ = ("notes", "candidates")
+
+    def __init__(
+        self, notes: np.ndarray, tuning: np.ndarray = STANDARD_TUNING, max_fret: int = 24, capo: int = 0
+    ) -> None:
+        """
+        :param notes: Structured array with ``NOTE_DTYPE`` fields, in any order
+        :type notes: np.ndarray
+        :param tuning: MIDI pitch of each open string, low to high
+        :type tuning: np.ndarray
+        :param max_fret: Highest fret a note may be played on
+        :type max_fret: int
+        :param capo: Fret of the capo; candidate frets count from it
+        :type capo: int
+        """
+        self.notes = notes[np.argsort(notes["start_time"], kind="stable")]
+        self.candidates = candidate_frets(self.notes["pitch"], tuning, max_fret, capo)
+
+    @classmethod
+    def from_tuples(
+        cls, notes: list[tuple[float, float, int]], tuning: np.ndarray = STANDARD_TUNING, max_fret: int = 24
+    ) -> "NoteArray":
+        """Build from ``(start_time, end_time, pitch)`` tuples."""
+        return cls(np.array(notes, dtype=NOTE_DTYPE), tuning=tuning, max_fret=max_fret)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __getitem__(self, index: slice) -> "NoteArray":
+        """A view of the notes in *index*, e.g. to hand a range of clusters to another process."""
+        view = NoteArray.__new__(NoteArray)
+        view.notes = self.notes[index]
+        view.candidates = self.candidates[index]
+        return view
+
+    @property
+    def start_times(self) -> np.ndarray:
+        return self.notes["start_time"]
+
+    @property
+    def end_times(self) -> np.ndarray:
+        return self.notes["end_time"]
+
+    @property
+    def pitches(self) -> np.ndarray:
+        return self.notes["pitch"]
+
+    def check_playable(self) -> None:
+        """
+        Raises
+        ------
+        UnplayableError
+            If any note has no string it can be played on.
+        """
+        unplayable = np.flatnonzero((self.candidates == -1).all(axis=1))
+        if len(unplayable):
+            raise UnplayableError(
+                f"Note {self.pitches[unplayable[0]]} at {self.start_times[unplayable[0]]}s "
+                "is unplayable in current tuning."
+            )
+
+    def cluster_bounds(self) -> np.ndarray:
+        """See :func:`cluster_bounds`."""
+        return cluster_bounds(self.start_times, self.end_times)
+
+    def to_candidates(self, start: int, stop: int) -> list[NoteCandidate]:
+        """Create the :class:`NoteCandidate` objects for notes ``start:stop``."""
+        notes = self.notes[start:stop]
+        return [
+            NoteCandidate(start_time=start_time, end_time=end_time, candidates=candidates)
+            for start_time, end_time, candidates in zip(
+                notes["start_time"].tolist(), notes["end_time"].tolist(), self.candidates[start:stop].tolist()
+            )
+        ]
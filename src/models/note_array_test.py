@@ -0,0 +1,30 @@
+import numpy as np
+
+from .note_array import NoteArray, candidate_frets, cluster_bounds, quantise_start_times
+
+
+class TestNoteArray:
+    def setup_method(self) -> None:
+        self.notes = NoteArray.from_tuples([(0.11, 0.2, 64), (0.0, 0.1, 40), (0.06, 0.15, 59), (0.3, 0.4, 45)])
+
+    def test_sorted_with_candidates(self) -> None:
+        assert self.notes.start_times.tolist() == [0.0, 0.06, 0.11, 0.3]
+        assert self.notes.candidates.tolist() == [
+            [0, -1, -1, -1, -1, -1],
+            [19, 14, 9, 4, 0, -1],
+            [24, 19, 14, 9, 5, 0],
+            [5, 0, -1, -1, -1, -1],
+        ]
+
+    def test_cluster_bounds(self) -> None:
+        assert self.notes.cluster_bounds().tolist() == [0, 3, 4]
+
+    def test_candidate_frets_respects_max_fret(self) -> None:
+        assert candidate_frets(np.array([52]), max_fret=5).tolist() == [[-1, -1, 2, -1, -1, -1]]
+
+    def test_quantise_start_times(self) -> None:
+        start_times = np.array([0.0, 0.06, 0.1, 0.11, 0.2])
+        assert quantise_start_times(start_times, 100).tolist() == [0.0, 0.0, 0.0, 0.11, 0.11]
+
+    def test_empty(self) -> None:
+        assert cluster_bounds(np.array([]), np.array([])).tolist() == [0]
@@ -1,4 +1,46 @@
+import bisect
+from typing import Optional
+
+import numpy as np
+
 from src.models.note import NoteCandidate, FinalNote, UnplayableError
+from src.models.fingering_cache import FingeringCache
+from src.models.note_array import quantise_start_times
+
+
+class StringTimeline:
+    """
+    The notes assigned to one string, kept sorted by time so that overlap checks
+    are a binary search instead of a scan over every note on the string.
+    """
+
+    def __init__(self) -> None:
+        self.notes: list[FinalNote] = []
+        self._spans: list[tuple[float, float]] = []  # (start_time, end_time) of each note, sorted
+
+    def __iter__(self):
+        return iter(self.notes)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def is_free(self, start_time: float, end_time: float) -> bool:
+        """
+        Whether a note from *start_time* to *end_time* overlaps none of the notes on the string.
+
+        Notes on a string never overlap, so sorted by start time their end times are sorted
+        too. Only the last note starting before *end_time* can then reach past *start_time*.
+        """
+        idx = bisect.bisect_left(self._spans, (end_time, float("-inf")))
+        return idx == 0 or self._spans[idx - 1][1] <= start_time
+
+    def add(self, note: FinalNote) -> None:
+        """Add *note*, which must not overlap any note already on the string."""
+        span = (note.start_time, note.end_time)
+        # Notes are assigned in order of start time, so this is almost always an append
+        idx = bisect.bisect_right(self._spans, span)
+        self.notes.insert(idx, note)
+        self._spans.insert(idx, span)
 
 
 class NoteCluster:
@@ -6,7 +48,9 @@ class NoteCluster:
     Handles a cluster of notes which overlap in time.
     """
 
-    def __init__(self, notes: list[NoteCandidate], quantisation: int) -> None:
+    def __init__(
+        self, notes: list[NoteCandidate], quantisation: int, fingering_cache: Optional[FingeringCache] = None
+    ) -> None:
         """
         Initialises note cluster
 
@@ -14,10 +58,13 @@ class NoteCluster:
         :type notes: list[NoteCandidate]
         :param quantisation: Timeframe in ms within which notes are considered concurrent
         :type quantisation: int
+        :param fingering_cache: Cache of earlier fingerings to reuse for repeated phrases
+        :type fingering_cache: FingeringCache, optional
         """
         self.notes = sorted(notes, key=lambda n: n.start_time)
         self.quantisation = quantisation
-        self.strings: dict[int, list[FinalNote]] = {i: [] for i in range(1, 7)}  # 1=high E, 6=low E
+        self.fingering_cache = fingering_cache
+        self.strings: dict[int, StringTimeline] = {i: StringTimeline() for i in range(1, 7)}  # 1=high E, 6=low E
         self.grouped_final_notes: list[list[FinalNote]] = []
 
     def assign_notes(self) -> None:
@@ -28,7 +75,7 @@ class NoteCluster:
         """
         self._quantise_notes()
 
-        self.strings = {i: [] for i in range(1, 7)}
+        self.strings = {i: StringTimeline() for i in range(1, 7)}
 
         # Group notes by quantised start time
         notes_by_start: dict[float, list[NoteCandidate]] = {}
@@ -38,7 +85,20 @@ class NoteCluster:
         for note in self.quantised_notes:
             notes_by_start.setdefault(note.start_time, []).append(note)
 
+        signature = None
+        if self.fingering_cache is not None:
+            signature = self.fingering_cache.signature(self.quantised_notes)
+            cached_assignment = self.fingering_cache.get(signature)
+            if cached_assignment is not None:
+                if self._apply_assignment(notes_by_start, cached_assignment):
+                    return
+                # Cached for a cluster whose times only matched after rounding, finger this one afresh
+                self.fingering_cache.discard(signature)
+                self.strings = {i: StringTimeline() for i in range(1, 7)}
+                self.grouped_final_notes = []
+
         # Process each group in order of start time
+        assignment: list[tuple[int, int]] = []
         for start_time in sorted(notes_by_start.keys()):
             group_notes = notes_by_start[start_time]
             assigned_group: list[FinalNote] = []
@@ -52,10 +112,11 @@ class NoteCluster:
                 for string, fret in candidate_pairs:
                     timeline = self.strings[string]
                     # check for overlap
-                    if all(note.end_time <= n.start_time or note.start_time >= n.end_time for n in timeline):
+                    if timeline.is_free(note.start_time, note.end_time):
                         final_note = note.to_final_note(string, fret)
-                        timeline.append(final_note)
+                        timeline.add(final_note)
                         assigned_group.append(final_note)
+                        assignment.append((string, fret))
                         assigned = True
                         break
 
@@ -65,6 +126,34 @@ class NoteCluster:
             assigned_group.sort(key=lambda n: n.string)
             self.grouped_final_notes.append(assigned_group)
 
+        if self.fingering_cache is not None and signature is not None:
+            self.fingering_cache.put(signature, tuple(assignment))
+
+    def _apply_assignment(
+        self, notes_by_start: dict[float, list[NoteCandidate]], assignment: tuple[tuple[int, int], ...]
+    ) -> bool:
+        """
+        Place the notes using a cached *assignment*, the ``(string, fret)`` of every note in
+        the order :meth:`assign_notes` processes them.
+
+        Returns ``False``, leaving the notes partly placed, if the assignment puts a note on
+        a string that is still busy.
+        """
+        positions = iter(assignment)
+        for start_time in sorted(notes_by_start.keys()):
+            assigned_group = []
+            for note in notes_by_start[start_time]:
+                string, fret = next(positions)
+                if not self.strings[string].is_free(note.start_time, note.end_time):
+                    return False
+                final_note = note.to_final_note(string, fret)
+                self.strings[string].add(final_note)
+                assigned_group.append(final_note)
+
+            assigned_group.sort(key=lambda n: n.string)
+            self.grouped_final_notes.append(assigned_group)
+        return True
+
     def _quantise_notes(self) -> None:
         """
         Quantises note start times so that any notes whose start times lie
@@ -78,28 +167,8 @@ class NoteCluster:
             self.quantised_notes = None
             return
 
-        quantised = []
-        current_group = [self.notes[0]]
-
-        for note in self.notes[1:]:
-            # If this note starts within the quantisation window from the
-            # *earliest* note of the group, add it to the same group.
-            if note.start_time - current_group[0].start_time <= self.quantisation / 1000:
-                current_group.append(note)
-            else:
-                # Close previous group
-                earliest_start = current_group[0].start_time
-                for n in current_group:
-                    n.start_time = earliest_start
-                quantised.extend(current_group)
-
-                # Begin new group
-                current_group = [note]
-
-        # Final group
-        earliest_start = current_group[0].start_time
-        for n in current_group:
-            n.start_time = earliest_start
-        quantised.extend(current_group)
-
-        self.quantised_notes = quantised
+        start_times = np.fromiter((n.start_time for n in self.notes), dtype=np.float64, count=len(self.notes))
+        for note, start_time in zip(self.notes, quantise_start_times(start_times, self.quantisation).tolist()):
+            note.start_time = start_time
+
+        self.quantised_notes = list(self.notes)
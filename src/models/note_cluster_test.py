@@ -1,5 +1,9 @@
+import bisect
+import math
+
 from src.models.note import NoteCandidate, FinalNote
 
+from . import note_cluster as note_cluster_module
 from .note_cluster import NoteCluster
 
 
@@ -21,3 +25,48 @@ class TestNoteCluster:
             ],
             [FinalNote(start_time=0.11, end_time=0.2, string=6, fret=0)],
         ]
+
+
+class _CountingBisect:
+    """Stands in for the ``bisect`` module, counting the searches and the entries each one looks at."""
+
+    def __init__(self) -> None:
+        self.searches = 0
+        self.probes = 0
+
+    def _probe(self, item):
+        self.probes += 1
+        return item
+
+    def bisect_left(self, a, x):
+        self.searches += 1
+        return bisect.bisect_left(a, x, key=self._probe)
+
+    def bisect_right(self, a, x):
+        self.searches += 1
+        return bisect.bisect_right(a, x, key=self._probe)
+
+
+class TestNoteClusterScaling:
+    @staticmethod
+    def _sustained_cluster(num_notes: int) -> NoteCluster:
+        # A chain of notes where each overlaps the next, so they all end up in one cluster
+        notes = [
+            NoteCandidate(start_time=i * 0.1, end_time=i * 0.1 + 0.15, candidates=[5, 0, -1, -1, -1, -1])
+            for i in range(num_notes)
+        ]
+        return NoteCluster(notes=notes, quantisation=0)
+
+    def test_overlap_checks_are_binary_searches(self, monkeypatch) -> None:
+        num_notes = 20_000
+        counter = _CountingBisect()
+        monkeypatch.setattr(note_cluster_module, "bisect", counter)
+        cluster = self._sustained_cluster(num_notes)
+
+        cluster.assign_notes()
+
+        assert len(cluster.grouped_final_notes) == num_notes
+        # Each note is checked against at most its two playable strings, then added to one
+        assert counter.searches <= 3 * num_notes
+        # and each search looks at ~log2(notes on the string) entries, where a scan would look at all of them
+        assert counter.probes <= counter.searches * (math.log2(num_notes) + 1)
@@ -0,0 +1,161 @@
+import functools
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+# Notes of the MIDI range the lookup tables cover
+MIDI_PITCHES = 128
+
+# Strings the tab writers and the fingering engines work with
+N_STRINGS = 6
+
+# Weight of notes that fit on a single string when scoring a tuning, relative to one fret of hand height
+SINGLE_STRING_WEIGHT = 2.0
+
+
+class Tuning:
+    """The open string pitches of a guitar tuning and the names its tab lines are labelled with."""
+
+    __slots__ = ("name", "pitches", "string_names")
+
+    def __init__(self, name: str, pitches: Sequence[int], string_names: Sequence[str]) -> None:
+        """
+        :param name: Name the tuning is looked up by, e.g. ``drop_d``
+        :type name: str
+        :param pitches: MIDI pitch of each open string, low to high
+        :type pitches: Sequence[int]
+        :param string_names: Label of each string, low to high
+        :type string_names: Sequence[str]
+        """
+        if len(pitches) != N_STRINGS or len(string_names) != N_STRINGS:
+            raise ValueError(f"A tuning needs {N_STRINGS} strings, {name} has {len(pitches)}")
+        self.name = name
+        self.pitches = tuple(int(pitch) for pitch in pitches)
+        self.string_names = list(string_names)
+
+    def __repr__(self) -> str:
+        return f"Tuning({self.name!r}, {self.pitches})"
+
+    def fret_table(self, capo: int = 0, max_fret: int = 24) -> np.ndarray:
+        """See :func:`fret_table`."""
+        return fret_table(self.pitches, capo, max_fret)
+
+
+@functools.lru_cache(maxsize=None)
+def fret_table(pitches: tuple[int, ...], capo: int = 0, max_fret: int = 24) -> np.ndarray:
+    """
+    Fret of every MIDI pitch on every string of a tuning, so the candidate frets of any
+    number of notes are a single lookup, ``table[pitches]``.
+
+    With a *capo*, frets count from the capo as tabs for a capo'd guitar do, and only the
+    frets up to *max_fret* of the neck remain. Tables are built once per tuning, capo and
+    *max_fret*, and are read-only.
+
+    Returns
+    -------
+    np.ndarray
+        ``(MIDI_PITCHES, len(pitches))`` array of frets; -1 where a pitch can't be played on a string.
+
+    Raises
+    ------
+    ValueError
+        If the capo is not on the neck.
+    """
+    if not 0 <= capo <= max_fret:
+        raise ValueError(f"capo must be between 0 and {max_fret}, got {capo}")
+
+    frets = np.arange(MIDI_PITCHES, dtype=np.int16)[:, None] - (np.array(pitches, dtype=np.int16) + capo)[None, :]
+    table = np.where((frets >= 0) & (frets <= max_fret - capo), frets, -1).astype(np.int16)
+    table.flags.writeable = False
+    return table
+
+
+TUNINGS: dict[str, Tuning] = {}
+
+
+def register_tuning(tuning: Tuning) -> Tuning:
+    """Make *tuning* available by name, e.g. to ``--tuning``."""
+    TUNINGS[tuning.name] = tuning
+    return tuning
+
+
+def get_tuning(name: str) -> Tuning:
+    """
+    The registered tuning called *name*.
+
+    Raises
+    ------
+    ValueError
+        If no tuning of that name is registered.
+    """
+    try:
+        return TUNINGS[name]
+    except KeyError:
+        raise ValueError(f"Unknown tuning {name!r}, expected one of {', '.join(TUNINGS)}") from None
+
+
+STANDARD = register_tuning(Tuning("standard", [40, 45, 50, 55, 59, 64], ["E", "A", "D", "G", "B", "e"]))
+register_tuning(Tuning("drop_d", [38, 45, 50, 55, 59, 64], ["D", "A", "D", "G", "B", "e"]))
+register_tuning(Tuning("half_step_down", [39, 44, 49, 54, 58, 63], ["Eb", "Ab", "Db", "Gb", "Bb", "eb"]))
+register_tuning(Tuning("drop_c", [36, 43, 48, 53, 57, 62], ["C", "G", "C", "F", "A", "d"]))
+register_tuning(Tuning("open_g", [38, 43, 50, 55, 59, 62], ["D", "G", "D", "G", "B", "d"]))
+register_tuning(Tuning("open_d", [38, 45, 50, 54, 57, 62], ["D", "A", "D", "F#", "A", "d"]))
+register_tuning(Tuning("dadgad", [38, 45, 50, 55, 57, 62], ["D", "A", "D", "G", "A", "d"]))
+
+
+def score_tunings(
+    pitches: np.ndarray, options: Sequence[tuple[Tuning, int]], max_fret: int = 24
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score every ``(tuning, capo)`` of *options* for playing *pitches*, all in one pass.
+
+    The notes are counted per pitch, so the work doesn't grow with their number. The
+    lookup tables of all options are stacked, and every score is a reduction over
+    that ``(options, pitches, strings)`` block.
+
+    Returns
+    -------
+    unplayable : np.ndarray
+        Number of notes each option can't play at all.
+    cost : np.ndarray
+        How awkward the playable notes are: their mean lowest fret (hand height), plus
+        :data:`SINGLE_STRING_WEIGHT` times the share of notes that fit on just one string
+        and so leave the fingering no choice. Lower is better.
+    """
+    counts = np.bincount(np.asarray(pitches, dtype=np.intp), minlength=MIDI_PITCHES)[:MIDI_PITCHES]
+    tables = np.stack([tuning.fret_table(capo, max_fret) for tuning, capo in options])
+    playable = tables >= 0
+
+    strings = playable.sum(axis=2)
+    # Unplayable pitches count as fret 0, they are scored by `unplayable` instead
+    lowest = np.where(playable, tables, np.iinfo(np.int16).max).min(axis=2)
+    lowest = np.where(strings > 0, lowest, 0)
+
+    unplayable = (strings == 0).astype(np.int64) @ counts
+    n_playable = np.maximum(counts.sum() - unplayable, 1)
+    cost = (lowest.astype(np.int64) @ counts + SINGLE_STRING_WEIGHT * ((strings == 1) @ counts)) / n_playable
+    return unplayable, cost
+
+
+def best_tuning(
+    pitches: np.ndarray,
+    tunings: Optional[Iterable[Tuning]] = None,
+    capos: Iterable[int] = (0,),
+    max_fret: int = 24,
+) -> tuple[Tuning, int]:
+    """
+    The ``(tuning, capo)`` that plays *pitches* best, see :func:`score_tunings`.
+
+    Every combination of *tunings* (all registered ones by default) and *capos* is scored.
+    Options that can play every note come first, then the lowest cost. Ties go to the
+    earlier option, so standard tuning without a capo wins when nothing is better.
+    """
+    tunings = list(TUNINGS.values()) if tunings is None else list(tunings)
+    options = [(tuning, capo) for capo in capos for tuning in tunings]
+    if not options:
+        raise ValueError("No tunings to choose from")
+
+    unplayable, cost = score_tunings(pitches, options, max_fret)
+    # lexsort sorts by the last key first, and is stable
+    best = int(np.lexsort((cost, unplayable))[0])
+    return options[best]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from src.converters.midi_to_tabs import notes_to_guitar_tab
+from src.models.note import UnplayableError
+from src.models.note_array import NOTE_DTYPE, NoteArray
+
+from .tuning import STANDARD, TUNINGS, best_tuning, fret_table, get_tuning, score_tunings
+
+
+class TestFretTable:
+    def setup_method(self) -> None:
+        self.drop_d = get_tuning("drop_d")
+
+    def test_matches_the_broadcast(self) -> None:
+        table = STANDARD.fret_table()
+        frets = np.arange(128)[:, None] - np.array(STANDARD.pitches)[None, :]
+
+        assert table.shape == (128, 6)
+        assert np.array_equal(table, np.where((frets >= 0) & (frets <= 24), frets, -1))
+
+    def test_tables_are_shared_and_read_only(self) -> None:
+        table = self.drop_d.fret_table(2, 20)
+
+        assert table is fret_table(self.drop_d.pitches, 2, 20)
+        with pytest.raises(ValueError):
+            table[0, 0] = 1
+
+    def test_capo_frets_count_from_the_capo(self) -> None:
+        # Low D on the 2nd fret capo: the open low string is an E, the neck ends at the 24th fret
+        assert self.drop_d.fret_table(capo=2)[40].tolist() == [0, -1, -1, -1, -1, -1]
+        assert self.drop_d.fret_table(capo=2)[38].tolist() == [-1] * 6
+        assert self.drop_d.fret_table(capo=2)[88].tolist() == [-1, -1, -1, -1, -1, 22]
+        assert self.drop_d.fret_table(capo=2)[89].tolist() == [-1] * 6
+
+    def test_invalid_settings(self) -> None:
+        with pytest.raises(ValueError):
+            STANDARD.fret_table(capo=25)
+        with pytest.raises(ValueError):
+            get_tuning("nashville")
+
+    def test_note_array_uses_the_tuning(self) -> None:
+        notes = NoteArray.from_tuples([(0.0, 1.0, 38)], tuning=self.drop_d.pitches)
+
+        assert notes.candidates.tolist() == [[0, -1, -1, -1, -1, -1]]
+        with pytest.raises(UnplayableError):
+            NoteArray.from_tuples([(0.0, 1.0, 38)]).check_playable()
+
+
+class TestBestTuning:
+    def test_scores_match_scoring_one_tuning_at_a_time(self) -> None:
+        pitches = np.random.default_rng(0).integers(36, 80, 1_000)
+        options = [(tuning, capo) for tuning in TUNINGS.values() for capo in (0, 3)]
+
+        unplayable, cost = score_tunings(pitches, options)
+
+        for index, option in enumerate(options):
+            alone = score_tunings(pitches, [option])
+            assert (unplayable[index], cost[index]) == (alone[0][0], alone[1][0])
+
+    def test_picks_a_tuning_that_plays_every_note(self) -> None:
+        # A riff on the low D, which standard tuning can't play
+        pitches = np.array([38, 38, 45, 50, 38, 41, 43, 38] * 10)
+
+        tuning, capo = best_tuning(pitches)
+
+        assert tuning.pitches[0] == 38 and capo == 0
+        assert score_tunings(pitches, [(tuning, capo)])[0][0] == 0
+
+    def test_standard_tuning_wins_ties(self) -> None:
+        assert best_tuning(np.array([52, 57, 59])) == (STANDARD, 0)
+
+    def test_auto_tuning_labels_the_tab(self, tmp_path) -> None:
+        notes = np.array([(index * 0.5, index * 0.5 + 0.4, 38 + index % 3) for index in range(12)], dtype=NOTE_DTYPE)
+
+        tab = notes_to_guitar_tab(notes, tmp_path / "riff.txt", 150, tuning="auto").read_text()
+
+        assert tab.splitlines()[-1].startswith("D|")
+        with pytest.raises(UnplayableError):
+            notes_to_guitar_tab(notes, tmp_path / "standard.txt", 150)
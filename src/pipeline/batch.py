@@ -0,0 +1,252 @@
+import json
+import multiprocessing
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Optional
+
+from src.converters.audio_to_midi import predict_midi
+from src.converters.midi_parser import read_midi_notes
+from src.converters.render_pool import render_midi
+from src.converters.midi_to_tabs import notes_to_guitar_tab
+from src.pipeline.inputs import output_dirs
+from src.pipeline.manifest import BuildManifest, artifact_keys, artifact_record, input_fingerprint, is_fresh
+from src.pipeline.settings import PipelineSettings
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+REPORT_NAME = "batch_report.json"
+
+# The model loaded by each worker process, see :func:`_init_worker`
+_worker_model: Optional["Model"] = None
+_worker_settings: Optional[PipelineSettings] = None
+
+
+def _init_worker(settings: PipelineSettings) -> None:
+    """Set up a worker process. The model is loaded by the first file that needs it, see :func:`_model_for`."""
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _model_for(settings: PipelineSettings) -> "Model":
+    """The worker's model, loaded once per process. Files that are up to date never load it."""
+    global _worker_model
+    if _worker_model is None:
+        _worker_model = (_worker_settings or settings).load_model()
+    return _worker_model
+
+
+def _render_stale(
+    midi_path: pathlib.Path, out_dir: pathlib.Path, settings: PipelineSettings, stale: dict[str, dict]
+) -> dict[str, pathlib.Path]:
+    """
+    Render the *stale* audio of :func:`artifact_keys` again. SoundFonts missing the same
+    formats are rendered together, under the names they get with all of the SoundFonts.
+    """
+    groups: dict[tuple[str, ...], list[pathlib.Path]] = {}
+    for soundfont in settings.soundfonts:
+        formats = tuple(
+            key["params"]["format"]
+            for key in stale.values()
+            if key["params"]["soundfont"] == str(soundfont.expanduser().resolve())
+        )
+        if formats:
+            groups.setdefault(formats, []).append(soundfont)
+
+    rendered = {}
+    for formats, soundfonts in groups.items():
+        rendered.update(
+            render_midi(
+                midi_path,
+                out_dir,
+                soundfonts,
+                formats,
+                backend=settings.render_backend,
+                workers=settings.render_workers,
+                timeout=settings.render_timeout,
+                labelled=len(settings.soundfonts) > 1,
+            )
+        )
+    return rendered
+
+
+def transcribe_file(
+    audio_path: pathlib.Path,
+    out_dir: pathlib.Path,
+    settings: PipelineSettings,
+    model: Optional["Model"] = None,
+    previous: Optional[dict] = None,
+) -> dict:
+    """
+    Run the full pipeline for one file and describe the outcome.
+
+    With the *previous* manifest entry of the file (see :class:`BuildManifest`), only the
+    artifacts whose input or parameters changed are built again. A tab whose notes are
+    unchanged is rebuilt from the MIDI file without running the model, and new notes come
+    from the model output cache when it holds them. Audio is only rendered again when the
+    notes or the render settings changed.
+
+    Failures are recorded in the returned status instead of being raised, so a
+    single bad file does not abort a whole batch.
+
+    Returns
+    -------
+    dict
+        ``{'input', 'status', 'midi', 'tab', 'wav', 'mp3', 'notes', 'built', 'up_to_date',
+        'manifest', 'error', 'seconds'}``, where ``manifest`` is the file's new manifest entry.
+    """
+    started = time.perf_counter()
+    status: dict = {"input": str(audio_path), "status": "ok", "built": [], "up_to_date": []}
+    previous = previous or {}
+    records = previous.get("artifacts", {})
+    artifacts: dict[str, dict] = {}
+
+    try:
+        fingerprint = input_fingerprint(audio_path, previous.get("input"))
+        status["manifest"] = {"input": fingerprint, "notes": previous.get("notes"), "artifacts": artifacts}
+        keys = artifact_keys(fingerprint["sha256"], settings)
+        for name, key in keys.items():
+            if is_fresh(records.get(name), key, out_dir):
+                artifacts[name] = records[name]
+                status["up_to_date"].append(name)
+        status["notes"] = previous.get("notes")
+
+        # The renderers read the MIDI file, so it is always written when rendering
+        wants_midi = settings.write_midi or bool(settings.output_formats())
+        midi_path = out_dir / f"{audio_path.stem}.mid"
+        notes = None
+        if "tab" not in artifacts or (wants_midi and "midi" not in artifacts):
+            if "midi" in artifacts:
+                # Only the tab is stale, its notes are still those in the MIDI file
+                notes = read_midi_notes(midi_path)
+            else:
+                notes, note_events = predict_midi(
+                    audio_path=audio_path,
+                    model_path=settings.model_file(),
+                    model=model if model is not None else _model_for(settings),
+                    intra_op_threads=settings.intra_op_threads,
+                    inter_op_threads=settings.inter_op_threads,
+                    cache=settings.posteriorgram_cache(),
+                    audio_cache=settings.audio_cache(),
+                    silence_gate=settings.silence_gate(),
+                    onset_threshold=settings.onset_threshold,
+                    frame_threshold=settings.frame_threshold,
+                    minimum_note_length=settings.min_note_length,
+                )
+                status["notes"] = status["manifest"]["notes"] = len(note_events)
+                if wants_midi:
+                    notes.write(str(midi_path))
+                    artifacts["midi"] = artifact_record(midi_path, keys["midi"])
+                    status["built"].append("midi")
+        if "midi" in artifacts:
+            status["midi"] = str(midi_path)
+
+        if "tab" not in artifacts:
+            fingering_cache = settings.fingering_cache()
+            tab_path = notes_to_guitar_tab(
+                notes,
+                out_dir / f"{audio_path.stem}.txt",
+                quantisation=settings.min_note_length,
+                workers=settings.tab_workers,
+                fingering_cache=fingering_cache,
+                engine=settings.fingering_engine,
+                beam_width=settings.beam_width,
+                tuning=settings.tuning,
+                capo=settings.capo,
+            )
+            artifacts["tab"] = artifact_record(tab_path, keys["tab"])
+            status["built"].append("tab")
+            if fingering_cache is not None:
+                status["fingering_cache_hit_rate"] = round(fingering_cache.hit_rate, 3)
+        status["tab"] = artifacts["tab"]["path"]
+
+        stale = {name: key for name, key in keys.items() if name not in artifacts and name not in ("midi", "tab")}
+        for name, path in _render_stale(midi_path, out_dir, settings, stale).items():
+            artifacts[name] = artifact_record(path, keys[name])
+            status["built"].append(name)
+        status.update({name: artifacts[name]["path"] for name in keys if name not in ("midi", "tab")})
+    except Exception as exc:
+        status["status"] = "failed"
+        status["error"] = f"{type(exc).__name__}: {exc}"
+
+    status["seconds"] = round(time.perf_counter() - started, 3)
+    return status
+
+
+def run_batch(
+    inputs: list[pathlib.Path],
+    out_dir: pathlib.Path,
+    settings: PipelineSettings,
+    *,
+    workers: int = 1,
+    report_path: Optional[pathlib.Path] = None,
+    force: bool = False,
+) -> list[dict]:
+    """
+    Transcribe *inputs* across a pool of *workers* processes, into the directories of
+    :func:`output_dirs`.
+
+    Each worker loads the model once and then processes files until the batch is
+    done, so throughput scales with the number of cores rather than being bound by
+    model start-up. A per-file status report is written to *report_path*
+    (default: ``<out_dir>/batch_report.json``).
+
+    What every artifact was built from is kept in ``<out_dir>/build_manifest.json``
+    (see :class:`BuildManifest`), and only stale artifacts are built again unless
+    *force* is set.
+
+    Returns
+    -------
+    list[dict]
+        The status of every input, in input order (see :func:`transcribe_file`).
+
+    Raises
+    ------
+    ValueError
+        If two inputs would be written to the same files.
+    """
+    out_dir = pathlib.Path(out_dir).expanduser().resolve()
+    file_dirs = output_dirs(inputs, out_dir)
+    for file_dir in set(file_dirs.values()) | {out_dir}:
+        file_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_path or out_dir / REPORT_NAME
+
+    manifest = BuildManifest(out_dir)
+    statuses: dict[pathlib.Path, dict] = {}
+    # Spawn rather than fork, TensorFlow is not fork-safe once initialised
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(settings,)
+        ) as pool:
+            futures = {
+                pool.submit(
+                    transcribe_file, path, file_dirs[path], settings, None, {} if force else manifest.entry(path)
+                ): path
+                for path in inputs
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    statuses[path] = future.result()
+                except Exception as exc:  # e.g. a worker process died
+                    statuses[path] = {
+                        "input": str(path),
+                        "status": "failed",
+                        "error": f"{type(exc).__name__}: {exc}",
+                    }
+                entry = statuses[path].pop("manifest", None)
+                if entry is not None:
+                    manifest.update(path, entry)
+                state = statuses[path]["status"]
+                if state == "ok" and not statuses[path]["built"]:
+                    state = "up to date"
+                print(f"[{len(statuses)}/{len(inputs)}] {state:10} {path}")
+    finally:
+        manifest.save()
+
+    report = [statuses[path] for path in inputs]
+    report_path.write_text(json.dumps(report, indent=2))
+
+    return report
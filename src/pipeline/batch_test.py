@@ -0,0 +1,75 @@
+import json
+import pathlib
+
+import pytest
+
+from src.converters.midi_writer import StreamingMidiWriter
+from src.pipeline.settings import PipelineSettings
+
+from .batch import REPORT_NAME, run_batch, transcribe_file
+from .manifest import BuildManifest, artifact_keys, artifact_record, input_fingerprint
+
+
+class TestRunBatch:
+    def setup_method(self) -> None:
+        self.notes = [(index * 0.5, index * 0.5 + 0.4, 52 + index % 5, 100) for index in range(8)]
+
+    def _settings(self, tmp_path: pathlib.Path) -> PipelineSettings:
+        # No model file: any input that needs the model fails
+        return PipelineSettings(model_path=tmp_path / "nmp", cache_dir=None, audio_cache_dir=None)
+
+    def _transcribed(
+        self, audio_path: pathlib.Path, out_dir: pathlib.Path, settings: PipelineSettings, file_dir: pathlib.Path
+    ) -> None:
+        """Build the outputs of *audio_path* in *file_dir* from a MIDI file and record them in the manifest."""
+        audio_path.parent.mkdir(parents=True, exist_ok=True)
+        audio_path.write_bytes(audio_path.name.encode())
+        file_dir.mkdir(parents=True, exist_ok=True)
+        midi_path = file_dir / f"{audio_path.stem}.mid"
+        with StreamingMidiWriter(midi_path) as writer:
+            writer.add_notes(self.notes)
+        fingerprint = input_fingerprint(audio_path)
+        keys = artifact_keys(fingerprint["sha256"], settings)
+        previous = {"input": fingerprint, "notes": 8, "artifacts": {"midi": artifact_record(midi_path, keys["midi"])}}
+        status = transcribe_file(audio_path, file_dir, settings, previous=previous)
+        assert status["status"] == "ok", status.get("error")
+
+        manifest = BuildManifest(out_dir)
+        manifest.update(audio_path, status["manifest"])
+        manifest.save()
+
+    def test_failures_are_isolated_and_reported(self, tmp_path) -> None:
+        settings = self._settings(tmp_path)
+        out_dir = tmp_path / "out"
+        done = tmp_path / "in" / "done.mp3"
+        self._transcribed(done, out_dir, settings, out_dir)
+        broken = tmp_path / "in" / "broken.mp3"
+        broken.write_bytes(b"not really audio")
+
+        report = run_batch([broken, done], out_dir, settings, workers=2)
+
+        assert [entry["input"] for entry in report] == [str(broken), str(done)]
+        assert report[0]["status"] == "failed" and report[0]["error"]
+        assert (report[1]["status"], report[1]["built"]) == ("ok", [])
+        assert json.loads((out_dir / REPORT_NAME).read_text()) == report
+        assert BuildManifest(out_dir).entry(done)["artifacts"]["tab"]["path"] == report[1]["tab"]
+
+    def test_same_stems_are_written_apart(self, tmp_path) -> None:
+        settings = self._settings(tmp_path)
+        studio, live = tmp_path / "in" / "studio" / "song.mp3", tmp_path / "in" / "live" / "song.mp3"
+        self._transcribed(studio, tmp_path / "out", settings, tmp_path / "out" / "studio")
+        self._transcribed(live, tmp_path / "out", settings, tmp_path / "out" / "live")
+
+        report = run_batch([studio, live], tmp_path / "out", settings)
+
+        assert [entry["tab"] for entry in report] == [
+            str(tmp_path / "out" / "studio" / "song.txt"),
+            str(tmp_path / "out" / "live" / "song.txt"),
+        ]
+        assert all(entry["status"] == "ok" and not entry["built"] for entry in report)
+
+    def test_inputs_that_would_overwrite_each_other_are_refused(self, tmp_path) -> None:
+        inputs = [tmp_path / "song.mp3", tmp_path / "song.wav"]
+
+        with pytest.raises(ValueError, match="same files"):
+            run_batch(inputs, tmp_path / "out", self._settings(tmp_path))
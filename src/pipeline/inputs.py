@@ -0,0 +1,75 @@
+import glob
+import os
+import pathlib
+
+AUDIO_SUFFIXES = {".mp3", ".wav", ".ogg", ".flac", ".m4a"}
+MIDI_SUFFIXES = {".mid", ".midi"}
+MANIFEST_SUFFIXES = {".txt", ".lst"}
+
+
+def collect_inputs(source: pathlib.Path | str, suffixes: set[str] = AUDIO_SUFFIXES) -> list[pathlib.Path]:
+    """
+    Resolve a batch *source* into the list of input files, with one of *suffixes*, to process.
+
+    *source* may be:
+
+    - a directory, which is searched recursively for input files,
+    - a manifest (``.txt``/``.lst``) with one input path per line; relative paths are
+      resolved against the manifest's directory and lines starting with ``#`` are ignored,
+    - a single input file,
+    - a glob pattern such as ``"recordings/**/*.mp3"``.
+
+    Raises
+    ------
+    ValueError
+        If no input files could be found.
+    """
+    source_path = pathlib.Path(source).expanduser()
+
+    if source_path.is_dir():
+        paths = [p for p in source_path.rglob("*") if p.suffix.lower() in suffixes]
+    elif source_path.is_file() and source_path.suffix.lower() in MANIFEST_SUFFIXES:
+        paths = []
+        for line in source_path.read_text().splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                entry = pathlib.Path(line).expanduser()
+                paths.append(entry if entry.is_absolute() else source_path.parent / entry)
+    elif source_path.is_file():
+        paths = [source_path]
+    else:
+        paths = [pathlib.Path(p) for p in glob.glob(str(source_path), recursive=True)]
+        paths = [p for p in paths if p.suffix.lower() in suffixes]
+
+    if not paths:
+        raise ValueError(f"No input files found for {source}")
+
+    return sorted(p.resolve() for p in paths)
+
+
+def output_dirs(inputs: list[pathlib.Path], out_dir: pathlib.Path) -> dict[pathlib.Path, pathlib.Path]:
+    """
+    The directory under *out_dir* the outputs of each of *inputs* are written to, named by the
+    input's stem.
+
+    Each input's directory relative to the directory all *inputs* share is mirrored under
+    *out_dir*, so ``a/song.mp3`` and ``b/song.mp3`` don't overwrite each other's outputs.
+    Inputs in a single directory are written to *out_dir* itself.
+
+    Raises
+    ------
+    ValueError
+        If two inputs would still be written to the same files, e.g. ``song.mp3`` and
+        ``song.wav`` in the same directory.
+    """
+    if not inputs:
+        return {}
+    root = pathlib.Path(os.path.commonpath([pathlib.Path(path).parent for path in inputs]))
+    dirs = {path: out_dir / pathlib.Path(path).parent.relative_to(root) for path in inputs}
+
+    claimed: dict[pathlib.Path, pathlib.Path] = {}
+    for path, directory in dirs.items():
+        other = claimed.setdefault(directory / pathlib.Path(path).stem, path)
+        if other != path:
+            raise ValueError(f"{other} and {path} would be written to the same files, rename one of them")
+    return dirs
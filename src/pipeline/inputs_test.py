@@ -0,0 +1,72 @@
+import pathlib
+
+import pytest
+
+from .inputs import MIDI_SUFFIXES, collect_inputs, output_dirs
+
+
+def _touch(*paths: pathlib.Path) -> None:
+    for path in paths:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+
+class TestCollectInputs:
+    def setup_method(self) -> None:
+        self.names = ["song.mp3", "live/song.mp3", "live/encore.FLAC", "notes.txt", "riff.mid"]
+
+    def _tree(self, root: pathlib.Path) -> pathlib.Path:
+        _touch(*(root / name for name in self.names))
+        return root
+
+    def test_directories_are_searched_recursively(self, tmp_path) -> None:
+        root = self._tree(tmp_path / "recordings")
+
+        assert collect_inputs(root) == [root / "live/encore.FLAC", root / "live/song.mp3", root / "song.mp3"]
+        assert collect_inputs(root, suffixes=MIDI_SUFFIXES) == [root / "riff.mid"]
+
+    def test_glob_patterns(self, tmp_path) -> None:
+        root = self._tree(tmp_path / "recordings")
+
+        assert collect_inputs(root / "**" / "*.mp3") == [root / "live/song.mp3", root / "song.mp3"]
+        assert collect_inputs(root / "*.mp3") == [root / "song.mp3"]
+
+    def test_manifests_resolve_paths_against_their_directory(self, tmp_path) -> None:
+        root = self._tree(tmp_path / "recordings")
+        manifest = tmp_path / "batch.lst"
+        manifest.write_text(f"# tonight's set\nrecordings/live/song.mp3\n\n  {root / 'song.mp3'}  \n")
+
+        assert collect_inputs(manifest) == [root / "live/song.mp3", root / "song.mp3"]
+
+    def test_single_files(self, tmp_path) -> None:
+        root = self._tree(tmp_path / "recordings")
+
+        assert collect_inputs(root / "live" / "song.mp3") == [root / "live/song.mp3"]
+
+    def test_missing_inputs(self, tmp_path) -> None:
+        root = self._tree(tmp_path / "recordings")
+        (tmp_path / "empty").mkdir()
+        (tmp_path / "empty.lst").write_text("# nothing yet\n")
+
+        for source in (tmp_path / "empty", tmp_path / "empty.lst", root / "*.ogg", tmp_path / "missing.mp3"):
+            with pytest.raises(ValueError, match="No input files found"):
+                collect_inputs(source)
+
+
+class TestOutputDirs:
+    def test_inputs_in_one_directory_are_written_to_out_dir(self, tmp_path) -> None:
+        inputs = [tmp_path / "a.mp3", tmp_path / "b.wav"]
+
+        assert output_dirs(inputs, tmp_path / "out") == {path: tmp_path / "out" for path in inputs}
+
+    def test_same_stems_in_different_directories_are_mirrored(self, tmp_path) -> None:
+        inputs = [tmp_path / "studio" / "song.mp3", tmp_path / "live" / "day1" / "song.mp3"]
+
+        assert list(output_dirs(inputs, tmp_path / "out").values()) == [
+            tmp_path / "out" / "studio",
+            tmp_path / "out" / "live" / "day1",
+        ]
+
+    def test_same_stems_in_one_directory_are_refused(self, tmp_path) -> None:
+        with pytest.raises(ValueError, match="same files"):
+            output_dirs([tmp_path / "song.mp3", tmp_path / "song.wav"], tmp_path / "out")
@@ -0,0 +1,344 @@
+import bisect
+import time
+from collections import deque
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterator, Sequence, TextIO
+
+import numpy as np
+
+from src.converters.audio_decode import MODEL_SAMPLE_RATE
+from src.converters.audio_to_midi import MAXIMUM_FREQ, MINIMUM_FREQ, NoteEvent, NoteExtractor
+from src.converters.long_audio import NoteStitcher
+from src.converters.midi_to_tabs import STRING_NAMES, TabBlockWriter, TabStream
+from src.converters.model_windows import (
+    AUDIO_N_SAMPLES,
+    FRAMES_PER_WINDOW,
+    HOP_SIZE,
+    OVERLAP_LEN,
+    infer_windows,
+    model_frame_times,
+    window_count,
+)
+from src.models.note import FinalNote
+from src.models.tuning import get_tuning
+from src.pipeline.settings import PipelineSettings
+from src.profiling.profiler import stage
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+# Raw PCM sample formats accepted on the input, as ffmpeg names them
+PCM_FORMATS = {"f32le": np.dtype("<f4"), "s16le": np.dtype("<i2")}
+
+# Samples read from the input at a time (~46 ms)
+DEFAULT_BLOCK_SAMPLES = 1024
+
+# Windows of model output decoded before the one whose notes are being finalised
+LIVE_CONTEXT_WINDOWS = 2
+
+
+def iter_pcm(
+    source: BinaryIO, sample_format: str = "f32le", block_samples: int = DEFAULT_BLOCK_SAMPLES
+) -> Iterator[np.ndarray]:
+    """
+    Read raw mono PCM at the model sample rate from *source* until it ends.
+
+    Blocks are yielded as soon as any whole samples are available, so reading from a pipe
+    never waits for a full block.
+
+    Yields
+    ------
+    np.ndarray
+        float32 samples in ``[-1, 1]``, at most *block_samples* at a time.
+    """
+    if sample_format not in PCM_FORMATS:
+        raise ValueError(f"Unknown sample format {sample_format!r}, expected one of {', '.join(PCM_FORMATS)}")
+    dtype = PCM_FORMATS[sample_format]
+    read = getattr(source, "read1", source.read)
+
+    pending = b""
+    while True:
+        data = read(block_samples * dtype.itemsize)
+        if not data:
+            return
+        pending += data
+        whole = len(pending) - len(pending) % dtype.itemsize
+        if not whole:
+            continue
+        samples = np.frombuffer(pending[:whole], dtype=dtype)
+        pending = pending[whole:]
+        if dtype.kind == "i":
+            yield samples.astype(np.float32) / np.float32(32768)
+        else:
+            yield samples.astype(np.float32)
+
+
+class LiveTranscriber:
+    """
+    Transcribes audio while it is still arriving.
+
+    The model runs on each of basic_pitch's windows as soon as its audio is complete. The
+    notes starting in the window before the newest one are then decoded, with
+    :data:`LIVE_CONTEXT_WINDOWS` of earlier output as context and the newest window to
+    see how they go on (see :class:`NoteStitcher`). A note therefore becomes final
+    roughly two windows (~3.6 s) after it starts, or when it stops sounding if it is
+    held for longer, plus the processing time.
+    """
+
+    def __init__(
+        self,
+        model: "Model",
+        *,
+        onset_threshold: float,
+        frame_threshold: float,
+        minimum_note_length: float,
+        minimum_freq: float = MINIMUM_FREQ,
+        maximum_freq: float = MAXIMUM_FREQ,
+        context_windows: int = LIVE_CONTEXT_WINDOWS,
+    ) -> None:
+        """
+        :param model: Loaded basic_pitch model
+        :type model: basic_pitch.inference.Model
+        :param onset_threshold: Energy required for a note to register
+        :type onset_threshold: float
+        :param frame_threshold: Energy required for a frame to register
+        :type frame_threshold: float
+        :param minimum_note_length: Minimum note length in ms
+        :type minimum_note_length: float
+        :param minimum_freq: Lowest frequency kept, in Hz
+        :type minimum_freq: float
+        :param maximum_freq: Highest frequency kept, in Hz
+        :type maximum_freq: float
+        :param context_windows: Windows decoded before the one being finalised
+        :type context_windows: int
+        """
+        self.model = model
+        self.onset_threshold = onset_threshold
+        self.frame_threshold = frame_threshold
+        self.minimum_note_length = minimum_note_length
+        self.minimum_freq = minimum_freq
+        self.maximum_freq = maximum_freq
+        self.samples_received = 0
+
+        self._audio = np.zeros(0, dtype=np.float32)
+        self._audio_offset = 0  # sample index of self._audio[0]
+        self._windows: deque[dict[str, np.ndarray]] = deque(maxlen=context_windows + 2)
+        self._next_window = 0
+        self._next_core = 0  # first window whose notes aren't final yet
+        self._stitcher = NoteStitcher()
+        self._horizon = 0.0
+        # (samples received, wall clock time) after every block, to tell when a note's audio arrived
+        self._arrivals: deque[tuple[int, float]] = deque()
+
+    def feed(self, samples: np.ndarray) -> tuple[list[NoteEvent], float]:
+        """
+        Add the next block of samples and run the model on every window it completes.
+
+        Returns
+        -------
+        notes : list
+            Note events that became final, in order of their start time.
+        horizon : float
+            No note returned later starts before this time.
+        """
+        self._audio = np.concatenate((self._audio, samples))
+        self.samples_received += len(samples)
+        self._arrivals.append((self.samples_received, time.perf_counter()))
+
+        notes: list[NoteEvent] = []
+        while self._window_end(self._next_window) <= self.samples_received:
+            self._infer_next_window()
+            notes += self._decode(final=False)
+        return notes, self._horizon
+
+    def finish(self) -> tuple[list[NoteEvent], float]:
+        """Run the model on the rest of the audio, padded with silence, and return the last notes."""
+        notes: list[NoteEvent] = []
+        n_windows = window_count(self.samples_received)
+        while self._next_window < n_windows:
+            self._infer_next_window()
+            if self._next_window < n_windows:
+                notes += self._decode(final=False)
+        notes += self._decode(final=True)
+        return notes, self._horizon
+
+    def arrival_time(self, note_time: float) -> float:
+        """Wall clock time (``time.perf_counter``) at which the audio at *note_time* seconds arrived."""
+        if not self._arrivals:
+            return time.perf_counter()
+        sample = int(note_time * MODEL_SAMPLE_RATE)
+        index = bisect.bisect_right(self._arrivals, sample, key=lambda arrival: arrival[0])
+        return self._arrivals[min(index, len(self._arrivals) - 1)][1]
+
+    @staticmethod
+    def _window_end(window_index: int) -> int:
+        """Number of samples needed before the model can run on window *window_index*."""
+        return window_index * HOP_SIZE - OVERLAP_LEN // 2 + AUDIO_N_SAMPLES
+
+    def _infer_next_window(self) -> None:
+        with stage("model_inference", frames=FRAMES_PER_WINDOW):
+            self._windows.append(
+                infer_windows(
+                    self.model, self._audio, self._next_window, self._next_window + 1, offset=self._audio_offset
+                )
+            )
+        self._next_window += 1
+
+        # Drop the audio no later window reads
+        keep_from = self._next_window * HOP_SIZE - OVERLAP_LEN // 2
+        if keep_from > self._audio_offset:
+            drop = keep_from - self._audio_offset
+            self._audio = self._audio[drop:]
+            self._audio_offset = keep_from
+
+    def _decode(self, final: bool) -> list[NoteEvent]:
+        # The newest window is only context, unless there's no more audio to come
+        stop_core = self._next_window if final else self._next_window - 1
+        if stop_core <= self._next_core:
+            return []
+
+        first_window = self._next_window - len(self._windows)
+        first_frame = first_window * FRAMES_PER_WINDOW
+        model_output = {key: np.concatenate([window[key] for window in self._windows]) for key in self._windows[0]}
+        times = model_frame_times(first_frame, self._next_window * FRAMES_PER_WINDOW)
+        extractor = NoteExtractor(
+            model_output, minimum_freq=self.minimum_freq, maximum_freq=self.maximum_freq, times=times
+        )
+        _, note_events = extractor.extract(self.onset_threshold, self.frame_threshold, self.minimum_note_length)
+
+        core_start = times[self._next_core * FRAMES_PER_WINDOW - first_frame]
+        if final:
+            core_stop = cut_off_at = float("inf")
+        else:
+            core_stop = times[stop_core * FRAMES_PER_WINDOW - first_frame]
+            cut_off_at = times[-1]
+        self._next_core = stop_core
+
+        notes, self._horizon = self._stitcher.add(note_events, core_start, core_stop, cut_off_at)
+
+        # Arrival times are only looked up for notes that can still come
+        horizon_sample = self._horizon * MODEL_SAMPLE_RATE
+        while len(self._arrivals) > 1 and self._arrivals[1][0] < horizon_sample:
+            self._arrivals.popleft()
+        return notes
+
+
+class LatencyStats:
+    """Delays between a note's audio arriving and its tab column being written."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+
+    def add(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def summary(self) -> dict:
+        """``{'columns', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms'}``; only ``columns`` if nothing was written."""
+        if not self.latencies:
+            return {"columns": 0}
+        latencies_ms = np.array(self.latencies) * 1000
+        return {
+            "columns": len(latencies_ms),
+            "mean_ms": round(float(latencies_ms.mean()), 1),
+            "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies_ms, 95)), 1),
+            "max_ms": round(float(latencies_ms.max()), 1),
+        }
+
+
+class LiveTabWriter(TabBlockWriter):
+    """A :class:`TabBlockWriter` that records the latency of every column it writes."""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        arrival_time: Callable[[float], float],
+        stats: LatencyStats,
+        string_names: Sequence[str] = STRING_NAMES,
+        capo: int = 0,
+    ) -> None:
+        """
+        :param stream: Text stream to write to
+        :type stream: TextIO
+        :param arrival_time: Wall clock time at which the audio at a given time arrived
+        :type arrival_time: Callable[[float], float]
+        :param stats: Collects the latencies
+        :type stats: LatencyStats
+        :param string_names: Label of each string, low to high
+        :type string_names: Sequence[str]
+        :param capo: Fret of the capo the frets count from
+        :type capo: int
+        """
+        super().__init__(stream, string_names, capo)
+        self.arrival_time = arrival_time
+        self.stats = stats
+
+    def write_groups(self, grouped_final_notes: list[list[FinalNote]]) -> None:
+        super().write_groups(grouped_final_notes)
+        written = time.perf_counter()
+        for final_group in grouped_final_notes:
+            onset = min(note.start_time for note in final_group)
+            self.stats.add(written - self.arrival_time(onset))
+
+
+def run_live(
+    source: BinaryIO,
+    out: TextIO,
+    model: "Model",
+    settings: PipelineSettings,
+    *,
+    sample_format: str = "f32le",
+    block_samples: int = DEFAULT_BLOCK_SAMPLES,
+) -> dict:
+    """
+    Write tabs to *out* while the audio on *source* is being played.
+
+    *source* carries raw mono PCM at 22050 Hz (see :data:`PCM_FORMATS`), e.g. from
+    ``ffmpeg -i <input> -f f32le -ac 1 -ar 22050 -``. Each batch of fingered clusters is
+    written as a block of tab as soon as no later note can join it.
+
+    Returns
+    -------
+    dict
+        ``{'audio_seconds', 'notes', 'processing_seconds', 'real_time_factor', 'latency'}``,
+        with ``latency`` as given by :meth:`LatencyStats.summary`.
+    """
+    transcriber = LiveTranscriber(
+        model,
+        onset_threshold=settings.onset_threshold,
+        frame_threshold=settings.frame_threshold,
+        minimum_note_length=settings.min_note_length,
+    )
+    stats = LatencyStats()
+    tab_stream = TabStream(
+        LiveTabWriter(
+            out, transcriber.arrival_time, stats, get_tuning(settings.tuning).string_names, capo=settings.capo
+        ),
+        quantisation=settings.min_note_length,
+        fingering_cache=settings.fingering_cache(),
+        engine=settings.fingering_engine,
+        beam_width=settings.beam_width,
+        tuning=settings.tuning,
+        capo=settings.capo,
+    )
+
+    processing = 0.0
+    for block in iter_pcm(source, sample_format, block_samples):
+        started = time.perf_counter()
+        notes, horizon = transcriber.feed(block)
+        tab_stream.add([(start, end, pitch) for start, end, pitch, *_ in notes], horizon)
+        processing += time.perf_counter() - started
+
+    started = time.perf_counter()
+    notes, horizon = transcriber.finish()
+    tab_stream.add([(start, end, pitch) for start, end, pitch, *_ in notes], horizon)
+    tab_stream.close()
+    processing += time.perf_counter() - started
+
+    audio_seconds = transcriber.samples_received / MODEL_SAMPLE_RATE
+    return {
+        "audio_seconds": round(audio_seconds, 3),
+        "notes": tab_stream.note_count,
+        "processing_seconds": round(processing, 3),
+        "real_time_factor": round(processing / audio_seconds, 3) if audio_seconds else None,
+        "latency": stats.summary(),
+    }
@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pytest
+
+from .live import LatencyStats, LiveTranscriber, iter_pcm
+
+
+class _TrickleReader(io.RawIOBase):
+    """A pipe stand-in that returns at most a few bytes per read."""
+
+    def __init__(self, data: bytes, max_read: int) -> None:
+        self._data = io.BytesIO(data)
+        self._max_read = max_read
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._data.read(min(size, self._max_read))
+
+
+class TestIterPcm:
+    def setup_method(self) -> None:
+        self.samples = np.linspace(-1, 1, 5000, dtype=np.float32)
+
+    def test_reassembles_partial_samples(self) -> None:
+        blocks = list(iter_pcm(_TrickleReader(self.samples.tobytes(), max_read=7), block_samples=256))
+
+        assert all(0 < len(block) <= 256 for block in blocks)
+        assert np.array_equal(np.concatenate(blocks), self.samples)
+
+    def test_scales_16_bit_samples(self) -> None:
+        pcm = np.array([-32768, 0, 16384], dtype="<i2").tobytes()
+        blocks = list(iter_pcm(io.BytesIO(pcm), sample_format="s16le"))
+
+        assert np.concatenate(blocks).tolist() == [-1.0, 0.0, 0.5]
+
+    def test_rejects_unknown_format(self) -> None:
+        with pytest.raises(ValueError):
+            list(iter_pcm(io.BytesIO(b""), sample_format="u8"))
+
+
+class TestLatencyStats:
+    def test_summary(self) -> None:
+        stats = LatencyStats()
+        assert stats.summary() == {"columns": 0}
+
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            stats.add(seconds)
+        summary = stats.summary()
+        assert summary["columns"] == 4
+        assert summary["mean_ms"] == 250.0
+        assert summary["max_ms"] == 400.0
+
+
+class TestLiveTranscriber:
+    def setup_method(self) -> None:
+        # Plucked notes of a C major arpeggio, the length of a few model windows
+        sample_rate = 22050
+        t = np.arange(int(0.5 * sample_rate)) / sample_rate
+        envelope = np.exp(-4 * t)
+        notes = [0.3 * envelope * np.sin(2 * np.pi * 440 * 2 ** ((pitch - 69) / 12) * t) for pitch in (48, 52, 55, 60)]
+        self.audio = np.tile(np.concatenate(notes), 4).astype(np.float32)
+
+    def _transcribe(self, model, block_samples: int) -> list:
+        transcriber = LiveTranscriber(model, onset_threshold=0.5, frame_threshold=0.3, minimum_note_length=58)
+        notes = []
+        horizon = 0.0
+        for start in range(0, len(self.audio), block_samples):
+            stop = start + block_samples
+            new_notes, new_horizon = transcriber.feed(self.audio[start:stop])
+            assert all(note[0] >= horizon for note in new_notes)
+            notes += new_notes
+            horizon = new_horizon
+        notes += transcriber.finish()[0]
+        return notes
+
+    def test_does_not_depend_on_block_size(self) -> None:
+        pytest.importorskip("basic_pitch")
+        from src.converters.audio_to_midi import load_model
+
+        model = load_model()
+        notes = self._transcribe(model, 1024)
+
+        assert notes
+        assert notes == self._transcribe(model, 30_000)
+        assert [note[0] for note in notes] == sorted(note[0] for note in notes)
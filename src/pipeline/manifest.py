@@ -0,0 +1,162 @@
+import functools
+import json
+import os
+import pathlib
+import tempfile
+from typing import Optional
+
+from src.cache.disk_cache import hash_file, hash_key
+from src.converters.audio_to_midi import MAXIMUM_FREQ, MINIMUM_FREQ
+from src.converters.render_pool import output_key
+from src.pipeline.settings import PipelineSettings
+
+MANIFEST_NAME = "build_manifest.json"
+
+# Bumped whenever the keys change meaning, so older manifests are rebuilt rather than misread
+MANIFEST_VERSION = 1
+
+
+def _file_stat(path: pathlib.Path) -> Optional[dict]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+@functools.lru_cache(maxsize=64)
+def _hash_soundfont(path: pathlib.Path, size: int, mtime_ns: int) -> str:
+    return hash_file(path)
+
+
+def input_fingerprint(input_path: pathlib.Path, previous: Optional[dict] = None) -> dict:
+    """
+    The content hash of *input_path*, with its size and modification time.
+
+    The file is only hashed again when its size or modification time differ from the
+    *previous* fingerprint.
+    """
+    stat = _file_stat(input_path)
+    if stat is None:
+        raise FileNotFoundError(f"No such file: {input_path}")
+    if previous and previous.get("sha256") and {key: previous.get(key) for key in stat} == stat:
+        return previous
+    return {"sha256": hash_file(input_path), **stat}
+
+
+def artifact_keys(input_sha256: str, settings: PipelineSettings) -> dict[str, dict]:
+    """
+    The key and the parameters of every artifact *settings* build from an input.
+
+    An artifact is up to date when it was built with the same key. The key of the MIDI file
+    (the notes) covers the input content and everything note extraction depends on. Those of
+    the tab and of each audio file cover the notes' key and their own parameters, so a change
+    upstream makes everything below it stale too.
+
+    Returns
+    -------
+    dict
+        ``{'midi': {'key', 'params'}, 'tab': ..., <audio>: ...}``, the audio keyed by
+        :func:`output_key`, e.g. ``mp3`` or ``mp3_wah_wah``.
+    """
+    gate = settings.silence_gate()
+    notes_params = {
+        "model": str(settings.model_file().resolve()),
+        "silence_gate": gate.cache_key() if gate is not None else None,
+        "frequency_range": [MINIMUM_FREQ, MAXIMUM_FREQ],
+        "onset_threshold": settings.onset_threshold,
+        "frame_threshold": settings.frame_threshold,
+        "min_note_length": settings.min_note_length,
+    }
+    notes_key = hash_key(MANIFEST_VERSION, input_sha256, json.dumps(notes_params, sort_keys=True))
+    keys = {"midi": {"key": notes_key, "params": notes_params}}
+
+    tab_params = {
+        "quantisation": settings.min_note_length,
+        "fingering_engine": settings.fingering_engine,
+        "beam_width": settings.beam_width if settings.fingering_engine == "beam" else None,
+        "tuning": settings.tuning,
+        "capo": settings.capo,
+    }
+    keys["tab"] = {"key": hash_key(notes_key, json.dumps(tab_params, sort_keys=True)), "params": tab_params}
+
+    for soundfont in settings.soundfonts:
+        soundfont = soundfont.expanduser().resolve()
+        stat = _file_stat(soundfont)
+        soundfont_hash = _hash_soundfont(soundfont, stat["size"], stat["mtime_ns"]) if stat is not None else None
+        for audio_format in settings.output_formats():
+            audio_params = {
+                "format": audio_format,
+                "soundfont": str(soundfont),
+                "soundfont_sha256": soundfont_hash,
+                "render_backend": settings.render_backend,
+            }
+            keys[output_key(audio_format, soundfont, settings.soundfonts)] = {
+                "key": hash_key(notes_key, json.dumps(audio_params, sort_keys=True)),
+                "params": audio_params,
+            }
+    return keys
+
+
+def artifact_record(path: pathlib.Path, key: dict) -> dict:
+    """What the manifest remembers of an artifact just written to *path* with *key* (see :func:`artifact_keys`)."""
+    return {"path": str(path), **key, "file": _file_stat(pathlib.Path(path))}
+
+
+def is_fresh(record: Optional[dict], key: dict, out_dir: Optional[pathlib.Path] = None) -> bool:
+    """
+    Whether the artifact of *record* was built with *key* and its file is still the one
+    that was written, i.e. it hasn't been deleted or overwritten since.
+
+    With *out_dir*, the file must also be in that directory, so artifacts written elsewhere
+    before the outputs were laid out differently (see :func:`~src.pipeline.inputs.output_dirs`) are built again.
+    """
+    if not record or record.get("key") != key["key"]:
+        return False
+    if out_dir is not None and pathlib.Path(record["path"]).parent != pathlib.Path(out_dir):
+        return False
+    return _file_stat(pathlib.Path(record["path"])) == record.get("file")
+
+
+class BuildManifest:
+    """
+    Remembers which input and parameters every artifact in an output directory was built from.
+
+    Entries are kept per input file, with the input's fingerprint (see :func:`input_fingerprint`)
+    and a record of every artifact (see :func:`artifact_record`). Reruns compare those with
+    :func:`artifact_keys` to rebuild only the stale artifacts.
+    """
+
+    def __init__(self, out_dir: pathlib.Path | str) -> None:
+        """
+        :param out_dir: Output directory the manifest is kept in, as ``build_manifest.json``
+        :type out_dir: pathlib.Path | str
+        """
+        self.path = pathlib.Path(out_dir) / MANIFEST_NAME
+        self.entries: dict[str, dict] = {}
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError):  # missing or corrupt, everything is rebuilt
+            return
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("inputs", {})
+
+    @staticmethod
+    def _name(input_path: pathlib.Path | str) -> str:
+        return str(pathlib.Path(input_path).expanduser().resolve())
+
+    def entry(self, input_path: pathlib.Path | str) -> dict:
+        """What was last built from *input_path*; empty if nothing was."""
+        return self.entries.get(self._name(input_path), {})
+
+    def update(self, input_path: pathlib.Path | str, entry: dict) -> None:
+        self.entries[self._name(input_path)] = entry
+
+    def save(self) -> pathlib.Path:
+        """Write the manifest, atomically so an interrupted write leaves the previous one intact."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "inputs": self.entries}, f, indent=1)
+        os.replace(tmp_name, self.path)
+        return self.path
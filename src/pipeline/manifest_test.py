@@ -0,0 +1,118 @@
+import pathlib
+
+from src.converters.midi_writer import StreamingMidiWriter
+from src.pipeline.batch import transcribe_file
+from src.pipeline.settings import PipelineSettings
+
+from .manifest import MANIFEST_NAME, BuildManifest, artifact_keys, artifact_record, input_fingerprint, is_fresh
+
+
+def _settings(tmp_path: pathlib.Path, **options) -> PipelineSettings:
+    soundfonts = [tmp_path / "clean.sf2", tmp_path / "wah.sf2"]
+    for soundfont in soundfonts:
+        soundfont.write_bytes(soundfont.name.encode())
+    options.setdefault("soundfont", soundfonts[:1])
+    return PipelineSettings(model_path=tmp_path / "nmp", cache_dir=None, audio_cache_dir=None, **options)
+
+
+class TestArtifactKeys:
+    def setup_method(self) -> None:
+        self.sha256 = "0" * 64
+
+    def _changed(self, tmp_path, **options) -> set[str]:
+        before = artifact_keys(self.sha256, _settings(tmp_path, gen_mp3=True))
+        after = artifact_keys(self.sha256, _settings(tmp_path, gen_mp3=True, **options))
+        return {name for name in before if after.get(name, {}).get("key") != before[name]["key"]}
+
+    def test_changes_only_make_what_depends_on_them_stale(self, tmp_path) -> None:
+        assert self._changed(tmp_path) == set()
+        assert self._changed(tmp_path, min_note_length=100) == {"midi", "tab", "mp3"}
+        assert self._changed(tmp_path, tuning="drop_d") == {"tab"}
+        assert self._changed(tmp_path, soundfont=tmp_path / "wah.sf2") == {"mp3"}
+
+    def test_soundfont_content_counts(self, tmp_path) -> None:
+        settings = _settings(tmp_path, gen_mp3=True)
+        before = artifact_keys(self.sha256, settings)["mp3"]["key"]
+        (tmp_path / "clean.sf2").write_bytes(b"another instrument")
+
+        assert artifact_keys(self.sha256, settings)["mp3"]["key"] != before
+
+    def test_several_soundfonts(self, tmp_path) -> None:
+        settings = _settings(tmp_path, gen_wav=True, soundfont=[tmp_path / "clean.sf2", tmp_path / "wah.sf2"])
+
+        assert set(artifact_keys(self.sha256, settings)) == {"midi", "tab", "wav_clean", "wav_wah"}
+
+
+class TestBuildManifest:
+    def test_fingerprints_are_reused_until_the_file_changes(self, tmp_path) -> None:
+        audio_path = tmp_path / "song.mp3"
+        audio_path.write_bytes(b"first take")
+        fingerprint = input_fingerprint(audio_path)
+
+        assert input_fingerprint(audio_path, fingerprint) is fingerprint
+        audio_path.write_bytes(b"second take")
+        assert input_fingerprint(audio_path, fingerprint)["sha256"] != fingerprint["sha256"]
+
+    def test_overwritten_artifacts_are_stale(self, tmp_path) -> None:
+        tab_path = tmp_path / "song.txt"
+        tab_path.write_text("e|---0---|")
+        key = {"key": "abc", "params": {}}
+        record = artifact_record(tab_path, key)
+
+        assert is_fresh(record, key)
+        assert not is_fresh(record, {"key": "def", "params": {}})
+        tab_path.write_text("e|---0---3---|")
+        assert not is_fresh(record, key)
+
+    def test_artifacts_outside_the_output_directory_are_stale(self, tmp_path) -> None:
+        # e.g. written flat before same-stem inputs were written to directories of their own
+        tab_path = tmp_path / "song.txt"
+        tab_path.write_text("e|---0---|")
+        key = {"key": "abc", "params": {}}
+        record = artifact_record(tab_path, key)
+
+        assert is_fresh(record, key, tmp_path)
+        assert not is_fresh(record, key, tmp_path / "live")
+
+    def test_round_trip(self, tmp_path) -> None:
+        manifest = BuildManifest(tmp_path)
+        manifest.update(tmp_path / "song.mp3", {"notes": 3})
+        manifest.save()
+
+        assert BuildManifest(tmp_path).entry(tmp_path / "song.mp3") == {"notes": 3}
+        (tmp_path / MANIFEST_NAME).write_text("{not json")
+        assert BuildManifest(tmp_path).entry(tmp_path / "song.mp3") == {}
+
+
+class TestIncrementalTranscription:
+    def setup_method(self) -> None:
+        self.notes = [(index * 0.5, index * 0.5 + 0.4, 52 + index % 5, 100) for index in range(8)]
+
+    def test_stale_tabs_are_rebuilt_from_the_midi_file(self, tmp_path) -> None:
+        # basic_pitch isn't needed: the MIDI file is up to date, so the model never runs
+        audio_path = tmp_path / "song.mp3"
+        audio_path.write_bytes(b"not really audio")
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        with StreamingMidiWriter(out_dir / "song.mid") as writer:
+            writer.add_notes(self.notes)
+        settings = _settings(tmp_path)
+        fingerprint = input_fingerprint(audio_path)
+        keys = artifact_keys(fingerprint["sha256"], settings)
+        previous = {
+            "input": fingerprint,
+            "notes": 8,
+            "artifacts": {"midi": artifact_record(out_dir / "song.mid", keys["midi"])},
+        }
+
+        status = transcribe_file(audio_path, out_dir, settings, previous=previous)
+        assert status["status"] == "ok", status.get("error")
+        assert (status["built"], status["up_to_date"], status["notes"]) == (["tab"], ["midi"], 8)
+
+        rerun = transcribe_file(audio_path, out_dir, settings, previous=status["manifest"])
+        assert (rerun["built"], rerun["up_to_date"]) == ([], ["midi", "tab"])
+        assert rerun["tab"] == status["tab"]
+
+        retuned = transcribe_file(audio_path, out_dir, _settings(tmp_path, tuning="drop_d"), previous=rerun["manifest"])
+        assert (retuned["status"], retuned["built"]) == ("ok", ["tab"])
+        assert pathlib.Path(retuned["tab"]).read_text().splitlines()[-1].startswith("D|")
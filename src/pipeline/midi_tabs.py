@@ -0,0 +1,108 @@
+import json
+import multiprocessing
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.converters.midi_parser import read_midi_notes
+from src.converters.midi_to_tabs import notes_to_guitar_tab
+from src.pipeline.inputs import output_dirs
+from src.pipeline.settings import PipelineSettings
+
+REPORT_NAME = "midi_report.json"
+
+# Files handed to a worker at a time; MIDI files are small, so batching them cuts the IPC overhead
+_FILES_PER_TASK = 16
+
+
+def tab_midi_file(midi_path: pathlib.Path, out_dir: pathlib.Path, settings: PipelineSettings) -> dict:
+    """
+    Turn one MIDI file into tabs, reading it with the streaming parser.
+
+    No audio or ML library is imported. As in :func:`transcribe_file`, failures are
+    recorded in the returned status instead of being raised.
+
+    Returns
+    -------
+    dict
+        ``{'input', 'status', 'tab', 'notes', 'error', 'seconds'}``
+    """
+    started = time.perf_counter()
+    status: dict = {"input": str(midi_path), "status": "ok"}
+
+    try:
+        notes = read_midi_notes(midi_path)
+        status["notes"] = len(notes)
+        tab_path = notes_to_guitar_tab(
+            notes,
+            out_dir / f"{midi_path.stem}.txt",
+            quantisation=settings.min_note_length,
+            workers=settings.tab_workers,
+            fingering_cache=settings.fingering_cache(),
+            engine=settings.fingering_engine,
+            beam_width=settings.beam_width,
+            tuning=settings.tuning,
+            capo=settings.capo,
+        )
+        status["tab"] = str(tab_path)
+    except Exception as exc:
+        status["status"] = "failed"
+        status["error"] = f"{type(exc).__name__}: {exc}"
+
+    status["seconds"] = round(time.perf_counter() - started, 3)
+    return status
+
+
+def run_midi_batch(
+    inputs: list[pathlib.Path],
+    out_dir: pathlib.Path,
+    settings: PipelineSettings,
+    *,
+    workers: int = 1,
+    report_path: Optional[pathlib.Path] = None,
+) -> list[dict]:
+    """
+    Turn many MIDI files into tabs, across *workers* processes if more than one.
+
+    The tabs are written to the directories of :func:`output_dirs`. A per-file status report
+    is written to *report_path* (default: ``<out_dir>/midi_report.json``).
+
+    Returns
+    -------
+    list[dict]
+        The status of every input, in input order (see :func:`tab_midi_file`).
+
+    Raises
+    ------
+    ValueError
+        If two inputs would be written to the same tab.
+    """
+    out_dir = pathlib.Path(out_dir).expanduser().resolve()
+    file_dirs = output_dirs(inputs, out_dir)
+    for file_dir in set(file_dirs.values()) | {out_dir}:
+        file_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_path or out_dir / REPORT_NAME
+
+    if workers <= 1:
+        report = [tab_midi_file(path, file_dirs[path], settings) for path in inputs]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            report = list(
+                pool.map(
+                    tab_midi_file,
+                    inputs,
+                    [file_dirs[path] for path in inputs],
+                    [settings] * len(inputs),
+                    chunksize=_FILES_PER_TASK,
+                )
+            )
+
+    for status in report:
+        if status["status"] != "ok":
+            print(f"failed {status['input']}: {status['error']}")
+
+    report_path.write_text(json.dumps(report, indent=2))
+
+    return report
@@ -0,0 +1,263 @@
+import json
+import pathlib
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from src.pipeline.batch import REPORT_NAME
+from src.pipeline.inputs import output_dirs
+from src.pipeline.settings import PipelineSettings
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+# Files waiting between two stages. With the file in each stage, at most
+# ``len(stages) * (DEFAULT_QUEUE_DEPTH + 1)`` files are in memory at once.
+DEFAULT_QUEUE_DEPTH = 1
+
+# Marks the end of the inputs on a stage queue
+_DONE = object()
+
+
+def run_stage_pipeline(
+    items: Iterable[dict],
+    stages: list[tuple[str, Callable[[dict], None]]],
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    on_finished: Optional[Callable[[dict], None]] = None,
+) -> list[dict]:
+    """
+    Pass every item through *stages*, each running in its own thread, so that consecutive
+    items are in different stages at the same time.
+
+    Each stage is a ``(name, function)`` pair whose function updates the item dict in place.
+    Stages are connected by queues holding at most *queue_depth* items, so a fast stage
+    waits for a slow one instead of piling up its output. If a stage raises, the item is
+    marked ``'failed'`` with the error and skips the remaining stages. The time each stage
+    spent on an item is recorded in ``item['stage_seconds']``.
+
+    Wall time is close to that of the slowest stage as long as the stages release the GIL
+    for their heavy work, as model inference, decoding and the fluidsynth/ffmpeg
+    subprocesses do.
+
+    Returns
+    -------
+    list[dict]
+        The items, in the order they finished (which is the order they came in).
+    """
+    queues: list[queue.Queue] = [queue.Queue(maxsize=max(1, queue_depth)) for _ in stages]
+    finished: list[dict] = []
+
+    def run_stage(name: str, function: Callable[[dict], None], inbox: queue.Queue, outbox: Optional[queue.Queue]):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if item.get("status", "ok") == "ok":
+                started = time.perf_counter()
+                try:
+                    function(item)
+                except Exception as exc:
+                    item["status"] = "failed"
+                    item["error"] = f"{type(exc).__name__}: {exc}"
+                item.setdefault("stage_seconds", {})[name] = round(time.perf_counter() - started, 3)
+            if outbox is not None:
+                outbox.put(item)
+            else:
+                finished.append(item)
+                if on_finished is not None:
+                    on_finished(item)
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    threads = [
+        threading.Thread(
+            target=run_stage,
+            args=(name, function, queues[index], queues[index + 1] if index + 1 < len(stages) else None),
+            name=f"stage-{name}",
+            daemon=True,
+        )
+        for index, (name, function) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for item in items:
+            item.setdefault("status", "ok")
+            queues[0].put(item)
+    finally:
+        queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    return finished
+
+
+class _FileStages:
+    """The stages of transcribing one audio file, split so consecutive files can overlap."""
+
+    def __init__(self, settings: PipelineSettings, model: "Model") -> None:
+        """
+        :param settings: Pipeline settings
+        :type settings: PipelineSettings
+        :param model: Loaded basic_pitch model, shared by every file
+        :type model: basic_pitch.inference.Model
+        """
+        self.settings = settings
+        self.model = model
+        self.cache = settings.posteriorgram_cache()
+        self.audio_cache = settings.audio_cache()
+        self.silence_gate = settings.silence_gate()
+
+    def decode(self, item: dict) -> None:
+        """Fetch the model output from the cache or, on a miss, decode the audio for the model."""
+        from src.converters.audio_decode import load_audio
+        from src.converters.audio_to_midi import MAXIMUM_FREQ, MINIMUM_FREQ
+
+        audio_path = pathlib.Path(item["input"])
+        if self.cache is not None:
+            variant = self.silence_gate.cache_key() if self.silence_gate is not None else None
+            item["cache_key"] = self.cache.key_for(
+                audio_path, self.settings.model_file(), MINIMUM_FREQ, MAXIMUM_FREQ, variant
+            )
+            item["model_output"] = self.cache.load(item["cache_key"])
+        if item.get("model_output") is None:
+            item["audio"] = load_audio(audio_path, cache=self.audio_cache)
+
+    def infer(self, item: dict) -> None:
+        """Run the model, unless its output was cached, and extract the notes."""
+        from src.converters.audio_to_midi import model_output_to_midi
+        from src.converters.model_windows import run_model
+
+        audio = item.pop("audio", None)
+        if audio is not None:
+            active_windows = self.silence_gate.active_windows(audio) if self.silence_gate is not None else None
+            item["model_output"] = run_model(self.model, audio, active_windows)
+            if self.cache is not None:
+                self.cache.store(item["cache_key"], item["model_output"])
+        item.pop("cache_key", None)
+
+        midi_obj, note_events = model_output_to_midi(
+            item.pop("model_output"),
+            onset_threshold=self.settings.onset_threshold,
+            frame_threshold=self.settings.frame_threshold,
+            minimum_note_length=self.settings.min_note_length,
+        )
+        item["notes"] = len(note_events)
+        item["midi_obj"] = midi_obj
+
+    def finish(self, item: dict) -> None:
+        """Write the MIDI file and the tab, and render the audio, into the item's ``out_dir``."""
+        from src.converters.midi_to_tabs import notes_to_guitar_tab
+
+        settings = self.settings
+        stem = pathlib.Path(item["input"]).stem
+        out_dir = item["out_dir"]
+        midi_obj = item.pop("midi_obj")
+
+        # The renderers read the MIDI file, so it is always written when rendering
+        if settings.write_midi or settings.output_formats():
+            midi_path = out_dir / f"{stem}.mid"
+            midi_obj.write(str(midi_path))
+            item["midi"] = str(midi_path)
+
+        fingering_cache = settings.fingering_cache()
+        item["tab"] = str(
+            notes_to_guitar_tab(
+                midi_obj,
+                out_dir / f"{stem}.txt",
+                quantisation=settings.min_note_length,
+                workers=settings.tab_workers,
+                fingering_cache=fingering_cache,
+                engine=settings.fingering_engine,
+                beam_width=settings.beam_width,
+                tuning=settings.tuning,
+                capo=settings.capo,
+            )
+        )
+        if fingering_cache is not None:
+            item["fingering_cache_hit_rate"] = round(fingering_cache.hit_rate, 3)
+
+        if settings.output_formats():
+            from src.converters.render_pool import render_midi
+
+            render_result = render_midi(
+                midi_path,
+                out_dir,
+                settings.soundfonts,
+                settings.output_formats(),
+                backend=settings.render_backend,
+                workers=settings.render_workers,
+                timeout=settings.render_timeout,
+            )
+            item.update({fmt: str(path) for fmt, path in render_result.items()})
+
+
+def run_pipelined_batch(
+    inputs: list[pathlib.Path],
+    out_dir: pathlib.Path,
+    settings: PipelineSettings,
+    *,
+    model: Optional["Model"] = None,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    report_path: Optional[pathlib.Path] = None,
+) -> list[dict]:
+    """
+    Transcribe *inputs* in one process, overlapping the stages of consecutive files.
+
+    While file N is tabbed and rendered, file N+1 goes through the model and file N+2 is
+    decoded (see :func:`run_stage_pipeline`), so a batch takes about as long as its slowest
+    stage instead of the sum of all stages. Unlike :func:`run_batch`, only one copy of the
+    model is loaded. The files are written to the directories of :func:`output_dirs`. A
+    per-file status report, including the time spent in each stage, is written to
+    *report_path* (default: ``<out_dir>/batch_report.json``).
+
+    Returns
+    -------
+    list[dict]
+        The status of every input, in input order, with the keys of :func:`transcribe_file`
+        and ``stage_seconds``.
+
+    Raises
+    ------
+    ValueError
+        If two inputs would be written to the same files.
+    """
+    out_dir = pathlib.Path(out_dir).expanduser().resolve()
+    file_dirs = output_dirs(inputs, out_dir)
+    for file_dir in set(file_dirs.values()) | {out_dir}:
+        file_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_path or out_dir / REPORT_NAME
+
+    file_stages = _FileStages(settings, model if model is not None else settings.load_model())
+    started = time.perf_counter()
+
+    def report_progress(item: dict) -> None:
+        item["seconds"] = round(sum(item.get("stage_seconds", {}).values()), 3)
+        print(f"[{len(report) + 1}/{len(inputs)}] {item['status']:6} {item['input']}")
+        report.append(item)
+
+    report: list[dict] = []
+    run_stage_pipeline(
+        ({"input": str(path), "out_dir": file_dirs[path]} for path in inputs),
+        [("decode", file_stages.decode), ("inference", file_stages.infer), ("tabs_render", file_stages.finish)],
+        queue_depth=queue_depth,
+        on_finished=report_progress,
+    )
+    wall_seconds = time.perf_counter() - started
+
+    for item in report:
+        # Whatever a failed file left behind, and where the file was written
+        for key in ("audio", "model_output", "midi_obj", "cache_key", "out_dir"):
+            item.pop(key, None)
+
+    stage_totals: dict[str, float] = {}
+    for item in report:
+        for name, seconds in item.get("stage_seconds", {}).items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+    busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in stage_totals.items())
+    print(f"Wall time {wall_seconds:.1f}s, time spent in each stage: {busy}")
+
+    report_path.write_text(json.dumps(report, indent=2))
+
+    return report
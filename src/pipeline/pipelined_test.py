@@ -0,0 +1,72 @@
+import threading
+import time
+
+from src.pipeline.pipelined import run_stage_pipeline
+
+
+class TestRunStagePipeline:
+    def setup_method(self) -> None:
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def _stage(self, name: str, seconds: float = 0.05):
+        def run(item: dict) -> None:
+            if name == "first":
+                with self.lock:
+                    self.in_flight += 1
+                    self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            time.sleep(seconds)
+            item.setdefault("trace", []).append(name)
+            if name == "last":
+                with self.lock:
+                    self.in_flight -= 1
+
+        return name, run
+
+    def test_stages_overlap(self) -> None:
+        second_started = threading.Event()
+        overlapped = []
+
+        def first(item: dict) -> None:
+            if item["id"] == 1:
+                second_started.set()
+            item.setdefault("trace", []).append("first")
+
+        def last(item: dict) -> None:
+            if item["id"] == 0:
+                # Run one after another, the first stage would only take item 1 once this returned
+                overlapped.append(second_started.wait(timeout=10))
+            item["trace"].append("last")
+
+        stages = [("first", first), self._stage("middle", 0), ("last", last)]
+        finished = run_stage_pipeline(({"id": index} for index in range(6)), stages, queue_depth=1)
+
+        assert overlapped == [True]
+        assert [item["id"] for item in finished] == list(range(6))
+        assert all(item["trace"] == ["first", "middle", "last"] for item in finished)
+        assert set(finished[0]["stage_seconds"]) == {"first", "middle", "last"}
+
+    def test_queues_bound_the_items_in_flight(self) -> None:
+        stages = [self._stage("first", 0), self._stage("middle", 0), self._stage("last", 0.02)]
+
+        run_stage_pipeline(({"id": index} for index in range(20)), stages, queue_depth=1)
+
+        # One item in each stage and one waiting between every two stages
+        assert self.most_in_flight <= 2 * len(stages) - 1
+
+    def test_failed_items_skip_the_remaining_stages(self) -> None:
+        def fail_odd(item: dict) -> None:
+            if item["id"] % 2:
+                raise RuntimeError("unplayable")
+
+        seen = []
+        finished = run_stage_pipeline(
+            ({"id": index} for index in range(4)),
+            [("check", fail_odd), ("record", lambda item: seen.append(item["id"]))],
+            on_finished=lambda item: None,
+        )
+
+        assert seen == [0, 2]
+        assert [item["status"] for item in finished] == ["ok", "failed", "ok", "failed"]
+        assert finished[1]["error"] == "RuntimeError: unplayable"
@@ -0,0 +1,620 @@
+import asyncio
+import copy
+import json
+import multiprocessing
+import pathlib
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from src.converters.midi_to_tabs import AUTO_TUNING, FINGERING_ENGINES
+from src.models.tuning import TUNINGS
+from src.pipeline.inputs import AUDIO_SUFFIXES
+from src.pipeline.settings import PipelineSettings
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+DEFAULT_PORT = 8765
+
+# Jobs waiting for an inference worker; further submissions are turned away with 503
+DEFAULT_QUEUE_SIZE = 16
+
+# Finished jobs kept around for their status and result, oldest dropped first
+DEFAULT_MAX_JOBS = 1000
+
+# Largest request body accepted, i.e. the largest audio upload
+DEFAULT_MAX_UPLOAD_MB = 512
+
+# Uploads are written to disk in pieces of this size, so a large one is never held in memory
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+# Seconds a client is told to wait before retrying when the queue is full
+RETRY_AFTER_SECONDS = 5
+
+# Settings a job may override, and their types
+JOB_OPTIONS = {
+    "onset_threshold": float,
+    "frame_threshold": float,
+    "min_note_length": float,
+    "gen_wav": bool,
+    "gen_mp3": bool,
+    "write_midi": bool,
+    "fingering_engine": str,
+    "tuning": str,
+    "capo": int,
+}
+
+JOB_STATES = ("queued", "transcribing", "tabs", "done", "failed")
+
+# The model loaded by each inference worker process, see :func:`_init_worker`
+_worker_model: Optional["Model"] = None
+
+
+def _init_worker(settings: PipelineSettings) -> None:
+    """Load the model once per inference worker process, where it stays for the life of the service."""
+    global _worker_model
+    _worker_model = settings.load_model()
+
+
+def _transcribe(audio_path: pathlib.Path, out_dir: pathlib.Path, settings: PipelineSettings) -> dict:
+    """Run the model and write the MIDI file. Runs in an inference worker."""
+    from src.converters.audio_to_midi import predict_midi
+
+    started = time.perf_counter()
+    midi_obj, note_events = predict_midi(
+        audio_path,
+        model_path=settings.model_file(),
+        model=_worker_model,
+        cache=settings.posteriorgram_cache(),
+        audio_cache=settings.audio_cache(),
+        silence_gate=settings.silence_gate(),
+        onset_threshold=settings.onset_threshold,
+        frame_threshold=settings.frame_threshold,
+        minimum_note_length=settings.min_note_length,
+    )
+
+    midi_path = None
+    # The renderers read the MIDI file, so it is always written when rendering
+    if settings.write_midi or settings.output_formats():
+        out_dir.mkdir(parents=True, exist_ok=True)
+        midi_path = out_dir / f"{audio_path.stem}.mid"
+        midi_obj.write(str(midi_path))
+
+    return {
+        "note_events": [(start, end, pitch) for start, end, pitch, *_ in note_events],
+        "midi": midi_path,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _tabs_and_render(
+    note_events: list[tuple[float, float, int]],
+    midi_path: Optional[pathlib.Path],
+    tab_path: pathlib.Path,
+    settings: PipelineSettings,
+) -> dict:
+    """Write the tab and render the audio. Runs in a stage worker, so it doesn't hold up the event loop."""
+    from src.converters.midi_to_tabs import notes_to_guitar_tab
+
+    started = time.perf_counter()
+    tab_path.parent.mkdir(parents=True, exist_ok=True)
+    result: dict = {
+        "tab": notes_to_guitar_tab(
+            note_events,
+            tab_path,
+            quantisation=settings.min_note_length,
+            workers=settings.tab_workers,
+            fingering_cache=settings.fingering_cache(),
+            engine=settings.fingering_engine,
+            beam_width=settings.beam_width,
+            tuning=settings.tuning,
+            capo=settings.capo,
+        )
+    }
+    timings = {"tabs": time.perf_counter() - started}
+
+    if midi_path is not None and settings.output_formats():
+        from src.converters.render_pool import render_midi
+
+        started = time.perf_counter()
+        result.update(
+            render_midi(
+                midi_path,
+                tab_path.parent,
+                settings.soundfonts,
+                settings.output_formats(),
+                backend=settings.render_backend,
+                workers=settings.render_workers,
+                timeout=settings.render_timeout,
+            )
+        )
+        timings["render"] = time.perf_counter() - started
+
+    result["timings"] = timings
+    return result
+
+
+def job_settings(settings: PipelineSettings, overrides: Optional[dict] = None) -> PipelineSettings:
+    """
+    *settings* with the :data:`JOB_OPTIONS` given in *overrides* replaced.
+
+    Raises
+    ------
+    ValueError
+        If *overrides* holds an unknown option or a value of the wrong type.
+    """
+    overrides = overrides or {}
+    if not isinstance(overrides, dict):
+        raise ValueError("'settings' must be an object")
+    unknown = set(overrides) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown settings {', '.join(sorted(unknown))}, expected any of {', '.join(JOB_OPTIONS)}")
+
+    settings = copy.copy(settings)
+    for name, value in overrides.items():
+        kind = JOB_OPTIONS[name]
+        # bool is an int, so check for it explicitly
+        if kind is bool and not isinstance(value, bool):
+            raise ValueError(f"{name} must be true or false")
+        if kind is float and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"{name} must be a number")
+        if kind is int and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError(f"{name} must be a whole number")
+        if name == "fingering_engine" and value not in FINGERING_ENGINES:
+            raise ValueError(f"{name} must be one of {', '.join(FINGERING_ENGINES)}")
+        if name == "tuning" and value not in [*TUNINGS, AUTO_TUNING]:
+            raise ValueError(f"{name} must be one of {', '.join([*TUNINGS, AUTO_TUNING])}")
+        setattr(settings, name, kind(value))
+    return settings
+
+
+class Job:
+    """A submitted transcription and how far it got."""
+
+    def __init__(
+        self,
+        job_id: str,
+        input_path: pathlib.Path,
+        out_dir: pathlib.Path,
+        settings: PipelineSettings,
+        uploaded: bool = False,
+    ) -> None:
+        """
+        :param job_id: Unique id the job is looked up by
+        :type job_id: str
+        :param input_path: Audio to transcribe
+        :type input_path: pathlib.Path
+        :param out_dir: Directory the job's MIDI, tab and audio are written to
+        :type out_dir: pathlib.Path
+        :param settings: Settings of this job
+        :type settings: PipelineSettings
+        :param uploaded: Whether *input_path* was uploaded for this job, and is deleted once it finishes
+        :type uploaded: bool
+        """
+        self.id = job_id
+        self.input_path = input_path
+        self.out_dir = out_dir
+        self.settings = settings
+        self.uploaded = uploaded
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.result: dict = {}
+        self.notes: Optional[int] = None
+        self.submitted = time.time()
+        self.timings: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        status = {
+            "id": self.id,
+            "state": self.state,
+            "input": str(self.input_path),
+            "submitted": self.submitted,
+            "timings": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+        }
+        if self.notes is not None:
+            status["notes"] = self.notes
+        if self.result:
+            status["result"] = {name: str(path) for name, path in self.result.items()}
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+    def _dequeued(self) -> None:
+        self.timings["queued"] = time.perf_counter() - self._started
+
+    def _finish(self, state: str, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+        self.timings["total"] = time.perf_counter() - self._started
+        self._discard_upload()
+
+    def _discard_upload(self) -> None:
+        if self.uploaded:
+            self.input_path.unlink(missing_ok=True)
+
+
+class TranscriptionService:
+    """
+    Transcribes audio submitted over HTTP, with the model kept loaded between jobs.
+
+    Jobs wait in a bounded queue for one of *workers* inference processes, each of which
+    loads the model once when the service starts. The tab and render stages of finished
+    transcriptions run in a separate pool of *stage_workers* processes, so the next
+    transcription starts while the previous one is still being tabbed and rendered, and
+    the event loop only ever waits. When the queue is full, submissions are refused with
+    ``503 Service Unavailable`` and a ``Retry-After`` header instead of piling up.
+
+    Endpoints, all answering JSON:
+
+    - ``POST /jobs``: ``{"input": "<audio path>", "settings": {...}}``, or the audio itself
+      as the body with ``?filename=<name>.mp3``. Answers ``202`` with the job's status.
+      Uploads are streamed to disk, and deleted once their job finishes.
+    - ``GET /jobs/<id>``: state (one of :data:`JOB_STATES`), per-stage timings and, once
+      done, the paths of the MIDI, tab and audio files.
+    - ``GET /jobs/<id>/result``: the tab as plain text once done, ``409`` before.
+    - ``GET /health``: queue length and worker counts.
+    """
+
+    def __init__(
+        self,
+        out_dir: pathlib.Path,
+        settings: PipelineSettings,
+        *,
+        workers: int = 1,
+        stage_workers: int = 2,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        max_upload_bytes: int = DEFAULT_MAX_UPLOAD_MB << 20,
+    ) -> None:
+        """
+        :param out_dir: Directory each job writes its output to, in a subdirectory named after its id
+        :type out_dir: pathlib.Path
+        :param settings: Settings of every job, some of which a job may override (see :data:`JOB_OPTIONS`)
+        :type settings: PipelineSettings
+        :param workers: Inference worker processes, each with its own copy of the model
+        :type workers: int
+        :param stage_workers: Processes writing tabs and rendering audio
+        :type stage_workers: int
+        :param queue_size: Jobs that may wait for an inference worker
+        :type queue_size: int
+        :param max_jobs: Finished jobs whose status is kept
+        :type max_jobs: int
+        :param max_upload_bytes: Largest request body accepted
+        :type max_upload_bytes: int
+        """
+        self.out_dir = pathlib.Path(out_dir).expanduser().resolve()
+        self.settings = settings
+        self.workers = workers
+        self.stage_workers = stage_workers
+        self.queue_size = queue_size
+        self.max_jobs = max_jobs
+        self.max_upload_bytes = max_upload_bytes
+
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=queue_size)
+        self._inference_pool: Optional[ProcessPoolExecutor] = None
+        self._stage_pool: Optional[ProcessPoolExecutor] = None
+        self._stage_slots = asyncio.Semaphore(stage_workers)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Start the worker processes, which load the model, and the dispatchers feeding them."""
+        # Spawn rather than fork, TensorFlow is not fork-safe once initialised
+        context = multiprocessing.get_context("spawn")
+        self._inference_pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.settings,),
+        )
+        self._stage_pool = ProcessPoolExecutor(max_workers=self.stage_workers, mp_context=context)
+        for _ in range(self.workers):
+            self._spawn(self._dispatch())
+
+    async def close(self) -> None:
+        """Stop taking jobs off the queue and shut the worker processes down."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for pool in (self._inference_pool, self._stage_pool):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        # Jobs that never finished won't be picked up again
+        for job in self.jobs.values():
+            job._discard_upload()
+
+    def submit(self, input_path: pathlib.Path, overrides: Optional[dict] = None) -> Job:
+        """
+        Queue the transcription of *input_path*.
+
+        Raises
+        ------
+        ValueError
+            If *input_path* isn't an audio file or *overrides* are invalid (see :func:`job_settings`).
+        asyncio.QueueFull
+            If :attr:`queue_size` jobs are already waiting.
+        """
+        input_path = pathlib.Path(input_path).expanduser().resolve()
+        if input_path.suffix.lower() not in AUDIO_SUFFIXES or not input_path.is_file():
+            raise ValueError(f"{input_path} is not an audio file")
+        return self._enqueue(input_path, job_settings(self.settings, overrides))
+
+    async def submit_upload(self, filename: str, chunks: AsyncIterator[bytes], overrides: Optional[dict] = None) -> Job:
+        """
+        Save the uploaded audio, arriving in *chunks*, and queue its transcription, see :meth:`submit`.
+
+        The file is written a chunk at a time off the event loop, so other requests are answered
+        while a large upload comes in. It is deleted once the job finishes.
+        """
+        suffix = pathlib.PurePath(filename).suffix.lower()
+        if suffix not in AUDIO_SUFFIXES:
+            raise ValueError(f"filename must end in one of {', '.join(sorted(AUDIO_SUFFIXES))}")
+        if self._queue.full():
+            raise asyncio.QueueFull()
+        settings = job_settings(self.settings, overrides)
+
+        job_id = uuid.uuid4().hex
+        input_path = self.out_dir / "uploads" / f"{job_id}{suffix}"
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, lambda: input_path.parent.mkdir(parents=True, exist_ok=True))
+            with await loop.run_in_executor(None, input_path.open, "wb") as f:
+                async for chunk in chunks:
+                    await loop.run_in_executor(None, f.write, chunk)
+            # The queue may have filled up while the upload came in
+            return self._enqueue(input_path, settings, job_id, uploaded=True)
+        except BaseException:
+            input_path.unlink(missing_ok=True)
+            raise
+
+    def _enqueue(
+        self,
+        input_path: pathlib.Path,
+        settings: PipelineSettings,
+        job_id: Optional[str] = None,
+        uploaded: bool = False,
+    ) -> Job:
+        job_id = job_id or uuid.uuid4().hex
+        job = Job(job_id, input_path, self.out_dir / job_id, settings, uploaded)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        return job
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(self.jobs) - self.max_jobs)]:
+            self.jobs.pop(job_id)._discard_upload()
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self) -> None:
+        """Feed one inference worker: transcribe the next job, then hand it to the stage pool."""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job._dequeued()
+            job.state = "transcribing"
+            try:
+                transcription = await loop.run_in_executor(
+                    self._inference_pool, _transcribe, job.input_path, job.out_dir, job.settings
+                )
+            except Exception as exc:
+                job._finish("failed", f"{type(exc).__name__}: {exc}")
+                continue
+
+            job.timings["inference"] = transcription["seconds"]
+            job.notes = len(transcription["note_events"])
+            if transcription["midi"] is not None:
+                job.result["midi"] = transcription["midi"]
+
+            # Waiting for a free stage worker keeps finished transcriptions from piling up in memory
+            await self._stage_slots.acquire()
+            job.state = "tabs"
+            self._spawn(self._finish_job(job, transcription))
+
+    async def _finish_job(self, job: Job, transcription: dict) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._stage_pool,
+                _tabs_and_render,
+                transcription["note_events"],
+                transcription["midi"],
+                job.out_dir / f"{job.input_path.stem}.txt",
+                job.settings,
+            )
+        except Exception as exc:
+            job._finish("failed", f"{type(exc).__name__}: {exc}")
+        else:
+            job.timings.update(result.pop("timings"))
+            job.result.update(result)
+            job._finish("done")
+        finally:
+            self._stage_slots.release()
+
+    def health(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            "stage_workers": self.stage_workers,
+            "jobs": {state: sum(job.state == state for job in self.jobs.values()) for state in JOB_STATES},
+        }
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer one HTTP request; the connection is closed afterwards."""
+        headers: dict[str, str] = {}
+        try:
+            method, target, _, length = await _read_head(reader, self.max_upload_bytes)
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            if method == "POST" and url.path.rstrip("/") == "/jobs" and "filename" in query:
+                status, payload = await self.route_upload(query, _read_body(reader, length))
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = self.route(method, target, body)
+        except _HttpError as exc:
+            status, payload = exc.status, {"error": exc.message}
+        except asyncio.QueueFull:
+            status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "The job queue is full, try again later"}
+            headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+
+        writer.write(_response(status, payload, headers))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def route_upload(self, query: dict[str, list[str]], chunks: AsyncIterator[bytes]) -> tuple[HTTPStatus, dict]:
+        """
+        Handle ``POST /jobs?filename=...``, whose body, arriving in *chunks*, is the audio to transcribe.
+
+        Raises
+        ------
+        asyncio.QueueFull
+            If the queue is full.
+        """
+        try:
+            overrides = json.loads(query["settings"][0]) if "settings" in query else None
+            job = await self.submit_upload(query["filename"][0], chunks, overrides)
+        except (ValueError, TypeError) as exc:  # json.JSONDecodeError is a ValueError
+            raise _HttpError(HTTPStatus.BAD_REQUEST, str(exc)) from exc
+        return HTTPStatus.ACCEPTED, job.to_dict()
+
+    def route(self, method: str, target: str, body: bytes) -> tuple[HTTPStatus, dict | str]:
+        """
+        Handle a request for *target* and return the status and JSON payload (or text) to answer with.
+        Uploads are handled by :meth:`route_upload`.
+
+        Raises
+        ------
+        asyncio.QueueFull
+            If a job is submitted while the queue is full.
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            return HTTPStatus.OK, self.health()
+
+        if parts == ["jobs"]:
+            if method != "POST":
+                raise _HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on /jobs")
+            try:
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict) or "input" not in request:
+                    raise ValueError('Expected {"input": "<audio path>"} or an upload with ?filename=')
+                job = self.submit(request["input"], request.get("settings"))
+            except (ValueError, TypeError) as exc:  # json.JSONDecodeError is a ValueError
+                raise _HttpError(HTTPStatus.BAD_REQUEST, str(exc)) from exc
+            return HTTPStatus.ACCEPTED, job.to_dict()
+
+        if len(parts) in (2, 3) and parts[0] == "jobs" and parts[2:] in ([], ["result"]):
+            if method != "GET":
+                raise _HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {url.path}")
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise _HttpError(HTTPStatus.NOT_FOUND, f"No job {parts[1]}")
+            if len(parts) == 2:
+                return HTTPStatus.OK, job.to_dict()
+            if job.state == "failed":
+                raise _HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, job.error or "The job failed")
+            if job.state != "done":
+                raise _HttpError(HTTPStatus.CONFLICT, f"Job {job.id} is {job.state}")
+            return HTTPStatus.OK, pathlib.Path(job.result["tab"]).read_text()
+
+        raise _HttpError(HTTPStatus.NOT_FOUND, f"No endpoint {method} {url.path}")
+
+
+class _HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+async def _read_head(reader: asyncio.StreamReader, max_body_bytes: int) -> tuple[str, str, dict[str, str], int]:
+    """Read the head of an HTTP/1.1 request: its method, target, headers (lower-cased names) and body length."""
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise _HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise _HttpError(HTTPStatus.BAD_REQUEST, "Malformed Content-Length") from None
+    if length > max_body_bytes:
+        raise _HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Bodies are limited to {max_body_bytes} bytes")
+    return method.upper(), target, headers, length
+
+
+async def _read_body(reader: asyncio.StreamReader, length: int) -> AsyncIterator[bytes]:
+    """The *length* bytes of a request body, in chunks of at most :data:`UPLOAD_CHUNK_BYTES`."""
+    while length:
+        chunk = await reader.readexactly(min(length, UPLOAD_CHUNK_BYTES))
+        length -= len(chunk)
+        yield chunk
+
+
+def _response(status: HTTPStatus, payload: dict | str, headers: Optional[dict[str, str]] = None) -> bytes:
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def serve(
+    service: TranscriptionService,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    unix_socket: Optional[pathlib.Path] = None,
+) -> None:
+    """Start *service* and answer requests on *host*:*port*, or on *unix_socket*, until cancelled."""
+    await service.start()
+    if unix_socket is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, path=str(unix_socket))
+        print(f"Listening on {unix_socket}")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"Listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.pipeline import service as service_module
+from src.pipeline.service import TranscriptionService, _tabs_and_render, job_settings
+from src.pipeline.settings import PipelineSettings
+
+TEST_AUDIO = pathlib.Path(__file__).resolve().parents[2] / "test_audio" / "open_strings.mp3"
+
+
+async def _request(port: int, method: str, target: str, body: bytes = b"") -> tuple[int, dict, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode().split("\r\n")
+    headers = dict(line.split(": ", 1) for line in header_lines)
+    return int(status_line.split()[1]), headers, payload
+
+
+class TestJobSettings:
+    def setup_method(self) -> None:
+        self.settings = PipelineSettings()
+
+    def test_overrides_are_applied_to_a_copy(self) -> None:
+        settings = job_settings(self.settings, {"onset_threshold": 0.6, "gen_mp3": True})
+
+        assert settings.onset_threshold == 0.6 and settings.gen_mp3
+        assert self.settings.onset_threshold == 0.5 and not self.settings.gen_mp3
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"soundfont": "x.sf2"},
+            {"gen_wav": 1},
+            {"min_note_length": "long"},
+            {"fingering_engine": "dp"},
+            {"capo": 2.5},
+            ["onset"],
+        ],
+    )
+    def test_invalid_overrides(self, overrides) -> None:
+        with pytest.raises(ValueError):
+            job_settings(self.settings, overrides)
+
+
+class TestTranscriptionService:
+    """The HTTP endpoints and the queue, without starting the workers, so jobs stay queued"""
+
+    def setup_method(self) -> None:
+        self.requests: list[tuple[str, str, bytes]] = []
+
+    def _serve(self, tmp_path: pathlib.Path, queue_size: int = 2) -> list[tuple[int, dict, bytes]]:
+        async def run() -> list[tuple[int, dict, bytes]]:
+            service = TranscriptionService(tmp_path, PipelineSettings(), queue_size=queue_size)
+            server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                responses = []
+                for method, target, body in self.requests:
+                    # Requests may refer to the id of the first job
+                    if responses and "{id}" in target:
+                        target = target.format(id=json.loads(responses[0][2])["id"])
+                    responses.append(await _request(port, method, target, body))
+                return responses
+
+        return asyncio.run(run())
+
+    def test_submit_and_poll(self, tmp_path) -> None:
+        self.requests = [
+            ("POST", "/jobs", json.dumps({"input": str(TEST_AUDIO), "settings": {"onset_threshold": 0.6}}).encode()),
+            ("GET", "/jobs/{id}", b""),
+            ("GET", "/jobs/{id}/result", b""),
+            ("GET", "/jobs/unknown", b""),
+            ("GET", "/health", b""),
+        ]
+        submitted, status, result, unknown, health = self._serve(tmp_path)
+
+        assert submitted[0] == 202
+        assert json.loads(status[2])["state"] == "queued"
+        assert result[0] == 409
+        assert unknown[0] == 404
+        assert json.loads(health[2])["queued"] == 1
+
+    def test_full_queue_is_refused(self, tmp_path) -> None:
+        job = json.dumps({"input": str(TEST_AUDIO)}).encode()
+        self.requests = [("POST", "/jobs", job)] * 3
+        responses = self._serve(tmp_path, queue_size=2)
+
+        assert [status for status, _, _ in responses] == [202, 202, 503]
+        assert responses[2][1]["Retry-After"]
+
+    def test_upload(self, tmp_path) -> None:
+        self.requests = [("POST", "/jobs?filename=riff.mp3", TEST_AUDIO.read_bytes())]
+        (status, _, body) = self._serve(tmp_path)[0]
+
+        uploaded = pathlib.Path(json.loads(body)["input"])
+        assert status == 202
+        assert uploaded.parent == tmp_path / "uploads"
+        assert uploaded.read_bytes() == TEST_AUDIO.read_bytes()
+
+    def test_uploads_stream_while_other_requests_are_answered(self, tmp_path, monkeypatch) -> None:
+        monkeypatch.setattr(service_module, "UPLOAD_CHUNK_BYTES", 1024)
+        audio = TEST_AUDIO.read_bytes()
+
+        async def run() -> tuple[tuple[int, dict, bytes], tuple[int, dict, bytes]]:
+            service = TranscriptionService(tmp_path, PipelineSettings())
+            server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                head = f"POST /jobs?filename=riff.mp3 HTTP/1.1\r\nContent-Length: {len(audio)}\r\n\r\n"
+                half = len(audio) // 2
+                writer.write(head.encode() + audio[:half])
+                await writer.drain()
+                # Half the upload is in, the rest is still to come
+                health = await _request(port, "GET", "/health")
+                writer.write(audio[half:])
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+            head, _, payload = response.partition(b"\r\n\r\n")
+            return health, (int(head.split()[1]), {}, payload)
+
+        health, (status, _, body) = asyncio.run(run())
+
+        assert health[0] == 200
+        assert status == 202
+        assert pathlib.Path(json.loads(body)["input"]).read_bytes() == audio
+
+    def test_uploads_are_deleted_once_their_job_finishes(self, tmp_path) -> None:
+        async def run() -> tuple[pathlib.Path, str]:
+            service = TranscriptionService(tmp_path, PipelineSettings(model_path=tmp_path / "nmp"))
+            # Fails straight away, there is no model
+            service._inference_pool = ThreadPoolExecutor(1)
+
+            async def chunks():
+                yield b"not really audio"
+
+            job = await service.submit_upload("riff.mp3", chunks())
+            uploaded = job.input_path
+            assert uploaded.exists()
+            service._spawn(service._dispatch())
+            while not job.finished:
+                await asyncio.sleep(0.01)
+            await service.close()
+            return uploaded, job.state
+
+        uploaded, state = asyncio.run(run())
+
+        assert state == "failed"
+        assert not uploaded.exists()
+
+    @pytest.mark.parametrize(
+        "method, target, body",
+        [
+            ("POST", "/jobs", b"not json"),
+            ("POST", "/jobs", json.dumps({"input": "missing.mp3"}).encode()),
+            ("POST", "/jobs?filename=notes.txt", b"abc"),
+            ("POST", "/jobs", json.dumps({"input": str(TEST_AUDIO), "settings": {"model": "x"}}).encode()),
+        ],
+    )
+    def test_bad_requests(self, tmp_path, method, target, body) -> None:
+        self.requests = [(method, target, body)]
+        assert self._serve(tmp_path)[0][0] == 400
+
+
+class TestTabsAndRender:
+    def test_writes_the_tab_and_times_it(self, tmp_path) -> None:
+        notes = [(0.0, 0.5, 40), (0.5, 1.0, 45), (1.0, 1.5, 50)]
+
+        result = _tabs_and_render(notes, None, tmp_path / "job" / "riff.txt", PipelineSettings())
+
+        assert result["tab"].read_text().splitlines()[-3:] == ["D|-----0-", "A|---0---", "E|-0-----"]
+        assert set(result["timings"]) == {"tabs"}
@@ -0,0 +1,162 @@
+import argparse
+import pathlib
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from src.cache.audio_cache import DEFAULT_AUDIO_CACHE_DIR, DecodedAudioCache
+from src.cache.posteriorgram_cache import DEFAULT_POSTERIORGRAM_DIR, PosteriorgramCache
+from src.converters.inference_backends import DEFAULT_BACKEND, resolve_model_path
+from src.converters.render_pool import DEFAULT_RENDER_TIMEOUT
+from src.converters.silence import SilenceGate
+from src.models.fingering_beam import BEAM_WIDTH
+from src.models.fingering_cache import FingeringCache
+
+if TYPE_CHECKING:
+    from basic_pitch.inference import Model
+
+
+DEFAULT_SOUNDFONT = pathlib.Path("./instruments/clean_acoustic.sf2")
+
+
+class PipelineSettings:
+    """
+    The options shared by every stage of the audio → MIDI → tab → audio pipeline.
+
+    Kept as a plain, picklable object so it can be handed to worker processes.
+    """
+
+    def __init__(
+        self,
+        onset_threshold: float = 0.5,
+        frame_threshold: float = 0.4,
+        min_note_length: float = 150,
+        soundfont: pathlib.Path | str | Sequence[pathlib.Path | str] = DEFAULT_SOUNDFONT,
+        gen_wav: bool = False,
+        gen_mp3: bool = False,
+        gen_formats: Sequence[str] = (),
+        write_midi: bool = True,
+        tab_workers: int = 1,
+        fingering_cache_size: int = 4096,
+        model_path: Optional[pathlib.Path | str] = None,
+        cache_dir: Optional[pathlib.Path | str] = DEFAULT_POSTERIORGRAM_DIR,
+        cache_size_mb: int = 2048,
+        render_backend: str = "cli",
+        audio_cache_dir: Optional[pathlib.Path | str] = DEFAULT_AUDIO_CACHE_DIR,
+        audio_cache_size_mb: int = 2048,
+        skip_silence: bool = False,
+        silence_threshold_db: float = -45.0,
+        fingering_engine: str = "greedy",
+        beam_width: int = BEAM_WIDTH,
+        tuning: str = "standard",
+        capo: int = 0,
+        render_workers: Optional[int] = None,
+        render_timeout: Optional[float] = DEFAULT_RENDER_TIMEOUT,
+        backend: str = DEFAULT_BACKEND,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+    ) -> None:
+        self.onset_threshold = onset_threshold
+        self.frame_threshold = frame_threshold
+        self.min_note_length = min_note_length
+        soundfonts = [soundfont] if isinstance(soundfont, (str, pathlib.Path)) else soundfont
+        self.soundfonts = [pathlib.Path(path) for path in soundfonts]
+        self.gen_wav = gen_wav
+        self.gen_mp3 = gen_mp3
+        self.gen_formats = list(gen_formats)
+        self.write_midi = write_midi
+        self.tab_workers = tab_workers
+        self.fingering_cache_size = fingering_cache_size
+        self.model_path = model_path
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir is not None else None
+        self.cache_size_mb = cache_size_mb
+        self.render_backend = render_backend
+        self.audio_cache_dir = pathlib.Path(audio_cache_dir) if audio_cache_dir is not None else None
+        self.audio_cache_size_mb = audio_cache_size_mb
+        self.skip_silence = skip_silence
+        self.silence_threshold_db = silence_threshold_db
+        self.fingering_engine = fingering_engine
+        self.beam_width = beam_width
+        self.tuning = tuning
+        self.capo = capo
+        self.render_workers = render_workers
+        self.render_timeout = render_timeout
+        self.backend = backend
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "PipelineSettings":
+        """Build the settings from the parsed ``run.py`` arguments."""
+        return cls(
+            onset_threshold=args.onset_threshold,
+            frame_threshold=args.frame_threshold,
+            min_note_length=args.min_note_length,
+            soundfont=args.soundfont or DEFAULT_SOUNDFONT,
+            gen_wav=args.gen_wav,
+            gen_mp3=args.gen_mp3,
+            gen_formats=args.gen_format or (),
+            write_midi=not args.no_midi,
+            tab_workers=args.tab_workers,
+            fingering_cache_size=args.fingering_cache_size,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            cache_size_mb=args.cache_size_mb,
+            render_backend=args.render_backend,
+            audio_cache_dir=None if args.no_cache else args.audio_cache_dir,
+            audio_cache_size_mb=args.audio_cache_size_mb,
+            skip_silence=args.skip_silence,
+            silence_threshold_db=args.silence_threshold_db,
+            fingering_engine=args.fingering,
+            beam_width=args.beam_width,
+            tuning=args.tuning,
+            capo=args.capo,
+            render_workers=args.render_workers,
+            render_timeout=args.render_timeout,
+            backend=args.backend,
+            intra_op_threads=args.intra_op_threads,
+            inter_op_threads=args.inter_op_threads,
+        )
+
+    @property
+    def soundfont(self) -> pathlib.Path:
+        """The first SoundFont, which renderers that take only one use."""
+        return self.soundfonts[0]
+
+    def output_formats(self) -> list[str]:
+        """The audio formats to render, e.g. ``['wav', 'mp3']``; empty if no audio is wanted."""
+        formats = (["wav"] if self.gen_wav else []) + (["mp3"] if self.gen_mp3 else []) + self.gen_formats
+        return list(dict.fromkeys(formats))
+
+    def model_file(self) -> pathlib.Path:
+        """The model to transcribe with: ``model_path`` if set, otherwise basic_pitch's model for ``backend``."""
+        return resolve_model_path(self.model_path, None if self.model_path is not None else self.backend)
+
+    def load_model(self) -> "Model":
+        """Load :meth:`model_file` on the configured threads, see :func:`load_model`."""
+        from src.converters.audio_to_midi import load_model
+
+        return load_model(
+            self.model_file(), intra_op_threads=self.intra_op_threads, inter_op_threads=self.inter_op_threads
+        )
+
+    def posteriorgram_cache(self) -> Optional[PosteriorgramCache]:
+        """The model output cache to use, or ``None`` if caching is disabled."""
+        if self.cache_dir is None:
+            return None
+        return PosteriorgramCache(self.cache_dir, max_bytes=self.cache_size_mb << 20)
+
+    def audio_cache(self) -> Optional[DecodedAudioCache]:
+        """The decoded audio cache to use, or ``None`` if caching is disabled."""
+        if self.audio_cache_dir is None:
+            return None
+        return DecodedAudioCache(self.audio_cache_dir, max_bytes=self.audio_cache_size_mb << 20)
+
+    def silence_gate(self) -> Optional[SilenceGate]:
+        """The gate that skips the model on silence, or ``None`` if the model runs on all of the audio."""
+        if not self.skip_silence:
+            return None
+        return SilenceGate(self.silence_threshold_db)
+
+    def fingering_cache(self) -> Optional[FingeringCache]:
+        """A fresh cache for repeated fingerings, or ``None`` if disabled or the engine doesn't use one."""
+        if self.fingering_cache_size <= 0 or self.fingering_engine != "greedy":
+            return None
+        return FingeringCache(self.fingering_cache_size)
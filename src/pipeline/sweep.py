@@ -0,0 +1,142 @@
+import csv
+import itertools
+import math
+import pathlib
+
+from src.converters.audio_to_midi import NoteExtractor, infer_model_output
+from src.converters.midi_to_tabs import notes_to_guitar_tab
+from src.models.note import UnplayableError
+from src.pipeline.settings import PipelineSettings
+
+# Names accepted in a sweep spec → PipelineSettings attribute
+SWEEP_PARAMETERS = {
+    "onset": "onset_threshold",
+    "frame": "frame_threshold",
+    "min-note-length": "min_note_length",
+    "length": "min_note_length",
+}
+SUMMARY_NAME = "sweep_summary.csv"
+
+
+def parse_sweep(spec: str) -> tuple[str, list[float]]:
+    """
+    Parse a single sweep spec into the setting it varies and its values.
+
+    Accepted forms are ``name=start:stop:step`` (``stop`` inclusive),
+    ``name=v1,v2,...`` and ``name=value``, e.g. ``onset=0.3:0.8:0.05``.
+
+    Raises
+    ------
+    ValueError
+        If the spec is malformed or names an unknown parameter.
+    """
+    name, sep, values = spec.partition("=")
+    name = name.strip().lower().replace("_", "-")
+    if not sep or name not in SWEEP_PARAMETERS:
+        raise ValueError(f"Invalid sweep '{spec}', expected one of {sorted(SWEEP_PARAMETERS)} as name=start:stop:step")
+
+    try:
+        if ":" in values:
+            start, stop, step = (float(v) for v in values.split(":"))
+            if step <= 0 or stop < start:
+                raise ValueError
+            count = math.floor((stop - start) / step + 1e-9) + 1
+            parsed = [round(start + i * step, 6) for i in range(count)]
+        else:
+            parsed = [float(v) for v in values.split(",")]
+    except ValueError:
+        raise ValueError(f"Invalid sweep values in '{spec}'") from None
+
+    return SWEEP_PARAMETERS[name], parsed
+
+
+def sweep_grid(specs: list[str], settings: PipelineSettings) -> list[dict[str, float]]:
+    """
+    Expand *specs* into every combination of onset threshold, frame threshold and
+    minimum note length. Parameters that are not swept keep their value from *settings*.
+    """
+    axes = {
+        "onset_threshold": [settings.onset_threshold],
+        "frame_threshold": [settings.frame_threshold],
+        "min_note_length": [settings.min_note_length],
+    }
+    for spec in specs:
+        name, values = parse_sweep(spec)
+        axes[name] = values
+
+    return [dict(zip(axes, combination)) for combination in itertools.product(*axes.values())]
+
+
+def run_sweep(
+    audio_path: pathlib.Path,
+    out_dir: pathlib.Path,
+    settings: PipelineSettings,
+    grid: list[dict[str, float]],
+) -> list[dict]:
+    """
+    Produce one MIDI file and one tab per point of *grid* from a single model run.
+
+    The network runs (at most) once; every grid point only repeats note extraction
+    on the shared model output. Outputs are written to ``<out_dir>/<stem>_sweep/``,
+    together with a ``sweep_summary.csv`` of the note counts.
+
+    Returns
+    -------
+    list[dict]
+        One summary row per grid point.
+    """
+    sweep_dir = out_dir / f"{audio_path.stem}_sweep"
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+
+    model_output = infer_model_output(
+        audio_path,
+        model_path=settings.model_file(),
+        intra_op_threads=settings.intra_op_threads,
+        inter_op_threads=settings.inter_op_threads,
+        cache=settings.posteriorgram_cache(),
+        audio_cache=settings.audio_cache(),
+        silence_gate=settings.silence_gate(),
+    )
+    extractor = NoteExtractor(model_output)
+    # Shared across the grid, nearby settings tend to produce the same phrases
+    fingering_cache = settings.fingering_cache()
+
+    rows = []
+    for params in grid:
+        midi_obj, note_events = extractor.extract(
+            params["onset_threshold"], params["frame_threshold"], params["min_note_length"]
+        )
+
+        name = (
+            f"{audio_path.stem}_on{params['onset_threshold']:g}"
+            f"_fr{params['frame_threshold']:g}_len{params['min_note_length']:g}"
+        )
+        row = {**params, "notes": len(note_events), "midi": "", "tab": ""}
+        if settings.write_midi:
+            midi_path = sweep_dir / f"{name}.mid"
+            midi_obj.write(str(midi_path))
+            row["midi"] = str(midi_path)
+
+        try:
+            tab_path = notes_to_guitar_tab(
+                midi_obj,
+                sweep_dir / f"{name}.txt",
+                quantisation=params["min_note_length"],
+                workers=settings.tab_workers,
+                fingering_cache=fingering_cache,
+                engine=settings.fingering_engine,
+                beam_width=settings.beam_width,
+                tuning=settings.tuning,
+                capo=settings.capo,
+            )
+            row["tab"] = str(tab_path)
+        except (ValueError, UnplayableError) as exc:
+            row["tab"] = f"failed: {exc}"
+        rows.append(row)
+
+    with (sweep_dir / SUMMARY_NAME).open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return rows
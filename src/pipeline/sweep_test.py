@@ -0,0 +1,80 @@
+import csv
+import pathlib
+
+import numpy as np
+import pytest
+
+from src.converters.audio_to_midi import MAXIMUM_FREQ, MINIMUM_FREQ
+from src.pipeline.settings import PipelineSettings
+
+from .sweep import SUMMARY_NAME, parse_sweep, run_sweep, sweep_grid
+
+
+def _model_output(pitches: list[int], frames: int = 400) -> dict[str, np.ndarray]:
+    """A posteriorgram with a clear half-second note for each of *pitches*, one after another."""
+    note = np.zeros((frames, 88), dtype=np.float32)
+    onset = np.zeros((frames, 88), dtype=np.float32)
+    for index, pitch in enumerate(pitches):
+        start, end = 10 + index * 60, 53 + index * 60
+        note[start:end, pitch - 21] = 0.9
+        onset[start, pitch - 21] = 0.9
+    return {"note": note, "onset": onset, "contour": np.zeros((frames, 264), dtype=np.float32)}
+
+
+class TestParseSweep:
+    def test_ranges_include_their_end(self) -> None:
+        assert parse_sweep("onset=0.3:0.5:0.1") == ("onset_threshold", [0.3, 0.4, 0.5])
+        assert parse_sweep("min_note_length=100:150:100") == ("min_note_length", [100.0])
+
+    def test_lists_and_single_values(self) -> None:
+        assert parse_sweep("frame=0.2,0.35") == ("frame_threshold", [0.2, 0.35])
+        assert parse_sweep(" Length =120") == ("min_note_length", [120.0])
+
+    @pytest.mark.parametrize(
+        "spec",
+        ["onset", "pitch=0.5", "onset=", "onset=a,b", "onset=0.5:0.3:0.1", "onset=0.3:0.5:0", "onset=0.3:0.5"],
+    )
+    def test_bad_specs(self, spec) -> None:
+        with pytest.raises(ValueError):
+            parse_sweep(spec)
+
+
+class TestSweepGrid:
+    def test_unswept_parameters_keep_their_setting(self) -> None:
+        settings = PipelineSettings(onset_threshold=0.5, frame_threshold=0.3, min_note_length=127)
+
+        grid = sweep_grid(["onset=0.4,0.6", "length=100:200:100"], settings)
+
+        assert grid == [
+            {"onset_threshold": 0.4, "frame_threshold": 0.3, "min_note_length": 100.0},
+            {"onset_threshold": 0.4, "frame_threshold": 0.3, "min_note_length": 200.0},
+            {"onset_threshold": 0.6, "frame_threshold": 0.3, "min_note_length": 100.0},
+            {"onset_threshold": 0.6, "frame_threshold": 0.3, "min_note_length": 200.0},
+        ]
+        assert sweep_grid([], settings) == [{"onset_threshold": 0.5, "frame_threshold": 0.3, "min_note_length": 127}]
+
+
+class TestRunSweep:
+    def test_one_output_per_grid_point(self, tmp_path) -> None:
+        pytest.importorskip("basic_pitch")
+        # The model output is cached, so the model never runs
+        audio_path = tmp_path / "riff.mp3"
+        audio_path.write_bytes(b"not really audio")
+        settings = PipelineSettings(model_path=tmp_path / "nmp", cache_dir=tmp_path / "cache", audio_cache_dir=None)
+        cache = settings.posteriorgram_cache()
+        cache.store(
+            cache.key_for(audio_path, settings.model_file(), MINIMUM_FREQ, MAXIMUM_FREQ),
+            _model_output([52, 55, 57, 59]),
+        )
+
+        grid = sweep_grid(["onset=0.5,0.95"], settings)
+        rows = run_sweep(audio_path, tmp_path / "out", settings, grid)
+
+        sweep_dir = tmp_path / "out" / "riff_sweep"
+        assert [row["onset_threshold"] for row in rows] == [0.5, 0.95]
+        assert rows[0]["notes"] >= 4
+        assert rows[1]["notes"] == 0  # every onset is below the threshold
+        assert pathlib.Path(rows[0]["tab"]).parent == sweep_dir
+        assert pathlib.Path(rows[0]["midi"]).exists()
+        with (sweep_dir / SUMMARY_NAME).open() as f:
+            assert [int(row["notes"]) for row in csv.DictReader(f)] == [row["notes"] for row in rows]
@@ -0,0 +1,278 @@
+import contextvars
+import json
+import os
+import pathlib
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+PROFILE_FORMATS = ("json", "chrome")
+
+# The profiler stages are reported to, see :meth:`Profiler.__enter__`
+_active_profiler: contextvars.ContextVar[Optional["Profiler"]] = contextvars.ContextVar("active_profiler", default=None)
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and of the finished subprocesses it waited for (fluidsynth, ffmpeg)."""
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+class Stage:
+    """
+    One run of a pipeline stage, timed while used as a context manager.
+
+    Item counts are added with :meth:`count`, e.g. ``stage.count(notes=len(notes))``.
+    """
+
+    __slots__ = (
+        "name",
+        "parent",
+        "depth",
+        "counts",
+        "start",
+        "wall_seconds",
+        "cpu_seconds",
+        "peak_memory_bytes",
+        "error",
+        "_profiler",
+        "_started",
+        "_cpu_started",
+        "_memory_started",
+        "_memory_peak",
+    )
+
+    def __init__(self, profiler: "Profiler", name: str, parent: Optional["Stage"], counts: dict[str, int]) -> None:
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.counts = dict(counts)
+        self.start = 0.0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_memory_bytes: Optional[int] = None
+        self.error: Optional[str] = None
+        self._profiler = profiler
+        self._memory_peak = 0
+
+    def count(self, **counts: int) -> None:
+        """Add to the item counts of this stage."""
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self) -> "Stage":
+        self._profiler._enter(self)
+        self._cpu_started = _cpu_seconds()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.wall_seconds = time.perf_counter() - self._started
+        self.cpu_seconds = _cpu_seconds() - self._cpu_started
+        self.start = self._started - self._profiler.started
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self._profiler._exit(self)
+
+    def to_dict(self) -> dict:
+        record = {
+            "name": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "depth": self.depth,
+            "start_seconds": round(self.start, 6),
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "counts": self.counts,
+        }
+        if self.error is not None:
+            record["error"] = self.error
+        return record
+
+
+class _NullStage:
+    """Stands in for :class:`Stage` while nothing is being profiled."""
+
+    def count(self, **counts: int) -> None:
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """
+    Records the wall time, CPU time, peak memory and item counts of every pipeline stage.
+
+    While a profiler is active (``with Profiler() as profiler:``) each :func:`stage` in the
+    pipeline is recorded in :attr:`stages`, in the order the stages finish, and passed to
+    the hooks added with :meth:`add_hook`. Stages run in worker processes are not seen.
+
+    Peak memory is the most Python and numpy memory in use during a stage, above what was
+    in use when it started, as traced by ``tracemalloc``. Memory held by TensorFlow or by
+    subprocesses is not included. Tracing slows down allocations, so it can be turned off.
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        """
+        :param trace_memory: Record the peak memory of every stage
+        :type trace_memory: bool
+        """
+        self.trace_memory = trace_memory
+        self.stages: list[Stage] = []
+        self.started = time.perf_counter()
+        self.wall_seconds = 0.0
+        self._hooks: list[Callable[[Stage], None]] = []
+        self._open: list[Stage] = []
+        self._memory_peak = 0
+        self._started_tracing = False
+        self._token: Optional[contextvars.Token] = None
+
+    def add_hook(self, hook: Callable[[Stage], None]) -> None:
+        """Call *hook* with every stage as soon as it finishes."""
+        self._hooks.append(hook)
+
+    def stage(self, name: str, **counts: int) -> Stage:
+        """A new stage, nested in the innermost one still running. Time it with ``with``."""
+        return Stage(self, name, self._open[-1] if self._open else None, counts)
+
+    def __enter__(self) -> "Profiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.started = time.perf_counter()
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.wall_seconds = time.perf_counter() - self.started
+        _active_profiler.reset(self._token)
+        if self._started_tracing:
+            self._memory_peak = max(self._memory_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _enter(self, stage: Stage) -> None:
+        if self.trace_memory and tracemalloc.is_tracing():
+            # Credit the peak so far to the enclosing stage before the peak is reset for this one
+            current, peak = tracemalloc.get_traced_memory()
+            self._fold_peak(stage.parent, peak)
+            tracemalloc.reset_peak()
+            stage._memory_started = stage._memory_peak = current
+        self._open.append(stage)
+
+    def _exit(self, stage: Stage) -> None:
+        self._open.remove(stage)
+        if self.trace_memory and tracemalloc.is_tracing():
+            stage._memory_peak = max(stage._memory_peak, tracemalloc.get_traced_memory()[1])
+            stage.peak_memory_bytes = stage._memory_peak - stage._memory_started
+            self._fold_peak(stage.parent, stage._memory_peak)
+
+        self.stages.append(stage)
+        for hook in self._hooks:
+            hook(stage)
+
+    def _fold_peak(self, parent: Optional[Stage], peak: int) -> None:
+        if parent is not None:
+            parent._memory_peak = max(parent._memory_peak, peak)
+        self._memory_peak = max(self._memory_peak, peak)
+
+    def summary(self) -> dict[str, dict]:
+        """Totals per stage name: ``{name: {'calls', 'wall_seconds', 'cpu_seconds', 'counts'}}``."""
+        totals: dict[str, dict] = {}
+        for stage in self.stages:
+            total = totals.setdefault(stage.name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "counts": {}})
+            total["calls"] += 1
+            total["wall_seconds"] += stage.wall_seconds
+            total["cpu_seconds"] += stage.cpu_seconds
+            for key, value in stage.counts.items():
+                total["counts"][key] = total["counts"].get(key, 0) + value
+        for total in totals.values():
+            total["wall_seconds"] = round(total["wall_seconds"], 6)
+            total["cpu_seconds"] = round(total["cpu_seconds"], 6)
+        return totals
+
+    def to_dict(self) -> dict:
+        """Every stage and the totals per stage, as written by :meth:`write_json`."""
+        try:
+            import resource
+
+            max_rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+        except ImportError:
+            max_rss_bytes = None
+
+        return {
+            "wall_seconds": round(self.wall_seconds, 6),
+            "peak_memory_bytes": self._memory_peak if self.trace_memory else None,
+            "max_rss_bytes": max_rss_bytes,
+            "stages": [stage.to_dict() for stage in self.stages],
+            "summary": self.summary(),
+        }
+
+    def to_chrome_trace(self) -> dict:
+        """The stages in the Trace Event Format read by ``chrome://tracing`` and Perfetto."""
+        pid = os.getpid()
+        events = []
+        for stage in self.stages:
+            args: dict = {"cpu_seconds": round(stage.cpu_seconds, 6), **stage.counts}
+            if stage.peak_memory_bytes is not None:
+                args["peak_memory_bytes"] = stage.peak_memory_bytes
+            if stage.error is not None:
+                args["error"] = stage.error
+            events.append(
+                {
+                    "name": stage.name,
+                    "cat": "stage",
+                    "ph": "X",
+                    "ts": round(stage.start * 1e6, 3),
+                    "dur": round(stage.wall_seconds * 1e6, 3),
+                    "pid": pid,
+                    "tid": 0,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: pathlib.Path | str, profile_format: str = "json") -> pathlib.Path:
+        """
+        Write the profile to *path* as plain JSON (see :meth:`to_dict`) or as a Chrome trace.
+
+        Raises
+        ------
+        ValueError
+            If *profile_format* is not one of ``PROFILE_FORMATS``.
+        """
+        if profile_format not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format {profile_format!r}, expected one of {', '.join(PROFILE_FORMATS)}")
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profile = self.to_dict() if profile_format == "json" else self.to_chrome_trace()
+        path.write_text(json.dumps(profile, indent=2))
+        return path
+
+
+def active_profiler() -> Optional[Profiler]:
+    """The profiler stages are currently reported to, if any."""
+    return _active_profiler.get()
+
+
+def stage(name: str, **counts: int) -> Stage | _NullStage:
+    """
+    Time a pipeline stage with the active profiler::
+
+        with stage("clustering") as timed:
+            bounds = note_array.cluster_bounds()
+            timed.count(clusters=len(bounds) - 1)
+
+    Does nothing, at negligible cost, when no profiler is active.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name, **counts)
@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.converters.midi_to_tabs import notes_to_guitar_tab
+
+from .profiler import Profiler, active_profiler, stage
+
+
+class TestProfiler:
+    def setup_method(self) -> None:
+        self.profiler = Profiler()
+
+    def test_stages_do_nothing_without_a_profiler(self) -> None:
+        assert active_profiler() is None
+        with stage("idle") as timed:
+            timed.count(notes=3)
+        assert self.profiler.stages == []
+
+    def test_records_nested_stages_with_counts(self) -> None:
+        finished = []
+        self.profiler.add_hook(lambda record: finished.append(record.name))
+        with self.profiler:
+            with stage("outer", samples=10) as outer:
+                with stage("inner") as inner:
+                    inner.count(notes=2)
+                    inner.count(notes=3)
+                outer.count(samples=5)
+        assert active_profiler() is None
+
+        inner_record, outer_record = self.profiler.stages
+        assert finished == ["inner", "outer"]
+        assert inner_record.parent is outer_record and inner_record.depth == 1
+        assert inner_record.counts == {"notes": 5}
+        assert outer_record.counts == {"samples": 15}
+        assert outer_record.wall_seconds >= inner_record.wall_seconds >= 0
+        assert inner_record.start >= outer_record.start
+
+    def test_peak_memory_of_nested_stages(self) -> None:
+        with self.profiler:
+            with stage("outer"):
+                with stage("inner"):
+                    buffer = np.ones(1 << 20)  # 8 MiB
+                    del buffer
+                small = np.ones(1 << 10)
+                del small
+
+        inner_record, outer_record = self.profiler.stages
+        assert inner_record.peak_memory_bytes >= 8 << 20
+        assert outer_record.peak_memory_bytes >= inner_record.peak_memory_bytes
+
+    def test_records_failed_stages(self) -> None:
+        with self.profiler, pytest.raises(ValueError):
+            with stage("broken"):
+                raise ValueError("no notes")
+
+        assert self.profiler.stages[0].error == "ValueError"
+
+    def test_tab_stages(self, tmp_path) -> None:
+        notes = [(0.5 * i, 0.5 * i + 0.4, 52 + i % 12) for i in range(20)]
+        with self.profiler:
+            notes_to_guitar_tab(notes, tmp_path / "riff.txt", quantisation=150)
+
+        summary = self.profiler.summary()
+        assert summary["clustering"]["counts"] == {"notes": 20, "clusters": 20}
+        assert summary["assign_notes"]["counts"] == {"clusters": 20}
+        assert summary["tab_write"]["counts"] == {"columns": 20}
+
+    def test_writes_json_and_chrome_trace(self, tmp_path) -> None:
+        with self.profiler:
+            with stage("model_inference", frames=142):
+                pass
+
+        profile = json.loads(self.profiler.write(tmp_path / "profile.json").read_text())
+        assert profile["stages"][0]["name"] == "model_inference"
+        assert profile["summary"]["model_inference"]["calls"] == 1
+
+        trace = json.loads(self.profiler.write(tmp_path / "trace.json", "chrome").read_text())
+        (event,) = trace["traceEvents"]
+        assert event["ph"] == "X" and event["name"] == "model_inference"
+        assert event["args"]["frames"] == 142
+
+        with pytest.raises(ValueError):
+            self.profiler.write(tmp_path / "profile.csv", "csv")